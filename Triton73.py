@@ -19,6 +19,10 @@ from datetime import datetime
 import os
 import json
 import csv
+import copy
+from collections import deque
+from dataclasses import dataclass, replace
+from kline_cache import fetch_cached_klines
 
 # MEXC API Configuration
 MEXC_API_BASE = "https://api.mexc.com/api/v3"
@@ -51,6 +55,90 @@ DRAWDOWN_PAUSE_THRESHOLD = 0.20  # Pause at 20% drawdown
 DRAWDOWN_RESUME_THRESHOLD = 0.95  # Resume at 95% of peak
 USE_SECOND_CONFIRMATION = True  # Wait for next candle confirmation
 
+# Exit Simulation
+EXIT_MODELS = ('intrabar', 'close')  # SL/TP touched by candle high/low, or only by the close
+AMBIGUOUS_EXIT_RULES = ('pessimistic', 'finer')  # Candle touching SL and TP: assume SL, or ask finer data
+
+# Liquidation (isolated margin)
+# MEXC BTCUSDT risk-limit tiers: (max position value in USDT, maintenance margin rate)
+MAINTENANCE_MARGIN_TIERS = (
+    (525_000, 0.004),
+    (1_050_000, 0.006),
+    (1_575_000, 0.008),
+    (2_100_000, 0.010),
+    (2_625_000, 0.012),
+    (3_150_000, 0.014),
+    (float('inf'), 0.016)
+)
+
+
+@dataclass(frozen=True)
+class StrategyConfig:
+    """Immutable strategy parameter set (hashable, so it can key caches and results)
+    
+    The strategy functions take a `config` argument defaulting to
+    TRITON73_CONFIG, so several parameter sets can be evaluated in one
+    process. Derive variants with config.replace(sl_pct=0.005, ...).
+    """
+    name: str = 'Triton73'
+    session_close_hour_utc: int = SESSION_CLOSE_HOUR_UTC
+    breakout_confirmation_pct: float = BREAKOUT_CONFIRMATION_PCT
+    sl_pct: float = SL_PCT
+    tp_multiplier: float = TP_MULTIPLIER
+    base_leverage: float = BASE_LEVERAGE
+    min_leverage: float = MIN_LEVERAGE
+    max_leverage: float = MAX_LEVERAGE
+    min_level_age_hours: float = MIN_LEVEL_AGE_HOURS
+    risk_per_trade_pct: float = RISK_PER_TRADE_PCT
+    level_decay_24h: float = LEVEL_DECAY_24H  # Validity reduction after 24h
+    level_decay_72h: float = LEVEL_DECAY_72H  # After 72h (1.0 = ignore unless retested with volume)
+    volume_confirmation_multiplier: float = VOLUME_CONFIRMATION_MULTIPLIER
+    ema_short: int = EMA_SHORT
+    ema_long: int = EMA_LONG
+    use_trend_filter: bool = True
+    use_second_confirmation: bool = USE_SECOND_CONFIRMATION
+    liquidation_protection: bool = True  # Funding rate and liquidation size adjustments
+    drawdown_pause_threshold: float = DRAWDOWN_PAUSE_THRESHOLD  # None = never pause
+    drawdown_resume_threshold: float = DRAWDOWN_RESUME_THRESHOLD
+    
+    def replace(self, **changes):
+        """Copy with some parameters changed"""
+        return replace(self, **changes)
+
+
+# Strategy presets
+TRITON73_CONFIG = StrategyConfig()
+
+# mexc_enhanced_strategy.py: higher leverage and risk, no liquidation protection
+ENHANCED_CONFIG = StrategyConfig(
+    name='Enhanced',
+    base_leverage=7.0,
+    min_leverage=3.0,
+    max_leverage=6.0,
+    risk_per_trade_pct=0.007,
+    liquidation_protection=False
+)
+
+# mexc_btcusdt_signals.py: single-candle breakout, fixed 3x leverage, no filters
+ORIGINAL_CONFIG = StrategyConfig(
+    name='Original',
+    base_leverage=3.0,
+    min_leverage=3.0,
+    max_leverage=3.0,
+    level_decay_24h=0.0,
+    level_decay_72h=0.0,
+    use_trend_filter=False,
+    use_second_confirmation=False,
+    liquidation_protection=False,
+    drawdown_pause_threshold=None
+)
+
+STRATEGY_PRESETS = {
+    'original': ORIGINAL_CONFIG,
+    'enhanced': ENHANCED_CONFIG,
+    'triton73': TRITON73_CONFIG
+}
+
 # State files
 STATE_FILE = 'strategy_state.json'
 TRADE_JOURNAL = 'trade_journal.csv'
@@ -86,7 +174,7 @@ def save_strategy_state(state):
         print(f"Error saving state: {e}")
 
 
-def check_drawdown_pause(state):
+def check_drawdown_pause(state, config=TRITON73_CONFIG):
     """Check if strategy should be paused due to drawdown"""
     current_capital = state['current_capital']
     max_equity = state['max_equity']
@@ -100,7 +188,7 @@ def check_drawdown_pause(state):
     drawdown = (current_capital - max_equity) / max_equity if max_equity > 0 else 0
     
     # Check pause condition
-    if drawdown <= -DRAWDOWN_PAUSE_THRESHOLD:
+    if config.drawdown_pause_threshold is not None and drawdown <= -config.drawdown_pause_threshold:
         if not state.get('paused', False):
             state['paused'] = True
             save_strategy_state(state)
@@ -109,7 +197,7 @@ def check_drawdown_pause(state):
     
     # Check resume condition
     if state.get('paused', False):
-        if current_capital >= max_equity * DRAWDOWN_RESUME_THRESHOLD:
+        if current_capital >= max_equity * config.drawdown_resume_threshold:
             state['paused'] = False
             save_strategy_state(state)
             print(f"✅ STRATEGY RESUMED: Capital recovered to {current_capital/max_equity*100:.1f}% of peak")
@@ -178,10 +266,14 @@ def fetch_funding_rate(symbol='BTCUSDT'):
         return 0.0  # Default to 0 if fetch fails
 
 
-def fetch_mexc_klines(symbol, interval, limit=500):
-    """Fetch klines from MEXC"""
+def fetch_mexc_klines(symbol, interval, limit=500, start_time=None, end_time=None):
+    """Fetch klines from MEXC (optionally from/until open times in ms)"""
     try:
         interval_map = {
+            '1m': '1m',
+            '5m': '5m',
+            '15m': '15m',
+            '30m': '30m',
             '1h': '1h',
             '4h': '4h',
             '1d': '1d'
@@ -194,6 +286,10 @@ def fetch_mexc_klines(symbol, interval, limit=500):
             'interval': mexc_interval,
             'limit': limit
         }
+        if start_time is not None:
+            params['startTime'] = int(start_time)
+        if end_time is not None:
+            params['endTime'] = int(end_time)
         response = requests.get(url, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
@@ -253,90 +349,201 @@ def calculate_ema(df, period):
     return df['close'].ewm(span=period, adjust=False).mean()
 
 
-def calculate_dynamic_leverage(df, current_price):
+def calculate_dynamic_leverage(df, current_price, config=TRITON73_CONFIG):
     """Calculate dynamic leverage based on ATR volatility"""
     atr = calculate_atr(df, period=14)
+    return leverage_from_atr(atr, current_price, config)
+
+
+def leverage_from_atr(atr, current_price, config=TRITON73_CONFIG):
+    """Dynamic leverage for a given ATR value"""
     if not atr:
-        return BASE_LEVERAGE
+        return config.base_leverage
     
     normalized_atr = (atr / current_price) * 100  # ATR as percentage
     
     # High volatility (>2%) -> reduce leverage
     if normalized_atr > 2.0:
-        leverage = MIN_LEVERAGE
+        leverage = config.min_leverage
     # Low volatility (<0.8%) -> increase leverage
     elif normalized_atr < 0.8:
-        leverage = MAX_LEVERAGE
+        leverage = config.max_leverage
     else:
         # Linear interpolation between MIN and MAX based on ATR
-        leverage = BASE_LEVERAGE * (1 + (0.5 - normalized_atr / 2.0))
-        leverage = max(MIN_LEVERAGE, min(MAX_LEVERAGE, leverage))
+        leverage = config.base_leverage * (1 + (0.5 - normalized_atr / 2.0))
+        leverage = max(config.min_leverage, min(config.max_leverage, leverage))
     
     return round(leverage, 1)
 
 
-def calculate_level_with_decay(df, current_idx):
-    """Calculate level with decay mechanism"""
-    historical = df.iloc[:current_idx + 1].copy()
-    historical['hour_utc'] = historical['open_time'].dt.hour
-    session_closes = historical[historical['hour_utc'] == SESSION_CLOSE_HOUR_UTC]
+def calculate_level_with_decay(df, current_idx, level_index=None, config=TRITON73_CONFIG):
+    """Calculate level with decay mechanism
+    
+    Pass a level_index from build_level_index() to look up many indices of
+    the same dataset in O(1) each.
+    """
+    if level_index is None:
+        level_index = build_level_index(df, config)
+    return level_from_index(level_index, current_idx)
+
+
+def build_level_index(df, config=TRITON73_CONFIG):
+    """Build the session-level index for a dataset (once per dataset)
+    
+    Forward-fills the latest session close price, timestamp and age to every
+    candle and evaluates the decay rules as arrays. The retest volume test at
+    each index uses the trailing 20 candles ending at that index.
+    """
+    n = len(df)
+    idx = np.arange(n)
+    close = df['close'].to_numpy(dtype=float)
+    volume = df['volume'].to_numpy(dtype=float)
+    open_time_ns = df['open_time'].dt.as_unit('ns').astype('int64').to_numpy()
+    hour_utc = df['open_time'].dt.hour.to_numpy()
+    
+    session_idx = np.maximum.accumulate(np.where(hour_utc == config.session_close_hour_utc, idx, -1))
+    has_level = session_idx >= 0
+    session_idx = np.where(has_level, session_idx, 0)
+    price = np.where(has_level, close[session_idx], np.nan)
+    time_ns = np.where(has_level, open_time_ns[session_idx], 0)
+    age_hours = np.where(has_level, (open_time_ns - time_ns) / 1e9 / 3600, np.nan)
+    
+    # After 72h the level is invalid unless price retests it with high volume
+    avg_volume = pd.Series(volume).rolling(window=20).mean().to_numpy()
+    retest_with_volume = (np.abs(close - price) / price < 0.002) & (volume > avg_volume * 1.2)
+    expired = age_hours > 72
+    if config.level_decay_72h >= 1.0:
+        alive = has_level & (~expired | retest_with_volume)
+    else:
+        alive = has_level
     
-    if len(session_closes) == 0:
+    # After 24h, reduce validity by 25%
+    decay_factor = np.where((age_hours > 24) & ~expired, 1.0 - config.level_decay_24h, 1.0)
+    decay_factor = np.where(expired & ~retest_with_volume, 1.0 - config.level_decay_72h, decay_factor)
+    
+    return {
+        'price': price,
+        'time_ns': time_ns,
+        'age_hours': age_hours,
+        'decay_factor': decay_factor,
+        'retest_with_volume': retest_with_volume,
+        'alive': alive,
+        'valid': alive & (age_hours >= config.min_level_age_hours)
+    }
+
+
+def level_from_index(level_index, idx):
+    """Level with decay at candle idx (None if no usable level)"""
+    if not level_index['alive'][idx]:
         return None
     
-    latest = session_closes.iloc[-1]
-    level_price = float(latest['close'])
-    level_time = latest['open_time']
-    current_time = df.iloc[current_idx]['open_time']
-    age_hours = (current_time - level_time).total_seconds() / 3600
+    return {
+        'price': float(level_index['price'][idx]),
+        'time': pd.Timestamp(int(level_index['time_ns'][idx]), tz='UTC'),
+        'age_hours': float(level_index['age_hours'][idx]),
+        'decay_factor': float(level_index['decay_factor'][idx]),
+        'valid': bool(level_index['valid'][idx])
+    }
+
+
+def apply_level_decay(level_price, level_time, age_hours, current_close, current_volume, avg_volume,
+                      config=TRITON73_CONFIG):
+    """Apply the level decay rules to a session level of the given age
     
-    # Level decay logic
+    avg_volume is the mean volume of the trailing 20 candles (None if fewer
+    candles are available, so no retest can revive the level).
+    """
     decay_factor = 1.0
     if age_hours > 72:
         # After 72h, level is invalid unless retested with volume
         # Check if price retested with high volume
-        current_candle = df.iloc[current_idx]
-        avg_volume = df['volume'].tail(20).mean()
         retest_with_volume = (
-            (abs(float(current_candle['close']) - level_price) / level_price < 0.002) and
-            (float(current_candle['volume']) > avg_volume * 1.2)
+            avg_volume is not None and
+            (abs(current_close - level_price) / level_price < 0.002) and
+            (current_volume > avg_volume * 1.2)
         )
         if not retest_with_volume:
-            return None  # Level too old and not retested
+            if config.level_decay_72h >= 1.0:
+                return None  # Level too old and not retested
+            decay_factor = 1.0 - config.level_decay_72h
     elif age_hours > 24:
         # After 24h, reduce validity by 25%
-        decay_factor = 1.0 - LEVEL_DECAY_24H
+        decay_factor = 1.0 - config.level_decay_24h
     
     return {
         'price': level_price,
         'time': level_time,
         'age_hours': age_hours,
         'decay_factor': decay_factor,
-        'valid': age_hours >= MIN_LEVEL_AGE_HOURS
+        'valid': age_hours >= config.min_level_age_hours
     }
 
 
-def check_trend_filter(df):
+class SessionLevelState:
+    """Latest session-close level, updated one candle at a time
+    
+    Incremental counterpart of build_level_index() for the live loop and
+    candle-by-candle backtests. Times are open times in ms (UTC).
+    """
+    
+    def __init__(self, config=TRITON73_CONFIG):
+        self.config = config
+        self.price = None
+        self.time = None
+    
+    def update(self, open_time, close):
+        """Add a candle"""
+        if (open_time // 3_600_000) % 24 == self.config.session_close_hour_utc:
+            self.price = close
+            self.time = open_time
+    
+    def level(self, current_time, current_close, current_volume, avg_volume):
+        """Level with decay at the current candle (None if no usable level)"""
+        if self.price is None:
+            return None
+        age_hours = (current_time - self.time) / 1000 / 3600
+        return apply_level_decay(self.price, self.time, age_hours, current_close, current_volume, avg_volume,
+                                 self.config)
+    
+    def to_dict(self):
+        """Serialize state"""
+        return {'price': self.price, 'time': self.time}
+    
+    @classmethod
+    def from_dict(cls, data, config=TRITON73_CONFIG):
+        """Restore serialized state"""
+        state = cls(config)
+        state.price = data['price']
+        state.time = data['time']
+        return state
+
+
+def check_trend_filter(df, config=TRITON73_CONFIG):
     """Check trend filter using EMA"""
-    if len(df) < EMA_LONG:
+    if not config.use_trend_filter or len(df) < config.ema_long:
         return {'trend': 'NEUTRAL', 'long_allowed': True, 'short_allowed': True}
     
-    ema_20 = calculate_ema(df, EMA_SHORT)
-    ema_50 = calculate_ema(df, EMA_LONG)
+    ema_short = calculate_ema(df, config.ema_short)
+    ema_long = calculate_ema(df, config.ema_long)
     
-    if ema_20 is None or ema_50 is None:
+    if ema_short is None or ema_long is None:
         return {'trend': 'NEUTRAL', 'long_allowed': True, 'short_allowed': True}
     
-    ema_20_val = ema_20.iloc[-1]
-    ema_50_val = ema_50.iloc[-1]
+    return trend_filter_from_emas(ema_short.iloc[-1], ema_long.iloc[-1], config)
+
+
+def trend_filter_from_emas(ema_short, ema_long, config=TRITON73_CONFIG):
+    """Trend filter for given short/long EMA values (None means not enough data)"""
+    if not config.use_trend_filter or ema_short is None or ema_long is None:
+        return {'trend': 'NEUTRAL', 'long_allowed': True, 'short_allowed': True}
     
-    if ema_20_val > ema_50_val:
+    if ema_short > ema_long:
         return {'trend': 'BULLISH', 'long_allowed': True, 'short_allowed': False}
     else:
         return {'trend': 'BEARISH', 'long_allowed': False, 'short_allowed': True}
 
 
-def check_volume_confirmation(df, current_idx):
+def check_volume_confirmation(df, current_idx, config=TRITON73_CONFIG):
     """Check if breakout has volume confirmation"""
     if current_idx < 20:
         return False
@@ -345,191 +552,464 @@ def check_volume_confirmation(df, current_idx):
     avg_volume = df.iloc[max(0, current_idx-20):current_idx]['volume'].mean()
     current_volume = float(current_candle['volume'])
     
-    return current_volume > (avg_volume * VOLUME_CONFIRMATION_MULTIPLIER)
+    return current_volume > (avg_volume * config.volume_confirmation_multiplier)
+
+
+class RollingMeanState:
+    """Incremental rolling mean over the last `window` values
+    
+    Uses the same Kahan-compensated running sum as pandas rolling().mean(),
+    so an update is O(1) and the value matches the pandas calculation.
+    """
+    
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.sum = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.same_count = 0
+        self.prev_value = None
+    
+    def update(self, value):
+        """Add a value (dropping the oldest one when the window is full)"""
+        if len(self.values) == self.window:
+            y = -self.values[0] - self.compensation_remove
+            t = self.sum + y
+            self.compensation_remove = t - self.sum - y
+            self.sum = t
+        
+        self.values.append(value)
+        y = value - self.compensation_add
+        t = self.sum + y
+        self.compensation_add = t - self.sum - y
+        self.sum = t
+        
+        # Constant windows return the value itself (no floating point artifacts)
+        self.same_count = self.same_count + 1 if value == self.prev_value else 1
+        self.prev_value = value
+        return self.value
+    
+    @property
+    def value(self):
+        """Mean of the window, None until the window is full"""
+        count = len(self.values)
+        if count < self.window:
+            return None
+        if self.same_count >= count:
+            return self.prev_value
+        return self.sum / count
+    
+    @classmethod
+    def from_history(cls, window, values):
+        """Seed from a history array"""
+        state = cls(window)
+        for value in values:
+            state.update(float(value))
+        return state
+    
+    def to_dict(self):
+        """Serialize state"""
+        return {
+            'window': self.window,
+            'values': list(self.values),
+            'sum': self.sum,
+            'compensation_add': self.compensation_add,
+            'compensation_remove': self.compensation_remove,
+            'same_count': self.same_count,
+            'prev_value': self.prev_value
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Restore serialized state"""
+        state = cls(data['window'])
+        state.values.extend(data['values'])
+        state.sum = data['sum']
+        state.compensation_add = data['compensation_add']
+        state.compensation_remove = data['compensation_remove']
+        state.same_count = data['same_count']
+        state.prev_value = data['prev_value']
+        return state
+
+
+class EMAState:
+    """Incremental EMA, same recursion as pandas ewm(span=period, adjust=False)"""
+    
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 1.0 / (1.0 + (period - 1) / 2.0)
+        self.ema = None
+        self.count = 0
+    
+    def update(self, value):
+        """Add a close price"""
+        if self.ema is None:
+            self.ema = value
+        elif self.ema != value:
+            old_weight = 1.0 - self.alpha
+            self.ema = (old_weight * self.ema + self.alpha * value) / (old_weight + self.alpha)
+        self.count += 1
+        return self.value
+    
+    @property
+    def value(self):
+        """Current EMA, None until `period` values were seen (like calculate_ema)"""
+        return self.ema if self.count >= self.period else None
+    
+    @classmethod
+    def from_history(cls, period, values):
+        """Seed from a history array"""
+        state = cls(period)
+        for value in values:
+            state.update(float(value))
+        return state
+    
+    def to_dict(self):
+        """Serialize state"""
+        return {'period': self.period, 'ema': self.ema, 'count': self.count}
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Restore serialized state"""
+        state = cls(data['period'])
+        state.ema = data['ema']
+        state.count = data['count']
+        return state
+
+
+class ATRState:
+    """Incremental ATR (rolling mean of true range, like calculate_atr)"""
+    
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.tr_mean = RollingMeanState(period)
+        self.count = 0
+    
+    def update(self, high, low, close):
+        """Add a candle"""
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.tr_mean.update(tr)
+        self.prev_close = close
+        self.count += 1
+        return self.value
+    
+    @property
+    def value(self):
+        """Current ATR, None until period + 1 candles were seen"""
+        if self.count < self.period + 1:
+            return None
+        return self.tr_mean.value
+    
+    @classmethod
+    def from_history(cls, high, low, close, period=14):
+        """Seed from high/low/close history arrays"""
+        state = cls(period)
+        for h, l, c in zip(high, low, close):
+            state.update(float(h), float(l), float(c))
+        return state
+    
+    def to_dict(self):
+        """Serialize state"""
+        return {
+            'period': self.period,
+            'prev_close': self.prev_close,
+            'tr_mean': self.tr_mean.to_dict(),
+            'count': self.count
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Restore serialized state"""
+        state = cls(data['period'])
+        state.prev_close = data['prev_close']
+        state.tr_mean = RollingMeanState.from_dict(data['tr_mean'])
+        state.count = data['count']
+        return state
+
+
+class IndicatorState:
+    """Trend EMAs, ATR and volume mean for one symbol, updated one candle at a time"""
+    
+    def __init__(self, config=TRITON73_CONFIG):
+        self.config = config
+        self.ema_short = EMAState(config.ema_short)
+        self.ema_long = EMAState(config.ema_long)
+        self.atr = ATRState(14)
+        self.volume_mean = RollingMeanState(20)
+        self.volume_confirmed = False
+        self.last_open_time = None
+    
+    def update(self, high, low, close, volume, open_time=None):
+        """Add a candle (open_time in ms, kept to resume from persisted state)"""
+        # Volume confirmation compares against the previous 20 candles
+        avg_volume = self.volume_mean.value
+        self.volume_confirmed = (
+            avg_volume is not None and volume > avg_volume * self.config.volume_confirmation_multiplier
+        )
+        self.volume_mean.update(volume)
+        
+        self.ema_short.update(close)
+        self.ema_long.update(close)
+        self.atr.update(high, low, close)
+        self.last_open_time = open_time
+    
+    def trend_filter(self):
+        """Trend filter from the current EMAs"""
+        return trend_filter_from_emas(self.ema_short.value, self.ema_long.value, self.config)
+    
+    def leverage(self, current_price):
+        """Dynamic leverage from the current ATR"""
+        return leverage_from_atr(self.atr.value, current_price, self.config)
+    
+    def copy(self):
+        """Independent copy (e.g. to apply a still-forming candle)"""
+        return copy.deepcopy(self)
+    
+    @classmethod
+    def from_history(cls, high, low, close, volume, open_time=None, config=TRITON73_CONFIG):
+        """Seed from candle history arrays"""
+        state = cls(config)
+        open_times = open_time if open_time is not None else [None] * len(close)
+        for h, l, c, v, t in zip(high, low, close, volume, open_times):
+            state.update(float(h), float(l), float(c), float(v), None if t is None else int(t))
+        return state
+    
+    def to_dict(self):
+        """Serialize state"""
+        return {
+            'ema_short': self.ema_short.to_dict(),
+            'ema_long': self.ema_long.to_dict(),
+            'atr': self.atr.to_dict(),
+            'volume_mean': self.volume_mean.to_dict(),
+            'volume_confirmed': self.volume_confirmed,
+            'last_open_time': self.last_open_time
+        }
+    
+    @classmethod
+    def from_dict(cls, data, config=TRITON73_CONFIG):
+        """Restore serialized state"""
+        state = cls(config)
+        state.ema_short = EMAState.from_dict(data['ema_short'])
+        state.ema_long = EMAState.from_dict(data['ema_long'])
+        state.atr = ATRState.from_dict(data['atr'])
+        state.volume_mean = RollingMeanState.from_dict(data['volume_mean'])
+        state.volume_confirmed = data['volume_confirmed']
+        state.last_open_time = data['last_open_time']
+        return state
 
 
-def check_breakout_enhanced(df, level, trend_filter, use_second_confirmation=True):
-    """Enhanced breakout check with all filters"""
+def advance_indicator_state(state, df, config=TRITON73_CONFIG):
+    """Bring the persisted indicator state up to date with df
+    
+    Only closed candles newer than the last stored one are fed in; the last
+    row of df is the still-forming candle and is applied to a copy. The
+    state is re-seeded from df when nothing usable is stored (or it was
+    built for other EMA periods). Returns the indicators including the
+    current candle.
+    """
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    volume = df['volume'].to_numpy(dtype=float)
+    open_time = df['open_time'].dt.as_unit('ms').astype('int64').to_numpy()
+    
+    indicators = None
+    if state.get('indicators'):
+        try:
+            indicators = IndicatorState.from_dict(state['indicators'], config)
+        except (KeyError, TypeError):
+            indicators = None
+    if indicators and (indicators.ema_short.period, indicators.ema_long.period) != (config.ema_short, config.ema_long):
+        indicators = None
+    
+    last = indicators.last_open_time if indicators else None
+    if last is None or last < open_time[0]:
+        # Nothing stored, or a gap larger than the fetched history
+        indicators = IndicatorState.from_history(high[:-1], low[:-1], close[:-1], volume[:-1], open_time[:-1], config)
+    else:
+        for i in range(len(df) - 1):
+            if open_time[i] > last:
+                indicators.update(float(high[i]), float(low[i]), float(close[i]), float(volume[i]), int(open_time[i]))
+    
+    state['indicators'] = indicators.to_dict()
+    
+    current = indicators.copy()
+    current.update(float(high[-1]), float(low[-1]), float(close[-1]), float(volume[-1]), int(open_time[-1]))
+    return current
+
+
+def check_breakout_enhanced(df, level, trend_filter, use_second_confirmation=True, config=TRITON73_CONFIG):
+    """Enhanced breakout check with all filters (signal on the last candle of df)"""
     if level is None or not level.get('valid', False):
         return None
     
     if len(df) < 3:
         return None
     
-    # For second confirmation, we need to check previous candle for breakout
-    # and current candle for confirmation
+    # Last 3 candles plus the 20 before them for the volume mean
+    window = df.iloc[-22:]
+    return check_breakout_window(
+        window['close'].to_numpy(dtype=float),
+        window['high'].to_numpy(dtype=float),
+        window['low'].to_numpy(dtype=float),
+        volume_confirmation_batch(window['volume'], config),
+        level, trend_filter, window['open_time'].iloc[-1], use_second_confirmation, config
+    )
+
+
+def check_breakout_window(close, high, low, volume_confirmed, level, trend_filter, entry_time,
+                          use_second_confirmation=True, config=TRITON73_CONFIG):
+    """Breakout signal dict for the last candle of small candle arrays (via the batch check)"""
+    if level is None or not level.get('valid', False):
+        return None
+    
+    n = len(close)
+    level_index = {
+        'price': np.full(n, level['price']),
+        'decay_factor': np.full(n, level['decay_factor']),
+        'valid': np.full(n, True)
+    }
+    batch = check_breakout_batch(
+        close, high, low, volume_confirmed, level_index,
+        np.full(n, trend_filter['long_allowed']), np.full(n, trend_filter['short_allowed']),
+        use_second_confirmation, config
+    )
+    
+    i = n - 1
+    if batch['side'][i] == 0:
+        return None
+    
+    return {
+        'side': 'LONG' if batch['side'][i] > 0 else 'SHORT',
+        'entry': float(batch['entry'][i]),
+        'stop_loss': float(batch['stop_loss'][i]),
+        'take_profit': float(batch['take_profit'][i]),
+        'risk_pct': float(batch['risk_pct'][i]),
+        'reward_pct': float(batch['reward_pct'][i]),
+        'level': level['price'],
+        'breakout': float(batch['breakout'][i]),
+        'current_price': float(close[i]),
+        'entry_time': entry_time,
+        'volume_confirmed': bool(batch['volume_confirmed'][i]),
+        'trend_aligned': True,
+        'level_decay_applied': bool(batch['level_decay_applied'][i])
+    }
+
+
+def volume_confirmation_batch(volume, config=TRITON73_CONFIG):
+    """Volume confirmation for every candle (volume vs mean of the previous 20)"""
+    volume = np.asarray(volume, dtype=float)
+    avg_volume = pd.Series(volume).rolling(window=20).mean().shift(1).to_numpy()
+    return (np.arange(len(volume)) >= 20) & (volume > avg_volume * config.volume_confirmation_multiplier)
+
+
+def check_breakout_batch(close, high, low, volume_confirmed, level_index, long_allowed, short_allowed,
+                         use_second_confirmation=True, config=TRITON73_CONFIG):
+    """Enhanced breakout check for every candle index at once
+    
+    Index i of each returned array holds the signal for the candles up to i
+    (side: 1 LONG, -1 SHORT, 0 none; prices are only meaningful where
+    side != 0). level_index is the dict from build_level_index(), the trend
+    masks come from the EMA filter.
+    """
+    close = np.asarray(close, dtype=float)
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    volume_confirmed = np.asarray(volume_confirmed, dtype=bool)
+    n = len(close)
+    breakout_pct = config.breakout_confirmation_pct
+    level_price = level_index['price']
+    decay_factor = level_index['decay_factor']
+    usable = level_index['valid'] & (np.arange(n) >= 2)
+    
+    close_1 = np.full(n, np.nan)
+    close_1[1:] = close[:-1]
+    close_2 = np.full(n, np.nan)
+    close_2[2:] = close[:-2]
+    
     if use_second_confirmation:
-        # Check if breakout happened in previous candle
-        prev_candle = df.iloc[-2]
-        prev_prev_candle = df.iloc[-3] if len(df) >= 3 else None
-        curr_candle = df.iloc[-1]
-        
-        if prev_prev_candle is None:
-            return None
-        
-        prev_prev_close = float(prev_prev_candle['close'])
-        prev_close = float(prev_candle['close'])
-        curr_close = float(curr_candle['close'])
-        level_price = level['price']
-        
-        # LONG: Check if breakout happened in prev candle, confirm in current
-        if prev_prev_close <= level_price and prev_close > level_price:
-            # Breakout detected in prev candle, now check confirmation
-            if curr_close > prev_close:  # Price continued up
-                breakout_amount = (prev_close - level_price) / level_price
-                if breakout_amount >= BREAKOUT_CONFIRMATION_PCT:
-                    # Check trend filter
-                    if not trend_filter['long_allowed']:
-                        return None
-                    
-                    # Check volume confirmation
-                    volume_confirmed = check_volume_confirmation(df, len(df) - 2)
-                    
-                    entry_price = level_price * (1 + BREAKOUT_CONFIRMATION_PCT * 0.5)
-                    risk_from_level = entry_price - level_price
-                    risk_minimum = entry_price * SL_PCT
-                    risk_distance = max(risk_from_level, risk_minimum) * level['decay_factor']
-                    
-                    sl_price = entry_price - risk_distance
-                    tp_price = entry_price + (risk_distance * TP_MULTIPLIER)
-                    
-                    return {
-                        'side': 'LONG',
-                        'entry': entry_price,
-                        'stop_loss': sl_price,
-                        'take_profit': tp_price,
-                        'risk_pct': (risk_distance / entry_price) * 100,
-                        'reward_pct': ((tp_price - entry_price) / entry_price) * 100,
-                        'level': level_price,
-                        'breakout': breakout_amount * 100,
-                        'current_price': curr_close,
-                        'entry_time': curr_candle['open_time'],
-                        'volume_confirmed': volume_confirmed,
-                        'trend_aligned': True,
-                        'level_decay_applied': level['decay_factor'] < 1.0
-                    }
-        
-        # SHORT: Check if breakout happened in prev candle, confirm in current
-        elif prev_prev_close >= level_price and prev_close < level_price:
-            # Breakout detected in prev candle, now check confirmation
-            if curr_close < prev_close:  # Price continued down
-                breakout_amount = (level_price - prev_close) / level_price
-                if breakout_amount >= BREAKOUT_CONFIRMATION_PCT:
-                    # Check trend filter
-                    if not trend_filter['short_allowed']:
-                        return None
-                    
-                    # Check volume confirmation
-                    volume_confirmed = check_volume_confirmation(df, len(df) - 2)
-                    
-                    entry_price = level_price * (1 - BREAKOUT_CONFIRMATION_PCT * 0.5)
-                    risk_from_level = level_price - entry_price
-                    risk_minimum = entry_price * SL_PCT
-                    risk_distance = max(risk_from_level, risk_minimum) * level['decay_factor']
-                    
-                    sl_price = entry_price + risk_distance
-                    tp_price = entry_price - (risk_distance * TP_MULTIPLIER)
-                    
-                    return {
-                        'side': 'SHORT',
-                        'entry': entry_price,
-                        'stop_loss': sl_price,
-                        'take_profit': tp_price,
-                        'risk_pct': (risk_distance / entry_price) * 100,
-                        'reward_pct': ((entry_price - tp_price) / entry_price) * 100,
-                        'level': level_price,
-                        'breakout': breakout_amount * 100,
-                        'current_price': curr_close,
-                        'entry_time': curr_candle['open_time'],
-                        'volume_confirmed': volume_confirmed,
-                        'trend_aligned': True,
-                        'level_decay_applied': level['decay_factor'] < 1.0
-                    }
+        # Breakout in the previous candle, confirmed by the current candle
+        long_break = (close_2 <= level_price) & (close_1 > level_price) & (close > close_1)
+        short_break = (close_2 >= level_price) & (close_1 < level_price) & (close < close_1)
+        long_amount = (close_1 - level_price) / level_price
+        short_amount = (level_price - close_1) / level_price
+        # Volume is checked on the breakout (previous) candle
+        signal_volume = np.zeros(n, dtype=bool)
+        signal_volume[1:] = volume_confirmed[:-1]
     else:
         # Original single-candle logic (for comparison)
-        prev_candle = df.iloc[-2]
-        curr_candle = df.iloc[-1]
-        
-        prev_close = float(prev_candle['close'])
-        curr_close = float(curr_candle['close'])
-        curr_high = float(curr_candle['high'])
-        curr_low = float(curr_candle['low'])
-        level_price = level['price']
-        
-        # LONG breakout
-        if prev_close <= level_price and curr_close > level_price:
-            breakout_amount = (curr_close - level_price) / level_price
-            if breakout_amount >= BREAKOUT_CONFIRMATION_PCT:
-                if curr_high >= level_price * (1 + BREAKOUT_CONFIRMATION_PCT * 0.5):
-                    if not trend_filter['long_allowed']:
-                        return None
-                    
-                    volume_confirmed = check_volume_confirmation(df, len(df) - 1)
-                    
-                    entry_price = level_price * (1 + BREAKOUT_CONFIRMATION_PCT * 0.5)
-                    risk_from_level = entry_price - level_price
-                    risk_minimum = entry_price * SL_PCT
-                    risk_distance = max(risk_from_level, risk_minimum) * level['decay_factor']
-                    
-                    sl_price = entry_price - risk_distance
-                    tp_price = entry_price + (risk_distance * TP_MULTIPLIER)
-                    
-                    return {
-                        'side': 'LONG',
-                        'entry': entry_price,
-                        'stop_loss': sl_price,
-                        'take_profit': tp_price,
-                        'risk_pct': (risk_distance / entry_price) * 100,
-                        'reward_pct': ((tp_price - entry_price) / entry_price) * 100,
-                        'level': level_price,
-                        'breakout': breakout_amount * 100,
-                        'current_price': curr_close,
-                        'entry_time': curr_candle['open_time'],
-                        'volume_confirmed': volume_confirmed,
-                        'trend_aligned': True,
-                        'level_decay_applied': level['decay_factor'] < 1.0
-                    }
-        
-        # SHORT breakout
-        elif prev_close >= level_price and curr_close < level_price:
-            breakout_amount = (level_price - curr_close) / level_price
-            if breakout_amount >= BREAKOUT_CONFIRMATION_PCT:
-                if curr_low <= level_price * (1 - BREAKOUT_CONFIRMATION_PCT * 0.5):
-                    if not trend_filter['short_allowed']:
-                        return None
-                    
-                    volume_confirmed = check_volume_confirmation(df, len(df) - 1)
-                    
-                    entry_price = level_price * (1 - BREAKOUT_CONFIRMATION_PCT * 0.5)
-                    risk_from_level = level_price - entry_price
-                    risk_minimum = entry_price * SL_PCT
-                    risk_distance = max(risk_from_level, risk_minimum) * level['decay_factor']
-                    
-                    sl_price = entry_price + risk_distance
-                    tp_price = entry_price - (risk_distance * TP_MULTIPLIER)
-                    
-                    return {
-                        'side': 'SHORT',
-                        'entry': entry_price,
-                        'stop_loss': sl_price,
-                        'take_profit': tp_price,
-                        'risk_pct': (risk_distance / entry_price) * 100,
-                        'reward_pct': ((entry_price - tp_price) / entry_price) * 100,
-                        'level': level_price,
-                        'breakout': breakout_amount * 100,
-                        'current_price': curr_close,
-                        'entry_time': curr_candle['open_time'],
-                        'volume_confirmed': volume_confirmed,
-                        'trend_aligned': True,
-                        'level_decay_applied': level['decay_factor'] < 1.0
-                    }
+        long_break = (
+            (close_1 <= level_price) & (close > level_price) &
+            (high >= level_price * (1 + breakout_pct * 0.5))
+        )
+        short_break = (
+            (close_1 >= level_price) & (close < level_price) &
+            (low <= level_price * (1 - breakout_pct * 0.5))
+        )
+        long_amount = (close - level_price) / level_price
+        short_amount = (level_price - close) / level_price
+        signal_volume = volume_confirmed
     
-    return None
+    # Breakout size and trend filter
+    is_long = usable & long_break & (long_amount >= breakout_pct) & long_allowed
+    is_short = usable & short_break & (short_amount >= breakout_pct) & short_allowed
+    side = np.where(is_long, 1, np.where(is_short, -1, 0)).astype(np.int8)
+    
+    entry = np.where(is_long, level_price * (1 + breakout_pct * 0.5),
+                     level_price * (1 - breakout_pct * 0.5))
+    risk_from_level = np.where(is_long, entry - level_price, level_price - entry)
+    risk_minimum = entry * config.sl_pct
+    risk_distance = np.maximum(risk_from_level, risk_minimum) * decay_factor
+    
+    stop_loss = np.where(is_long, entry - risk_distance, entry + risk_distance)
+    take_profit = np.where(is_long, entry + (risk_distance * config.tp_multiplier),
+                           entry - (risk_distance * config.tp_multiplier))
+    reward = np.where(is_long, take_profit - entry, entry - take_profit)
+    
+    has_signal = side != 0
+    return {
+        'side': side,
+        'entry': entry,
+        'stop_loss': stop_loss,
+        'take_profit': take_profit,
+        'risk_pct': (risk_distance / entry) * 100,
+        'reward_pct': (reward / entry) * 100,
+        'breakout': np.where(is_long, long_amount, short_amount) * 100,
+        'volume_confirmed': signal_volume & has_signal,
+        'level_decay_applied': (decay_factor < 1.0) & has_signal
+    }
+
+
+def maintenance_margin_rate(position_value):
+    """Maintenance margin rate of the risk-limit tier a position value falls in"""
+    for limit, rate in MAINTENANCE_MARGIN_TIERS:
+        if position_value <= limit:
+            return rate
+    return MAINTENANCE_MARGIN_TIERS[-1][1]
+
+
+def calculate_liquidation_price(entry_price, side, leverage, position_value):
+    """Isolated-margin liquidation price: the move that leaves only the maintenance margin
+    
+    In the backtest P&L model (price move x units x leverage) a position
+    with margin value/leverage loses margin minus maintenance margin after
+    a move of (1/leverage - maintenance rate) / leverage.
+    """
+    rate = maintenance_margin_rate(position_value)
+    distance = (1 / leverage - rate) / leverage
+    if side == 'LONG':
+        return entry_price * (1 - distance)
+    return entry_price * (1 + distance)
 
 
-def calculate_position_size(current_capital, entry_price, stop_loss_price, side, leverage, current_price=None, funding_rate=None):
+def calculate_position_size(current_capital, entry_price, stop_loss_price, side, leverage, current_price=None, funding_rate=None,
+                            config=TRITON73_CONFIG):
     """Calculate position size based on risk with liquidation protection and funding rate adjustment"""
-    risk_amount = current_capital * RISK_PER_TRADE_PCT
+    risk_amount = current_capital * config.risk_per_trade_pct
     
     if side == 'LONG':
         price_risk = entry_price - stop_loss_price
@@ -551,7 +1031,7 @@ def calculate_position_size(current_capital, entry_price, stop_loss_price, side,
     
     # TRITON73: FUNDING RATE ADJUSTMENT
     # Adjust position size based on funding rate to offset costs
-    if funding_rate is not None:
+    if funding_rate is not None and config.liquidation_protection:
         if funding_rate > 0.001:  # >0.1% per 8h (costly for longs)
             if side == 'LONG':
                 print(f"⚠️  High funding rate ({funding_rate*100:.3f}%): Reducing LONG position by 5%")
@@ -576,22 +1056,22 @@ def calculate_position_size(current_capital, entry_price, stop_loss_price, side,
     
     # TRITON73: LIQUIDATION PROTECTION
     # If price is within 2% of liquidation, reduce position size by 50%
-    if current_price is not None:
-        # Calculate liquidation price (0.5% buffer for safety)
+    liquidation_reduced = False
+    if current_price is not None and config.liquidation_protection:
         if side == 'LONG':
-            liquidation_price = entry_price * (1 - (1 / leverage) - 0.005)  # 0.5% buffer
             # If current price is within 2% of liquidation, reduce position
             if (entry_price * (1 - 0.005)) < current_price * (1 - 0.02):
                 print("⚠️  LIQUIDATION RISK: Reducing position size by 50%")
+                liquidation_reduced = True
                 position_units *= 0.5
                 position_value = position_units * entry_price
                 margin_required = position_value / leverage
                 risk_amount = (position_units * price_risk) / leverage
         else:  # SHORT
-            liquidation_price = entry_price * (1 + (1 / leverage) + 0.005)  # 0.5% buffer
             # If current price is within 2% of liquidation, reduce position
             if (entry_price * (1 + 0.005)) > current_price * (1 + 0.02):
                 print("⚠️  LIQUIDATION RISK: Reducing position size by 50%")
+                liquidation_reduced = True
                 position_units *= 0.5
                 position_value = position_units * entry_price
                 margin_required = position_value / leverage
@@ -601,11 +1081,78 @@ def calculate_position_size(current_capital, entry_price, stop_loss_price, side,
         'position_units': position_units,
         'position_value': position_value,
         'margin_required': margin_required,
-        'risk_amount': risk_amount
+        'risk_amount': risk_amount,
+        'liquidation_price': calculate_liquidation_price(entry_price, side, leverage, position_value),
+        'liquidation_reduced': liquidation_reduced
     }
 
 
-def format_signal_enhanced(symbol, signal, position, current_capital, leverage, trend_filter):
+def find_first_exit(high, low, close, start, side, stop_loss, take_profit, exit_model='intrabar',
+                    ambiguous_rule='pessimistic', resolve_ambiguous=None):
+    """First candle from `start` on where SL or TP is hit, as (index, 'WIN'/'LOSS') or None
+    
+    'intrabar' uses each candle's high/low, 'close' only the close. The
+    candle arrays are searched in growing windows with vectorized masks and
+    argmax. When one candle touches both levels the 'pessimistic' rule
+    books the stop loss; 'finer' calls
+    resolve_ambiguous(index, side, stop_loss, take_profit) which returns
+    'WIN', 'LOSS' or None (unresolved, booked as the stop loss).
+    """
+    if exit_model not in EXIT_MODELS:
+        raise ValueError(f"Unknown exit model '{exit_model}' (expected one of {EXIT_MODELS})")
+    if ambiguous_rule not in AMBIGUOUS_EXIT_RULES:
+        raise ValueError(f"Unknown ambiguous exit rule '{ambiguous_rule}' (expected one of {AMBIGUOUS_EXIT_RULES})")
+    
+    if exit_model == 'close':
+        high = low = close
+    # Prices that touch the stop loss / take profit first
+    sl_prices, tp_prices = (low, high) if side == 'LONG' else (high, low)
+    
+    n = len(close)
+    window = 64
+    lo = start
+    while lo < n:
+        hi = min(n, lo + window)
+        if side == 'LONG':
+            sl_hit = sl_prices[lo:hi] <= stop_loss
+            tp_hit = tp_prices[lo:hi] >= take_profit
+        else:
+            sl_hit = sl_prices[lo:hi] >= stop_loss
+            tp_hit = tp_prices[lo:hi] <= take_profit
+        hit = sl_hit | tp_hit
+        if hit.any():
+            k = int(np.argmax(hit))
+            if not sl_hit[k]:
+                return lo + k, 'WIN'
+            if tp_hit[k] and exit_model == 'intrabar' and ambiguous_rule == 'finer' and resolve_ambiguous:
+                return lo + k, resolve_ambiguous(lo + k, side, stop_loss, take_profit) or 'LOSS'
+            return lo + k, 'LOSS'
+        lo = hi
+        window *= 2
+    
+    return None
+
+
+def find_liquidation(high, low, start, end, side, liquidation_price):
+    """First candle in [start, end] whose adverse extreme reaches liquidation_price, or None
+    
+    LONG positions are liquidated by a candle low at or below the price,
+    SHORT positions by a high at or above it. end=None searches to the last
+    candle. The holding window is checked with one vectorized mask.
+    """
+    stop = len(high) if end is None else min(len(high), end + 1)
+    if start >= stop:
+        return None
+    if side == 'LONG':
+        hit = low[start:stop] <= liquidation_price
+    else:
+        hit = high[start:stop] >= liquidation_price
+    if not hit.any():
+        return None
+    return start + int(np.argmax(hit))
+
+
+def format_signal_enhanced(symbol, signal, position, current_capital, leverage, trend_filter, config=TRITON73_CONFIG):
     """Format enhanced trading signal"""
     side_emoji = "🟢" if signal['side'] == 'LONG' else "🔴"
     
@@ -636,7 +1183,7 @@ def format_signal_enhanced(symbol, signal, position, current_capital, leverage,
 ⚖️ RISK/REWARD:
    Risk:       {signal['risk_pct']:.2f}% (€{position['risk_amount']:,.2f})
    Reward:     {signal['reward_pct']:.2f}%
-   R:R Ratio:  {TP_MULTIPLIER:.1f}:1
+   R:R Ratio:  {config.tp_multiplier:.1f}:1
 
 📈 SIGNAL DETAILS:
    Level:      ${signal['level']:,.2f}
@@ -651,36 +1198,36 @@ def format_signal_enhanced(symbol, signal, position, current_capital, leverage,
     return message.strip()
 
 
-def main():
+def main(config=TRITON73_CONFIG):
     """Main enhanced trading signal generator"""
     # Load state and check drawdown pause
     state = load_strategy_state()
-    if check_drawdown_pause(state):
+    if check_drawdown_pause(state, config):
         print("="*80)
         print("⚠️  STRATEGY IS PAUSED DUE TO DRAWDOWN")
         print("="*80)
         print(f"Current Capital: €{state['current_capital']:,.2f}")
         print(f"Max Equity:      €{state['max_equity']:,.2f}")
         print(f"Drawdown:         {(state['current_capital'] - state['max_equity']) / state['max_equity'] * 100:.2f}%")
-        print(f"Resume when capital reaches: €{state['max_equity'] * DRAWDOWN_RESUME_THRESHOLD:,.2f}")
+        print(f"Resume when capital reaches: €{state['max_equity'] * config.drawdown_resume_threshold:,.2f}")
         print("="*80)
         return
     
     print("="*80)
     print("TRITON73 - MEXC BTCUSDT ENHANCED STRATEGY (SAFER VERSION)")
     print("="*80)
-    print(f"Strategy: Enhanced Breakout with Dynamic Leverage (3.5x base)")
-    print(f"Risk: {RISK_PER_TRADE_PCT*100:.2f}% per trade | Liquidation Protection: ENABLED")
+    print(f"Strategy: Enhanced Breakout with Dynamic Leverage ({config.base_leverage}x base)")
+    print(f"Risk: {config.risk_per_trade_pct*100:.2f}% per trade | Liquidation Protection: {'ENABLED' if config.liquidation_protection else 'DISABLED'}")
     print(f"Interval: {INTERVAL}")
-    print(f"Stop Loss: {SL_PCT*100:.2f}%")
-    print(f"Take Profit: {TP_MULTIPLIER:.1f}:1 R:R")
+    print(f"Stop Loss: {config.sl_pct*100:.2f}%")
+    print(f"Take Profit: {config.tp_multiplier:.1f}:1 R:R")
     print(f"Capital: €{state['current_capital']:,.2f}")
     print("="*80)
     
     print(f"\nChecking {SYMBOL}...")
     
-    # Fetch data
-    klines = fetch_mexc_klines(SYMBOL, INTERVAL)
+    # Fetch data (only candles newer than the local cache are downloaded)
+    klines = fetch_cached_klines(SYMBOL, INTERVAL)
     if not klines:
         print(f"  ⚠ No data for {SYMBOL}")
         return
@@ -691,24 +1238,28 @@ def main():
         return
     
     # Calculate level with decay
-    level = calculate_level_with_decay(df, len(df) - 1)
+    level = calculate_level_with_decay(df, len(df) - 1, config=config)
     if level is None:
         print(f"  ⚠ No valid level found")
         return
     
     print(f"  Level: ${level['price']:,.2f} (age: {level['age_hours']:.1f}h, decay: {level['decay_factor']:.2f})")
     
+    # Update incremental indicators (only new candles since the last run)
+    indicators = advance_indicator_state(state, df, config)
+    save_strategy_state(state)
+    
     # Check trend filter
-    trend_filter = check_trend_filter(df)
+    trend_filter = indicators.trend_filter()
     print(f"  Trend: {trend_filter['trend']} (LONG: {'✅' if trend_filter['long_allowed'] else '❌'}, SHORT: {'✅' if trend_filter['short_allowed'] else '❌'})")
     
     # Calculate dynamic leverage
     current_price = float(df.iloc[-1]['close'])
-    leverage = calculate_dynamic_leverage(df, current_price)
+    leverage = indicators.leverage(current_price)
     print(f"  Dynamic Leverage: {leverage}x (ATR-based)")
     
     # Check for breakout
-    signal = check_breakout_enhanced(df, level, trend_filter, USE_SECOND_CONFIRMATION)
+    signal = check_breakout_enhanced(df, level, trend_filter, config.use_second_confirmation, config)
     
     if signal:
         # Fetch funding rate for position size adjustment
@@ -723,11 +1274,12 @@ def main():
             signal['side'],
             leverage,
             current_price=signal['current_price'],  # Pass current price for liquidation check
-            funding_rate=funding_rate  # Pass funding rate for adjustment
+            funding_rate=funding_rate,  # Pass funding rate for adjustment
+            config=config
         )
         
         if position:
-            message = format_signal_enhanced(SYMBOL, signal, position, state['current_capital'], leverage, trend_filter)
+            message = format_signal_enhanced(SYMBOL, signal, position, state['current_capital'], leverage, trend_filter, config)
             print(message)
             
             # Save position info
@@ -760,8 +1312,8 @@ def main():
             print(f"  ⚠ Could not calculate position size")
     else:
         print(f"  No signal")
-        if level['age_hours'] < MIN_LEVEL_AGE_HOURS:
-            print(f"    (Level too young: {level['age_hours']:.1f}h < {MIN_LEVEL_AGE_HOURS}h)")
+        if level['age_hours'] < config.min_level_age_hours:
+            print(f"    (Level too young: {level['age_hours']:.1f}h < {config.min_level_age_hours}h)")
         if not trend_filter['long_allowed'] and not trend_filter['short_allowed']:
             print(f"    (Trend filter blocking: {trend_filter['trend']})")
     
@@ -27,8 +27,9 @@ from Triton73 import (
     calculate_dynamic_leverage, calculate_level_with_decay,
     check_trend_filter, check_volume_confirmation, check_breakout_enhanced,
     calculate_position_size, load_strategy_state, save_strategy_state,
-    check_drawdown_pause, log_trade, send_telegram, fetch_funding_rate
+    check_drawdown_pause, log_trade, send_telegram, fetch_funding_rate, find_first_exit
 )
+from kline_cache import fetch_cached_klines, get_klines_window
 
 # Paper Trading Files
 PAPER_POSITIONS_FILE = 'paper_positions.json'
@@ -38,6 +39,8 @@ PAPER_STATE_FILE = 'paper_state.json'
 # Paper Trading Settings
 USE_PAPER_TRADING = True
 PAPER_INITIAL_CAPITAL = float(os.environ.get('PAPER_CAPITAL', '1000.0'))
+PAPER_EXIT_INTERVAL = '1m'  # Candles checked for SL/TP touches since entry
+PAPER_AMBIGUOUS_EXIT_RULE = 'pessimistic'  # Candle touching both SL and TP counts as a loss
 
 
 def load_paper_state():
@@ -88,6 +91,40 @@ def get_current_price():
         return None
 
 
+def find_intrabar_exit(position):
+    """First SL/TP touch since entry from the candle high/low, as (result, exit_time) or None
+    
+    Uses PAPER_EXIT_INTERVAL candles from the kline cache, None when no
+    candles are available (the current price check is used then).
+    """
+    try:
+        entry_time = pd.Timestamp(datetime.fromisoformat(position['entry_time']).astimezone()).tz_convert('UTC')
+        start_time = int(entry_time.timestamp() * 1000)
+        klines = get_klines_window(SYMBOL, PAPER_EXIT_INTERVAL, start_time, int(time.time() * 1000))
+    except Exception as e:
+        print(f"⚠️  Could not load {PAPER_EXIT_INTERVAL} candles for exit check: {e}")
+        return None
+    
+    # Only candles that opened after the entry
+    klines = [k for k in klines if k['open_time'] >= start_time]
+    if not klines:
+        return None
+    
+    hit = find_first_exit(
+        np.array([k['high'] for k in klines]),
+        np.array([k['low'] for k in klines]),
+        np.array([k['close'] for k in klines]),
+        0, position['side'], position['stop_loss'], position['take_profit'],
+        'intrabar', PAPER_AMBIGUOUS_EXIT_RULE
+    )
+    if hit is None:
+        return None
+    
+    index, result = hit
+    exit_time = pd.Timestamp(klines[index]['open_time'], unit='ms', tz='UTC').isoformat()
+    return result, exit_time
+
+
 def check_open_positions(paper_state, current_price):
     """Check if any open positions should be closed (TP or SL hit)"""
     if not paper_state['open_positions']:
@@ -109,8 +146,16 @@ def check_open_positions(paper_state, current_price):
         exit_price = None
         result = None
         reason = None
+        exit_time = datetime.now().isoformat()
         
-        if side == 'LONG':
+        # Wicks since entry first, then the current price
+        intrabar_exit = find_intrabar_exit(position)
+        if intrabar_exit:
+            result, exit_time = intrabar_exit
+            exit_price = take_profit if result == 'WIN' else stop_loss
+            reason = 'Take Profit' if result == 'WIN' else 'Stop Loss'
+            should_close = True
+        elif side == 'LONG':
             if current_price <= stop_loss:
                 exit_price = stop_loss
                 result = 'LOSS'
@@ -169,7 +214,7 @@ def check_open_positions(paper_state, current_price):
             # Create trade record
             trade = {
                 'entry_time': entry_time,
-                'exit_time': datetime.now().isoformat(),
+                'exit_time': exit_time,
                 'side': side,
                 'entry': entry,
                 'exit': exit_price,
@@ -347,8 +392,8 @@ def main():
     
     print(f"\nChecking {SYMBOL} for signals...")
     
-    # Fetch data
-    klines = fetch_mexc_klines(SYMBOL, INTERVAL)
+    # Fetch data (only candles newer than the local cache are downloaded)
+    klines = fetch_cached_klines(SYMBOL, INTERVAL)
     if not klines:
         print(f"  ⚠ No data for {SYMBOL}")
         print_paper_stats(paper_state)
@@ -5,104 +5,744 @@ Backtests the complete Triton73 strategy with all enhancements:
 - Funding rate adjustment
 - Slippage modeling
 - All 10 enhanced features
+
+Three engines are available:
+- 'vectorized' (default): precomputes every indicator and signal mask once
+  as NumPy arrays, only capital/position/pause accounting runs per candle
+- 'incremental': feeds candles one at a time through IndicatorState, the
+  same O(1)-per-candle path the live scanner uses
+- 'loop': the original per-candle engine that recomputes indicators on a
+  growing slice (O(n^2), kept as the reference implementation)
+
+The vectorized and incremental engines run in two phases. Signal
+detection does not depend on capital, so phase 1 (generate_signals) can
+split history into chunks processed by parallel workers, each chunk
+starting early enough for the EMAs to converge. Phase 2 runs the cheap
+sequential capital, position, exit and pause accounting over the merged
+signal list.
 """
 
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from functools import lru_cache
+import argparse
+import dataclasses
 import json
+import os
+import sqlite3
+from multiprocessing import Pool
 
 # Import all Triton73 functions
 from Triton73 import (
-    MEXC_API_BASE, SYMBOL, INTERVAL, SESSION_CLOSE_HOUR_UTC,
+    SYMBOL, INTERVAL, SESSION_CLOSE_HOUR_UTC,
     BREAKOUT_CONFIRMATION_PCT, SL_PCT, TP_MULTIPLIER,
     BASE_LEVERAGE, MIN_LEVERAGE, MAX_LEVERAGE, MIN_LEVEL_AGE_HOURS,
     RISK_PER_TRADE_PCT,
     LEVEL_DECAY_24H, LEVEL_DECAY_72H, VOLUME_CONFIRMATION_MULTIPLIER,
     EMA_SHORT, EMA_LONG, DRAWDOWN_PAUSE_THRESHOLD, DRAWDOWN_RESUME_THRESHOLD,
-    USE_SECOND_CONFIRMATION,
-    fetch_mexc_klines, klines_to_df, calculate_atr, calculate_ema,
+    USE_SECOND_CONFIRMATION, StrategyConfig, TRITON73_CONFIG, STRATEGY_PRESETS,
+    EXIT_MODELS, AMBIGUOUS_EXIT_RULES, MAINTENANCE_MARGIN_TIERS,
+    klines_to_df, calculate_atr, calculate_ema,
     calculate_dynamic_leverage, calculate_level_with_decay,
     check_trend_filter, check_volume_confirmation, check_breakout_enhanced,
-    calculate_position_size, fetch_funding_rate
+    calculate_position_size, fetch_funding_rate,
+    IndicatorState, SessionLevelState, build_level_index, find_first_exit,
+    calculate_liquidation_price, maintenance_margin_rate, find_liquidation,
+    volume_confirmation_batch, check_breakout_batch, check_breakout_window
 )
+from kline_cache import KLINE_COLUMNS, download_klines, get_klines_range, get_klines_window
+from candle_store import load_candles, sync_candle_store, iter_candle_chunks, open_candles
+from funding_cache import FUNDING_INTERVAL_MS, get_funding_rates
 
 # Backtest Parameters
 INITIAL_CAPITAL = 1000.0
 SLIPPAGE_PCT = 0.0025  # 0.25% slippage
 FEE_PCT = 0.001  # 0.1% per trade (0.1% entry + 0.1% exit = 0.2% total)
+FUNDING_RATE_ESTIMATE = 0.0001  # 0.01% per 8h average, used when no funding history is available
+WARMUP_CANDLES = 100  # Skip first candles so indicators have enough history
+EXIT_MODEL = 'intrabar'  # SL/TP hit by candle high/low ('close': legacy close-only check)
+AMBIGUOUS_EXIT_RULE = 'pessimistic'  # Candle touching both SL and TP counts as a loss ('finer': 1m drill-down)
+DRILLDOWN_INTERVAL = '1m'  # Finer candles used to resolve ambiguous exits
 
+# Backtest engines
+BACKTEST_ENGINES = ('vectorized', 'incremental', 'loop')
+DEFAULT_ENGINE = 'vectorized'
+SIGNAL_CHUNK_CANDLES = 20000  # Candles per phase-1 worker task
+BACKTEST_CHECKPOINT_FILE = 'triton73_backtest_checkpoint.json'
+STREAM_CHUNK_CANDLES = 100_000  # Candles in memory at a time in a streaming backtest
+BACKTEST_RESULTS_FILE = 'triton73_backtest_results.npz'  # Trades and equity curve; headline metrics in .json
 
-def fetch_historical_funding_rates(symbol, start_time, end_time):
-    """Estimate funding rates for historical period (simplified)"""
-    # In real backtest, you'd fetch historical funding rates
-    # For now, we'll use a simplified model: average 0.01% per 8h
-    # This is a conservative estimate
-    return 0.0001  # 0.01% per 8h average
+# Compact trade and equity records (times in ms, side +1 LONG / -1 SHORT, result 1 WIN / 0 LOSS)
+TRADE_DTYPE = np.dtype([
+    ('entry_time', '<i8'), ('exit_time', '<i8'), ('side', 'i1'), ('entry', '<f8'), ('exit', '<f8'),
+    ('result', 'i1'), ('pnl', '<f8'), ('capital_after', '<f8'), ('leverage', '<f8'), ('liquidated', '?'),
+    ('liquidation_price', '<f8'), ('liquidation_reduced', '?'), ('funding', '<f8')
+])
+EQUITY_DTYPE = np.dtype([('open_time', '<i8'), ('equity', '<f8')])
 
 
-def backtest_triton73(start_date, end_date, initial_capital=INITIAL_CAPITAL):
-    """Backtest Triton73 strategy"""
-    print("="*80)
-    print("TRITON73 BACKTEST")
-    print("="*80)
-    print(f"Period: {start_date} to {end_date}")
-    print(f"Initial Capital: ${initial_capital:,.2f}")
-    print(f"Strategy: Triton73 with all enhancements")
-    print("="*80)
-    print()
+def fetch_historical_funding_rates(symbol, start_time, end_time, update_cache=True):
+    """Funding settlements of the backtest period from the local funding cache
     
-    # Fetch historical data
-    print("📊 Fetching historical data...")
-    start_timestamp = int(datetime.strptime(start_date, '%Y-%m-%d').timestamp() * 1000)
-    end_timestamp = int(datetime.strptime(end_date, '%Y-%m-%d').timestamp() * 1000)
-    
-    # Fetch all klines (MEXC has limited history, so we'll use what's available)
-    all_klines = []
-    limit = 1000
-    current_time = start_timestamp
-    
-    while current_time < end_timestamp:
-        try:
-            url = f"{MEXC_API_BASE}/klines"
-            params = {
-                'symbol': SYMBOL,
-                'interval': INTERVAL,
-                'limit': limit,
-                'startTime': current_time
-            }
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+    start_time and end_time are in ms. Returns a funding_history() dict
+    (starting one settlement early, so the rate in effect at start_time is
+    known), or None when no history is available; backtests then charge
+    FUNDING_RATE_ESTIMATE at every 8h boundary. 8h boundaries of the period
+    without a stored settlement are charged FUNDING_RATE_ESTIMATE too.
+    """
+    start_time -= FUNDING_INTERVAL_MS
+    try:
+        funding_time, funding_rate = get_funding_rates(symbol, start_time, end_time, update=update_cache)
+    except sqlite3.Error as e:
+        print(f"⚠️  Funding cache unavailable ({e}), using {FUNDING_RATE_ESTIMATE*100:.3f}% per 8h")
+        return None
+    if len(funding_time) == 0:
+        print(f"⚠️  No funding history for {symbol}, using {FUNDING_RATE_ESTIMATE*100:.3f}% per 8h")
+        return None
+    
+    missing = missing_settlements(funding_time, start_time, end_time)
+    if len(missing):
+        print(f"⚠️  {len(missing)} {symbol} funding settlements missing from the cache, "
+              f"using {FUNDING_RATE_ESTIMATE*100:.3f}% per 8h for them")
+        order = np.argsort(np.concatenate((funding_time, missing)), kind='stable')
+        funding_time = np.concatenate((funding_time, missing))[order]
+        funding_rate = np.concatenate((funding_rate, np.full(len(missing), FUNDING_RATE_ESTIMATE)))[order]
+    return funding_history(funding_time, funding_rate)
+
+
+def missing_settlements(funding_time, start_time, end_time):
+    """8h boundaries in [start_time, end_time] (ms) with no settlement within half an interval"""
+    grid = np.arange(-(-start_time // FUNDING_INTERVAL_MS) * FUNDING_INTERVAL_MS, end_time + 1, FUNDING_INTERVAL_MS,
+                     dtype=np.int64)
+    k = np.searchsorted(funding_time, grid - FUNDING_INTERVAL_MS // 2, side='left')
+    nearest = funding_time[np.minimum(k, len(funding_time) - 1)]
+    covered = (k < len(funding_time)) & (nearest < grid + FUNDING_INTERVAL_MS // 2)
+    return grid[~covered]
+
+
+def funding_history(funding_time, funding_rate):
+    """Funding settlements (ms, rate per 8h) as the dict the backtests join positions against"""
+    funding_rate = np.asarray(funding_rate, dtype=float)
+    return {
+        'funding_time': np.asarray(funding_time, dtype=np.int64),
+        'funding_rate': funding_rate,
+        'cumulative': np.concatenate(([0.0], np.cumsum(funding_rate)))
+    }
+
+
+def funding_rate_at(funding, time_ms):
+    """Latest funding rate settled at or before time_ms (scalar or array of ms)
+    
+    funding is a funding_history() dict, a constant rate per 8h, or None
+    (FUNDING_RATE_ESTIMATE). Times before the first settlement get
+    FUNDING_RATE_ESTIMATE.
+    """
+    if not isinstance(funding, dict):
+        rate = FUNDING_RATE_ESTIMATE if funding is None else funding
+        rates = np.full(np.shape(time_ms), rate, dtype=float)
+    else:
+        k = np.searchsorted(funding['funding_time'], time_ms, side='right') - 1
+        rates = np.where(k >= 0, funding['funding_rate'][np.maximum(k, 0)], FUNDING_RATE_ESTIMATE)
+    return rates if rates.ndim else float(rates)
+
+
+def funding_accrued(funding, entry_ms, exit_ms):
+    """Summed funding rates of the settlements in (entry_ms, exit_ms], vectorized over positions
+    
+    One binary search per interval end on the cumulative rates. Without
+    history every 8h boundary (00:00, 08:00, 16:00 UTC) crossed is charged
+    the constant rate.
+    """
+    entry_ms = np.asarray(entry_ms, dtype=np.int64)
+    exit_ms = np.asarray(exit_ms, dtype=np.int64)
+    if not isinstance(funding, dict):
+        rate = FUNDING_RATE_ESTIMATE if funding is None else funding
+        accrued = (exit_ms // FUNDING_INTERVAL_MS - entry_ms // FUNDING_INTERVAL_MS) * rate
+    else:
+        cumulative = funding['cumulative']
+        accrued = (cumulative[np.searchsorted(funding['funding_time'], exit_ms, side='right')]
+                   - cumulative[np.searchsorted(funding['funding_time'], entry_ms, side='right')])
+    return accrued if np.ndim(accrued) else float(accrued)
+
+
+def fetch_backtest_klines(start_date, end_date, update_cache=True, symbol=SYMBOL):
+    """Historical klines for the backtest period (UTC dates) as a DataFrame
+    
+    Mapped from the columnar candle store, which is synced from the local
+    kline cache first; only candles missing from it are downloaded (none
+    with update_cache=False, e.g. offline).
+    """
+    start_timestamp = int(pd.Timestamp(start_date, tz='UTC').timestamp() * 1000)
+    end_timestamp = int(pd.Timestamp(end_date, tz='UTC').timestamp() * 1000)
+    
+    return load_candles(symbol, INTERVAL, start_timestamp, end_timestamp, update=update_cache)
+
+
+def precompute_indicators(df, config=TRITON73_CONFIG):
+    """Precompute all Triton73 indicators and signal masks as NumPy arrays
+    
+    Index i of every array holds the value the scalar functions return for
+    df.iloc[:i+1] (EMA trend, ATR leverage, session level with decay,
+    volume confirmation and the breakout signal).
+    """
+    n = len(df)
+    idx = np.arange(n)
+    close = df['close'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    volume = df['volume'].to_numpy(dtype=float)
+    
+    # Trend filter (EMA crossover), neutral until EMA_LONG candles exist
+    ema_short = df['close'].ewm(span=config.ema_short, adjust=False).mean().to_numpy()
+    ema_long = df['close'].ewm(span=config.ema_long, adjust=False).mean().to_numpy()
+    trend_ready = (idx >= max(config.ema_short, config.ema_long) - 1) & config.use_trend_filter
+    bullish = ema_short > ema_long
+    long_allowed = ~trend_ready | bullish
+    short_allowed = ~trend_ready | ~bullish
+    
+    # Dynamic leverage from ATR(14), unrounded (rounded when a trade is opened)
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    atr = pd.Series(tr).rolling(window=14).mean().to_numpy()
+    atr = np.where(idx >= 14, atr, np.nan)
+    normalized_atr = (atr / close) * 100
+    leverage = config.base_leverage * (1 + (0.5 - normalized_atr / 2.0))
+    leverage = np.maximum(config.min_leverage, np.minimum(config.max_leverage, leverage))
+    leverage = np.where(normalized_atr > 2.0, config.min_leverage, leverage)
+    leverage = np.where(normalized_atr < 0.8, config.max_leverage, leverage)
+    leverage = np.where(np.isnan(atr) | (atr == 0), config.base_leverage, leverage)
+    
+    # Session level with decay, forward-filled to every candle
+    level_index = build_level_index(df, config)
+    
+    # Breakout signals for every candle
+    volume_confirmed = volume_confirmation_batch(volume, config)
+    signals = check_breakout_batch(close, high, low, volume_confirmed, level_index,
+                                   long_allowed, short_allowed, config.use_second_confirmation, config)
+    
+    return {
+        'close': close,
+        'high': high,
+        'low': low,
+        'volume': volume,
+        'ema_short': ema_short,
+        'ema_long': ema_long,
+        'long_allowed': long_allowed,
+        'short_allowed': short_allowed,
+        'atr': atr,
+        'leverage': leverage,
+        'volume_confirmed': volume_confirmed,
+        'level_price': level_index['price'],
+        'level_age_hours': level_index['age_hours'],
+        'decay_factor': level_index['decay_factor'],
+        'level_ok': level_index['valid'],
+        'signal_side': signals['side'],
+        'signal_entry': signals['entry'],
+        'signal_stop_loss': signals['stop_loss'],
+        'signal_take_profit': signals['take_profit'],
+        'signal_breakout': signals['breakout'],
+        'signal_volume_confirmed': signals['volume_confirmed']
+    }
+
+
+def _beyond(side, price, level):
+    """Whether price lies at or past level in the direction that loses a `side` position"""
+    return price <= level if side == 'LONG' else price >= level
+
+
+def _exit_price(position, result, slippage_pct=None, open_price=None):
+    """SL or TP price of a closed position after slippage (default SLIPPAGE_PCT)
+    
+    open_price: open of the exit candle when the stop rests on the book
+    (intrabar exit model). A stop the candle opens beyond fills at the open.
+    """
+    slippage_pct = SLIPPAGE_PCT if slippage_pct is None else slippage_pct
+    exit_price = position['take_profit'] if result == 'WIN' else position['stop_loss']
+    if result == 'LOSS' and open_price is not None and _beyond(position['side'], open_price, exit_price):
+        exit_price = open_price
+    if position['side'] == 'LONG':
+        return exit_price * (1 - slippage_pct)
+    return exit_price * (1 + slippage_pct)
+
+
+def _position_pnl(position, exit_price, fee_pct=None):
+    """Net P&L of closing a position at exit_price (after fees, default FEE_PCT)"""
+    fee_pct = FEE_PCT if fee_pct is None else fee_pct
+    entry = position['entry']
+    position_units = position['position_units']
+    leverage = position['leverage']
+    
+    if position['side'] == 'LONG':
+        pnl_amount = position_units * (exit_price - entry) * leverage
+    else:
+        pnl_amount = position_units * (entry - exit_price) * leverage
+    
+    fees = (position_units * entry + position_units * exit_price) * fee_pct
+    return pnl_amount - fees
+
+
+def _liquidation_pnl(position, fee_pct=None):
+    """Net P&L of a liquidated position: its whole margin plus fees
+    
+    _position_pnl() at the liquidation price leaves the maintenance margin,
+    which is lost as well.
+    """
+    position_value = position['position_units'] * position['entry']
+    return (_position_pnl(position, position['liquidation_price'], fee_pct)
+            - position_value * maintenance_margin_rate(position_value))
+
+
+def _position_liquidation_price(position):
+    """Liquidation price of an open position (slipped entry, leverage and risk-limit tier)"""
+    return calculate_liquidation_price(
+        position['entry'], position['side'], position['leverage'], position['position_units'] * position['entry']
+    )
+
+
+def _stop_fills_first(position, candle_open, exit_model):
+    """Whether an SL/TP exit on a candle that also reaches the liquidation price comes first
+    
+    Only a stop resting on the book (intrabar exit model) inside the
+    liquidation price does, and only if the candle does not open at or
+    beyond the liquidation price. Close-model exits happen at the close,
+    after the candle range reached the liquidation price.
+    """
+    side = position['side']
+    liquidation_price = position['liquidation_price']
+    if exit_model != 'intrabar' or _beyond(side, candle_open, liquidation_price):
+        return False
+    return not _beyond(side, position['stop_loss'], liquidation_price)
+
+
+def _liquidation_exit(open_, high, low, start, position, exit_at, exit_model=EXIT_MODEL):
+    """exit_at of a position opened before candle `start`, moved to its liquidation if that comes first
+    
+    Liquidation is checked against each candle's high/low over the holding
+    window (whatever the exit model); on the SL/TP exit candle itself see
+    _stop_fills_first(). Returns (index, 'LIQUIDATED'), exit_at or None.
+    """
+    k = find_liquidation(high, low, start, exit_at[0] if exit_at else None, position['side'],
+                         position['liquidation_price'])
+    if k is None:
+        return exit_at
+    if exit_at and k == exit_at[0] and _stop_fills_first(position, open_[k], exit_model):
+        return exit_at
+    return k, 'LIQUIDATED'
+
+
+def _funding_payment(position, accrued):
+    """Funding a position pays for the summed funding rates `accrued` (negative when it receives funding)"""
+    cost = accrued * position['position_units'] * position['entry']
+    return cost if position['side'] == 'LONG' else -cost
+
+
+def _run_accounting(df, initial_capital, signals, config=TRITON73_CONFIG, exit_model=EXIT_MODEL,
+                    ambiguous_rule=AMBIGUOUS_EXIT_RULE, resolve_ambiguous=None, resume=None, on_checkpoint=None,
+                    funding=None, slippage_pct=None, fee_pct=None):
+    """Path-dependent capital, position and drawdown-pause accounting
+    
+    `signals` yields one entry per candle: None, or a dict with side, entry,
+    stop_loss, take_profit and leverage. Signal detection never depends on
+    capital, so engines only differ in how they produce this sequence.
+    The exit candle of each position is found once, when it is opened.
+    
+    funding: fetch_historical_funding_rates() history (None: constant
+    FUNDING_RATE_ESTIMATE). Each signal is sized with the rate in effect
+    at its candle, and a position pays the settlements from the open of
+    the candle after its signal up to the open of its exit candle.
+    slippage_pct and fee_pct default to SLIPPAGE_PCT and FEE_PCT.
+    
+    resume: accounting state of a checkpoint to continue from (df then
+    holds the candles after it). on_checkpoint(state) receives the state
+    after the second-to-last candle of df.
+    """
+    pause_threshold = config.drawdown_pause_threshold
+    slippage_pct = SLIPPAGE_PCT if slippage_pct is None else slippage_pct
+    fee_pct = FEE_PCT if fee_pct is None else fee_pct
+    open_ = df['open'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close_array = df['close'].to_numpy(dtype=float)
+    close = close_array.tolist()
+    open_time = df['open_time']
+    open_time_ms = open_time.dt.as_unit('ms').astype('int64').tolist()
+    n = len(close)
+    exit_at = None
+    
+    capital = initial_capital
+    max_equity = initial_capital
+    current_position = None
+    trades = []
+    paused = False
+    total_trades = 0
+    winning_trades = 0
+    losing_trades = 0
+    total_pnl = 0.0
+    offset = 0  # Candles processed before df (resumed runs)
+    
+    if resume:
+        offset = resume['candles']
+        capital = resume['capital']
+        max_equity = resume['max_equity']
+        paused = resume['paused']
+        trades = list(resume['trades'])
+        total_trades = resume['total_trades']
+        winning_trades = resume['winning_trades']
+        losing_trades = resume['losing_trades']
+        total_pnl = resume['total_pnl']
+        current_position = dict(resume['position']) if resume['position'] else None
+        if current_position:
+            # Not hit up to the checkpoint, so the first touch is in df
+            exit_at = _liquidation_exit(open_, high, low, 0, current_position, find_first_exit(
+                high, low, close_array, 0, current_position['side'], current_position['stop_loss'],
+                current_position['take_profit'], exit_model, ambiguous_rule, resolve_ambiguous
+            ), exit_model)
+    
+    for i, signal in enumerate(signals):
+        if on_checkpoint and i == n - 1:
+            on_checkpoint({
+                'candles': offset + i,
+                'capital': capital,
+                'max_equity': max_equity,
+                'paused': paused,
+                'position': dict(current_position) if current_position else None,
+                'total_trades': total_trades,
+                'winning_trades': winning_trades,
+                'losing_trades': losing_trades,
+                'total_pnl': total_pnl,
+                'trades': list(trades)
+            })
+        if offset + i < WARMUP_CANDLES:
+            continue
+        current_price = close[i]
+        
+        # Check drawdown pause
+        if capital > max_equity:
+            max_equity = capital
+        
+        drawdown = (capital - max_equity) / max_equity if max_equity > 0 else 0
+        if pause_threshold is not None and drawdown <= -pause_threshold:
+            if not paused:
+                print(f"⏸️  Strategy paused at {drawdown*100:.2f}% drawdown (candle {offset + i})")
+                paused = True
+        elif paused and capital >= max_equity * config.drawdown_resume_threshold:
+            print(f"▶️  Strategy resumed (candle {offset + i})")
+            paused = False
+        
+        # Exits are checked even while paused
+        closed = False
+        if current_position and exit_at and exit_at[0] == i:
+            liquidated = exit_at[1] == 'LIQUIDATED'
+            if liquidated:
+                # The margin loss already covers the funding paid so far
+                result = 'LOSS'
+                exit_price = current_position['liquidation_price']
+                funding_paid = 0.0
+                net_pnl = _liquidation_pnl(current_position, fee_pct)
+            else:
+                result = exit_at[1]
+                exit_price = _exit_price(current_position, result, slippage_pct,
+                                         open_[i] if exit_model == 'intrabar' else None)
+                funding_paid = _funding_payment(
+                    current_position, funding_accrued(funding, current_position['funding_from'], open_time_ms[i])
+                )
+                net_pnl = _position_pnl(current_position, exit_price, fee_pct) - funding_paid
+            
+            capital += net_pnl
+            total_pnl += net_pnl
+            total_trades += 1
             
-            if not data:
-                break
+            if result == 'WIN':
+                winning_trades += 1
+            else:
+                losing_trades += 1
             
-            all_klines.extend(data)
-            current_time = data[-1][0] + 1  # Next start time
+            trades.append({
+                'entry_time': current_position['entry_time'],
+                'exit_time': open_time.iloc[i],
+                'side': current_position['side'],
+                'entry': current_position['entry'],
+                'exit': exit_price,
+                'result': result,
+                'pnl': net_pnl,
+                'capital_after': capital,
+                'leverage': current_position['leverage'],
+                'liquidated': liquidated,
+                'liquidation_price': current_position['liquidation_price'],
+                'liquidation_reduced': current_position['liquidation_reduced'],
+                'funding': funding_paid
+            })
+            
+            current_position = None
+            closed = True
+        
+        if paused or closed:
+            continue
+        
+        # New signal (never on the last candle)
+        if signal and i < n - 1:
+            position = calculate_position_size(
+                capital,
+                signal['entry'],
+                signal['stop_loss'],
+                signal['side'],
+                signal['leverage'],
+                current_price=current_price,
+                funding_rate=funding_rate_at(funding, open_time_ms[i]),
+                config=config
+            )
             
-            if len(data) < limit:
-                break
-        except Exception as e:
-            print(f"⚠️  Error fetching data: {e}")
-            break
+            if position:
+                # Apply slippage to entry
+                entry_with_slippage = signal['entry']
+                if signal['side'] == 'LONG':
+                    entry_with_slippage *= (1 + slippage_pct)
+                else:
+                    entry_with_slippage *= (1 - slippage_pct)
+                
+                current_position = {
+                    'entry_time': open_time.iloc[i],
+                    'side': signal['side'],
+                    'entry': entry_with_slippage,
+                    'stop_loss': signal['stop_loss'],
+                    'take_profit': signal['take_profit'],
+                    'position_units': position['position_units'],
+                    'leverage': signal['leverage'],
+                    'liquidation_reduced': position['liquidation_reduced'],
+                    'funding_from': open_time_ms[i + 1]
+                }
+                current_position['liquidation_price'] = _position_liquidation_price(current_position)
+                exit_at = _liquidation_exit(open_, high, low, i + 1, current_position, find_first_exit(
+                    high, low, close_array, i + 1, signal['side'], signal['stop_loss'], signal['take_profit'],
+                    exit_model, ambiguous_rule, resolve_ambiguous
+                ), exit_model)
     
-    if not all_klines:
-        print("❌ No data fetched")
-        return None
+    return {
+        'capital': capital,
+        'max_equity': max_equity,
+        'total_trades': total_trades,
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+        'total_pnl': total_pnl,
+        'trades': trades
+    }
+
+
+def signals_from_indicators(indicators):
+    """Per-candle signal list from precompute_indicators() arrays"""
+    signals = [None] * len(indicators['close'])
     
-    # Convert to DataFrame
-    df = klines_to_df(all_klines)
-    df = df[df['open_time'] >= pd.Timestamp(start_date)]
-    df = df[df['open_time'] <= pd.Timestamp(end_date)]
+    for i in np.flatnonzero(indicators['signal_side']).tolist():
+        signals[i] = {
+            'side': 'LONG' if indicators['signal_side'][i] > 0 else 'SHORT',
+            'entry': float(indicators['signal_entry'][i]),
+            'stop_loss': float(indicators['signal_stop_loss'][i]),
+            'take_profit': float(indicators['signal_take_profit'][i]),
+            'leverage': round(float(indicators['leverage'][i]), 1)
+        }
+    return signals
+
+
+def _vectorized_signals(df, config=TRITON73_CONFIG):
+    """Per-candle signal list for the vectorized engine"""
+    return signals_from_indicators(precompute_indicators(df, config))
+
+
+def _incremental_signals(df, config=TRITON73_CONFIG, resume=None, on_checkpoint=None):
+    """Yield per-candle signals by feeding candles one at a time through IndicatorState
     
-    if len(df) < 100:
-        print(f"⚠️  Insufficient data: {len(df)} candles")
+    resume: signal state of a checkpoint to continue from (df then holds
+    the candles after it). on_checkpoint(state) receives the serialized
+    state after the second-to-last candle of df.
+    """
+    recent = resume['recent'] if resume else {'high': [], 'low': [], 'close': [], 'volume': [], 'open_time': []}
+    high = recent['high'] + df['high'].to_numpy(dtype=float).tolist()
+    low = recent['low'] + df['low'].to_numpy(dtype=float).tolist()
+    close = recent['close'] + df['close'].to_numpy(dtype=float).tolist()
+    volume = recent['volume'] + df['volume'].to_numpy(dtype=float).tolist()
+    open_time_ms = recent['open_time'] + df['open_time'].dt.as_unit('ms').astype('int64').tolist()
+    
+    if resume:
+        indicators = IndicatorState.from_dict(resume['indicators'], config)
+        session_level = SessionLevelState.from_dict(resume['session_level'], config)
+        prev_volume_confirmed = resume['prev_volume_confirmed']
+    else:
+        indicators = IndicatorState(config)
+        session_level = SessionLevelState(config)
+        prev_volume_confirmed = False
+    
+    for i in range(len(recent['close']), len(close)):
+        if on_checkpoint and i == len(close) - 1:
+            # Breakouts look back two candles, keep them with the state
+            on_checkpoint({
+                'indicators': indicators.to_dict(),
+                'session_level': session_level.to_dict(),
+                'prev_volume_confirmed': prev_volume_confirmed,
+                'recent': {
+                    'high': high[max(0, i - 2):i],
+                    'low': low[max(0, i - 2):i],
+                    'close': close[max(0, i - 2):i],
+                    'volume': volume[max(0, i - 2):i],
+                    'open_time': open_time_ms[max(0, i - 2):i]
+                }
+            })
+        
+        indicators.update(high[i], low[i], close[i], volume[i], open_time_ms[i])
+        session_level.update(open_time_ms[i], close[i])
+        
+        signal = None
+        if i >= 2:
+            level = session_level.level(open_time_ms[i], close[i], volume[i], indicators.volume_mean.value)
+            # A breakout needs the level between the last closes, skip the check otherwise
+            if level is not None and min(close[i - 2:i + 1]) <= level['price'] <= max(close[i - 2:i + 1]):
+                signal = check_breakout_window(
+                    close[i - 2:i + 1], high[i - 2:i + 1], low[i - 2:i + 1],
+                    [False, prev_volume_confirmed, indicators.volume_confirmed],
+                    level, indicators.trend_filter(), open_time_ms[i], config.use_second_confirmation, config
+                )
+                if signal:
+                    signal['leverage'] = indicators.leverage(close[i])
+        
+        prev_volume_confirmed = indicators.volume_confirmed
+        yield signal
+
+
+def signal_warmup_candles(config=TRITON73_CONFIG):
+    """Candles of history the indicators need before a chunk's first candle
+    
+    After ~37/alpha candles an EMA seeded anywhere matches the full-history
+    EMA to float precision; rolling windows need far less. The session level
+    is not covered (see signal_chunk_start()).
+    """
+    span = max(config.ema_short, config.ema_long)
+    return max(WARMUP_CANDLES, int(np.ceil(37 * (span + 1) / 2)))
+
+
+def signal_chunk_start(df, start, config=TRITON73_CONFIG, session=None):
+    """First candle a signal chunk starting at `start` must include
+    
+    signal_warmup_candles() before it, and the session-close candle the
+    level at `start` comes from, however long ago (24h of 1m candles is
+    more than the EMA warm-up). session: indices of df's session-close
+    candles, if already known.
+    """
+    if session is None:
+        session = np.flatnonzero(df['open_time'].dt.hour.to_numpy() == config.session_close_hour_utc)
+    lo = max(0, start - signal_warmup_candles(config))
+    k = np.searchsorted(session, start, side='right') - 1
+    return min(lo, int(session[k])) if k >= 0 else lo
+
+
+def _chunk_signals(task):
+    """Signals of one history chunk, without its leading warm-up candles"""
+    chunk, engine, config, warmup = task
+    if engine == 'vectorized':
+        signals = _vectorized_signals(chunk, config)
+    else:
+        signals = list(_incremental_signals(chunk, config))
+    return signals[warmup:]
+
+
+def generate_signals(df, config=TRITON73_CONFIG, engine=DEFAULT_ENGINE, processes=1,
+                     chunk_candles=SIGNAL_CHUNK_CANDLES):
+    """Phase 1: per-candle signals for df ('vectorized' or 'incremental' engine)
+    
+    With processes > 1 history is split into chunks of chunk_candles that
+    are processed in a process pool, each chunk preceded by enough history
+    for its EMAs and its first session level (signal_chunk_start()). The
+    merged list equals the single-process one.
+    """
+    if engine not in ('vectorized', 'incremental'):
+        raise ValueError(f"Engine '{engine}' has no separate signal phase")
+    
+    n = len(df)
+    if processes <= 1 or n <= chunk_candles:
+        if engine == 'vectorized':
+            return _vectorized_signals(df, config)
+        return _incremental_signals(df, config)
+    
+    session = np.flatnonzero(df['open_time'].dt.hour.to_numpy() == config.session_close_hour_utc)
+    tasks = []
+    for start in range(0, n, chunk_candles):
+        lo = signal_chunk_start(df, start, config, session)
+        chunk = df.iloc[lo:start + chunk_candles].reset_index(drop=True)
+        tasks.append((chunk, engine, config, start - lo))
+    
+    with Pool(min(processes, len(tasks))) as pool:
+        chunks = pool.map(_chunk_signals, tasks)
+    return [signal for chunk in chunks for signal in chunk]
+
+
+@lru_cache(maxsize=None)
+def load_drilldown_candles(symbol, interval, start_time, end_time, update_cache=True):
+    """Finer candles in [start_time, end_time] (ms) as (high, low, close) arrays, memoized
+    
+    Read from the kline cache (downloading only what it is missing), with a
+    direct download (kline_downloader, MEXC_API_BASE) as fallback. None if
+    nothing is available.
+    """
+    try:
+        klines = get_klines_window(symbol, interval, start_time, end_time, update=update_cache)
+    except (sqlite3.Error, ValueError) as e:
+        print(f"⚠️  Kline cache unavailable ({e}), fetching {interval} candles directly")
+        klines = None
+    if not klines and update_cache:
+        raw, _ = download_klines(symbol, interval, start_time, end_time)
+        klines = [dict(zip(KLINE_COLUMNS, k)) for k in raw]
+    if not klines:
         return None
     
-    print(f"✅ Loaded {len(df)} candles")
-    print()
+    klines = [k for k in klines if start_time <= int(k['open_time']) <= end_time]
+    return (
+        np.array([float(k['high']) for k in klines]),
+        np.array([float(k['low']) for k in klines]),
+        np.array([float(k['close']) for k in klines])
+    )
+
+
+def make_drilldown_resolver(df, symbol=SYMBOL, interval=DRILLDOWN_INTERVAL, update_cache=True):
+    """resolve_ambiguous callback that replays an ambiguous candle on finer candles
+    
+    The finer candles of a candle are loaded the first time it is
+    ambiguous and memoized, so a sweep loads each window once per process.
+    Returns None (booked as the stop loss) if the finer candles are missing
+    or also touch both levels in the same candle.
+    """
+    open_time = df['open_time'].dt.as_unit('ms').astype('int64').to_numpy()
+    candle_ms = int(np.median(np.diff(open_time))) if len(open_time) > 1 else 0
+    
+    def resolve(i, side, stop_loss, take_profit):
+        if candle_ms <= 0:
+            return None
+        start_time = int(open_time[i])
+        candles = load_drilldown_candles(symbol, interval, start_time, start_time + candle_ms - 1, update_cache)
+        if candles is None:
+            return None
+        high, low, close = candles
+        hit = find_first_exit(high, low, close, 0, side, stop_loss, take_profit, 'intrabar', 'pessimistic')
+        if hit is None:
+            return None
+        k, result = hit
+        if result == 'LOSS' and _touches_both(side, high[k], low[k], take_profit):
+            return None
+        return result
+    
+    return resolve
+
+
+def _touches_both(side, high, low, take_profit):
+    """Whether a candle that hit the stop loss also reached the take profit"""
+    return high >= take_profit if side == 'LONG' else low <= take_profit
+
+
+def _run_loop_engine(df, initial_capital, config=TRITON73_CONFIG, exit_model=EXIT_MODEL,
+                     ambiguous_rule=AMBIGUOUS_EXIT_RULE, resolve_ambiguous=None, funding=None, slippage_pct=None,
+                     fee_pct=None):
+    """Run the original per-candle backtest (recomputes indicators on each slice)"""
+    slippage_pct = SLIPPAGE_PCT if slippage_pct is None else slippage_pct
+    fee_pct = FEE_PCT if fee_pct is None else fee_pct
+    open_time_ms = df['open_time'].dt.as_unit('ms').astype('int64').tolist()
     
     # Initialize backtest state
     capital = initial_capital
@@ -117,25 +757,37 @@ def backtest_triton73(start_date, end_date, initial_capital=INITIAL_CAPITAL):
     losing_trades = 0
     total_pnl = 0.0
     
-    print("🔄 Running backtest...")
-    print()
+    # Session levels are looked up in an index built once for the dataset
+    level_index = build_level_index(df, config)
     
     # Iterate through candles
-    for i in range(100, len(df)):  # Start from 100 to have enough history
+    for i in range(WARMUP_CANDLES, len(df)):  # Start after warm-up to have enough history
         current_candle = df.iloc[i]
         current_price = float(current_candle['close'])
         current_time = current_candle['open_time']
         
+        # Liquidation is always touched by the candle range (and gaps at its open)
+        candle_open = float(current_candle['open'])
+        candle_high = float(current_candle['high'])
+        candle_low = float(current_candle['low'])
+        
+        # SL/TP are touched by the candle range (intrabar) or only by the close
+        if exit_model == 'intrabar':
+            current_high = float(current_candle['high'])
+            current_low = float(current_candle['low'])
+        else:
+            current_high = current_low = current_price
+        
         # Check drawdown pause
         if capital > max_equity:
             max_equity = capital
         
         drawdown = (capital - max_equity) / max_equity if max_equity > 0 else 0
-        if drawdown <= -DRAWDOWN_PAUSE_THRESHOLD:
+        if config.drawdown_pause_threshold is not None and drawdown <= -config.drawdown_pause_threshold:
             if not paused:
                 print(f"⏸️  Strategy paused at {drawdown*100:.2f}% drawdown (candle {i})")
                 paused = True
-        elif paused and capital >= max_equity * DRAWDOWN_RESUME_THRESHOLD:
+        elif paused and capital >= max_equity * config.drawdown_resume_threshold:
             print(f"▶️  Strategy resumed (candle {i})")
             paused = False
         
@@ -153,43 +805,69 @@ def backtest_triton73(start_date, end_date, initial_capital=INITIAL_CAPITAL):
                 result = None
                 
                 if side == 'LONG':
-                    if current_price <= stop_loss:
+                    if current_low <= stop_loss:
                         exit_price = stop_loss
                         result = 'LOSS'
                         should_close = True
-                    elif current_price >= take_profit:
+                    elif current_high >= take_profit:
                         exit_price = take_profit
                         result = 'WIN'
                         should_close = True
                 else:  # SHORT
-                    if current_price >= stop_loss:
+                    if current_high >= stop_loss:
                         exit_price = stop_loss
                         result = 'LOSS'
                         should_close = True
-                    elif current_price <= take_profit:
+                    elif current_low <= take_profit:
                         exit_price = take_profit
                         result = 'WIN'
                         should_close = True
                 
-                if should_close:
-                    # Apply slippage
-                    if side == 'LONG':
-                        exit_price *= (1 - SLIPPAGE_PCT)
-                    else:
-                        exit_price *= (1 + SLIPPAGE_PCT)
-                    
-                    # Calculate P&L
-                    position_units = current_position['position_units']
+                if result == 'LOSS' and _touches_both(side, current_high, current_low, take_profit):
+                    if ambiguous_rule == 'finer' and resolve_ambiguous and resolve_ambiguous(i, side, stop_loss, take_profit) == 'WIN':
+                        exit_price = take_profit
+                        result = 'WIN'
+                
+                # A resting stop the candle opens beyond fills at the open
+                if result == 'LOSS' and exit_model == 'intrabar' and _beyond(side, candle_open, stop_loss):
+                    exit_price = candle_open
+                
+                # Liquidation comes first unless the stop fills before it on this candle
+                liquidation_price = current_position['liquidation_price']
+                if side == 'LONG':
+                    liquidated = candle_low <= liquidation_price
+                else:
+                    liquidated = candle_high >= liquidation_price
+                liquidated = liquidated and not (should_close and _stop_fills_first(current_position, candle_open, exit_model))
+                
+                if should_close or liquidated:
                     leverage = current_position['leverage']
-                    
-                    if side == 'LONG':
-                        pnl_amount = position_units * (exit_price - entry) * leverage
+                    if liquidated:
+                        result = 'LOSS'
+                        exit_price = liquidation_price
+                        funding_paid = 0.0
+                        net_pnl = _liquidation_pnl(current_position, fee_pct)
                     else:
-                        pnl_amount = position_units * (entry - exit_price) * leverage
-                    
-                    # Apply fees
-                    fees = (position_units * entry + position_units * exit_price) * FEE_PCT
-                    net_pnl = pnl_amount - fees
+                        # Apply slippage
+                        if side == 'LONG':
+                            exit_price *= (1 - slippage_pct)
+                        else:
+                            exit_price *= (1 + slippage_pct)
+                        
+                        # Calculate P&L
+                        position_units = current_position['position_units']
+                        
+                        if side == 'LONG':
+                            pnl_amount = position_units * (exit_price - entry) * leverage
+                        else:
+                            pnl_amount = position_units * (entry - exit_price) * leverage
+                        
+                        # Apply fees and the funding paid while the position was open
+                        fees = (position_units * entry + position_units * exit_price) * fee_pct
+                        funding_paid = _funding_payment(
+                            current_position, funding_accrued(funding, current_position['funding_from'], open_time_ms[i])
+                        )
+                        net_pnl = pnl_amount - fees - funding_paid
                     
                     capital += net_pnl
                     total_pnl += net_pnl
@@ -209,7 +887,11 @@ def backtest_triton73(start_date, end_date, initial_capital=INITIAL_CAPITAL):
                         'result': result,
                         'pnl': net_pnl,
                         'capital_after': capital,
-                        'leverage': leverage
+                        'leverage': leverage,
+                        'liquidated': liquidated,
+                        'liquidation_price': current_position['liquidation_price'],
+                        'liquidation_reduced': current_position['liquidation_reduced'],
+                        'funding': funding_paid
                     })
                     
                     current_position = None
@@ -227,43 +909,69 @@ def backtest_triton73(start_date, end_date, initial_capital=INITIAL_CAPITAL):
             result = None
             
             if side == 'LONG':
-                if current_price <= stop_loss:
+                if current_low <= stop_loss:
                     exit_price = stop_loss
                     result = 'LOSS'
                     should_close = True
-                elif current_price >= take_profit:
+                elif current_high >= take_profit:
                     exit_price = take_profit
                     result = 'WIN'
                     should_close = True
             else:  # SHORT
-                if current_price >= stop_loss:
+                if current_high >= stop_loss:
                     exit_price = stop_loss
                     result = 'LOSS'
                     should_close = True
-                elif current_price <= take_profit:
+                elif current_low <= take_profit:
                     exit_price = take_profit
                     result = 'WIN'
                     should_close = True
             
-            if should_close:
-                # Apply slippage
-                if side == 'LONG':
-                    exit_price *= (1 - SLIPPAGE_PCT)
-                else:
-                    exit_price *= (1 + SLIPPAGE_PCT)
-                
-                # Calculate P&L
-                position_units = current_position['position_units']
+            if result == 'LOSS' and _touches_both(side, current_high, current_low, take_profit):
+                if ambiguous_rule == 'finer' and resolve_ambiguous and resolve_ambiguous(i, side, stop_loss, take_profit) == 'WIN':
+                    exit_price = take_profit
+                    result = 'WIN'
+            
+            # A resting stop the candle opens beyond fills at the open
+            if result == 'LOSS' and exit_model == 'intrabar' and _beyond(side, candle_open, stop_loss):
+                exit_price = candle_open
+            
+            # Liquidation comes first unless the stop fills before it on this candle
+            liquidation_price = current_position['liquidation_price']
+            if side == 'LONG':
+                liquidated = candle_low <= liquidation_price
+            else:
+                liquidated = candle_high >= liquidation_price
+            liquidated = liquidated and not (should_close and _stop_fills_first(current_position, candle_open, exit_model))
+            
+            if should_close or liquidated:
                 leverage = current_position['leverage']
-                
-                if side == 'LONG':
-                    pnl_amount = position_units * (exit_price - entry) * leverage
+                if liquidated:
+                    result = 'LOSS'
+                    exit_price = liquidation_price
+                    funding_paid = 0.0
+                    net_pnl = _liquidation_pnl(current_position, fee_pct)
                 else:
-                    pnl_amount = position_units * (entry - exit_price) * leverage
-                
-                # Apply fees
-                fees = (position_units * entry + position_units * exit_price) * FEE_PCT
-                net_pnl = pnl_amount - fees
+                    # Apply slippage
+                    if side == 'LONG':
+                        exit_price *= (1 - slippage_pct)
+                    else:
+                        exit_price *= (1 + slippage_pct)
+                    
+                    # Calculate P&L
+                    position_units = current_position['position_units']
+                    
+                    if side == 'LONG':
+                        pnl_amount = position_units * (exit_price - entry) * leverage
+                    else:
+                        pnl_amount = position_units * (entry - exit_price) * leverage
+                    
+                    # Apply fees and the funding paid while the position was open
+                    fees = (position_units * entry + position_units * exit_price) * fee_pct
+                    funding_paid = _funding_payment(
+                        current_position, funding_accrued(funding, current_position['funding_from'], open_time_ms[i])
+                    )
+                    net_pnl = pnl_amount - fees - funding_paid
                 
                 capital += net_pnl
                 total_pnl += net_pnl
@@ -283,7 +991,11 @@ def backtest_triton73(start_date, end_date, initial_capital=INITIAL_CAPITAL):
                     'result': result,
                     'pnl': net_pnl,
                     'capital_after': capital,
-                    'leverage': leverage
+                    'leverage': leverage,
+                    'liquidated': liquidated,
+                    'liquidation_price': current_position['liquidation_price'],
+                    'liquidation_reduced': current_position['liquidation_reduced'],
+                    'funding': funding_paid
                 })
                 
                 current_position = None
@@ -292,28 +1004,28 @@ def backtest_triton73(start_date, end_date, initial_capital=INITIAL_CAPITAL):
         # Check for new signal (only on candle close, and need enough history)
         if i < len(df) - 1:  # Don't check on last candle
             # Calculate level with decay
-            level = calculate_level_with_decay(df, i)
+            level = calculate_level_with_decay(df, i, level_index, config)
             if level is None:
                 continue
             
             # Check level age
-            if level['age_hours'] < MIN_LEVEL_AGE_HOURS:
+            if level['age_hours'] < config.min_level_age_hours:
                 continue
             
             # Check trend filter
-            trend_filter = check_trend_filter(df.iloc[:i+1])
+            trend_filter = check_trend_filter(df.iloc[:i+1], config)
             if not trend_filter['long_allowed'] and not trend_filter['short_allowed']:
                 continue
             
             # Calculate dynamic leverage
-            leverage = calculate_dynamic_leverage(df.iloc[:i+1], current_price)
+            leverage = calculate_dynamic_leverage(df.iloc[:i+1], current_price, config)
             
             # Check for breakout
-            signal = check_breakout_enhanced(df.iloc[:i+1], level, trend_filter, USE_SECOND_CONFIRMATION)
+            signal = check_breakout_enhanced(df.iloc[:i+1], level, trend_filter, config.use_second_confirmation, config)
             
             if signal:
-                # Estimate funding rate (simplified for backtest)
-                funding_rate = fetch_historical_funding_rates(SYMBOL, start_date, end_date)
+                # Funding rate in effect at the signal candle
+                funding_rate = funding_rate_at(funding, open_time_ms[i])
                 
                 # Calculate position size
                 position = calculate_position_size(
@@ -323,16 +1035,17 @@ def backtest_triton73(start_date, end_date, initial_capital=INITIAL_CAPITAL):
                     signal['side'],
                     leverage,
                     current_price=current_price,
-                    funding_rate=funding_rate
+                    funding_rate=funding_rate,
+                    config=config
                 )
                 
                 if position:
                     # Apply slippage to entry
                     entry_with_slippage = signal['entry']
                     if signal['side'] == 'LONG':
-                        entry_with_slippage *= (1 + SLIPPAGE_PCT)
+                        entry_with_slippage *= (1 + slippage_pct)
                     else:
-                        entry_with_slippage *= (1 - SLIPPAGE_PCT)
+                        entry_with_slippage *= (1 - slippage_pct)
                     
                     # Open position
                     current_position = {
@@ -342,14 +1055,41 @@ def backtest_triton73(start_date, end_date, initial_capital=INITIAL_CAPITAL):
                         'stop_loss': signal['stop_loss'],
                         'take_profit': signal['take_profit'],
                         'position_units': position['position_units'],
-                        'leverage': leverage
+                        'leverage': leverage,
+                        'liquidation_reduced': position['liquidation_reduced'],
+                        'funding_from': open_time_ms[i + 1]
                     }
+                    current_position['liquidation_price'] = _position_liquidation_price(current_position)
+    
+    return {
+        'capital': capital,
+        'max_equity': max_equity,
+        'total_trades': total_trades,
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+        'total_pnl': total_pnl,
+        'trades': trades
+    }
+
+
+def summarize_backtest(state, initial_capital):
+    """Compute final statistics from an engine's end state"""
+    capital = state['capital']
+    max_equity = state['max_equity']
+    total_trades = state['total_trades']
+    winning_trades = state['winning_trades']
+    losing_trades = state['losing_trades']
+    total_pnl = state['total_pnl']
+    trades = state['trades']
     
     # Final results
     final_return = ((capital / initial_capital) - 1) * 100
     max_drawdown = ((capital - max_equity) / max_equity) * 100 if max_equity > 0 else 0
     
     win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+    liquidations = sum(1 for t in trades if t.get('liquidated'))
+    liquidation_reductions = sum(1 for t in trades if t.get('liquidation_reduced'))
+    funding_paid = sum(t.get('funding', 0.0) for t in trades)
     
     # Calculate profit factor
     wins = [t for t in trades if t['result'] == 'WIN']
@@ -365,73 +1105,453 @@ def backtest_triton73(start_date, end_date, initial_capital=INITIAL_CAPITAL):
         avg_loss = abs(sum(t['pnl'] for t in losses) / len(losses))
         avg_rr = avg_win / avg_loss if avg_loss > 0 else 0
     
-    # Print results
+    return {
+        'initial_capital': initial_capital,
+        'final_capital': capital,
+        'total_pnl': total_pnl,
+        'return_pct': final_return,
+        'max_equity': max_equity,
+        'max_drawdown': max_drawdown,
+        'total_trades': total_trades,
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+        'liquidations': liquidations,
+        'liquidation_reductions': liquidation_reductions,
+        'funding_paid': funding_paid,
+        'win_rate': win_rate,
+        'profit_factor': profit_factor,
+        'avg_rr': avg_rr,
+        'trades': trades
+    }
+
+
+def equity_drawdown(trades, initial_capital):
+    """Worst peak-to-trough drawdown (%) of the closed-trade equity curve"""
+    if not trades:
+        return 0.0
+    equity = np.concatenate(([initial_capital], [t['capital_after'] for t in trades]))
+    peak = np.maximum.accumulate(equity)
+    return float(((equity - peak) / peak).min() * 100)
+
+
+def trade_records(trades):
+    """Trade dicts as a TRADE_DTYPE structured array"""
+    return np.array([
+        (
+            pd.Timestamp(t['entry_time']).value // 10**6, pd.Timestamp(t['exit_time']).value // 10**6,
+            1 if t['side'] == 'LONG' else -1, t['entry'], t['exit'], 1 if t['result'] == 'WIN' else 0,
+            t['pnl'], t['capital_after'], t.get('leverage') or 1.0, t.get('liquidated', False),
+            t.get('liquidation_price', np.nan), t.get('liquidation_reduced', False), t.get('funding', 0.0)
+        )
+        for t in trades
+    ], dtype=TRADE_DTYPE)
+
+
+def equity_curve(trades, open_time, initial_capital):
+    """Per-candle closed-trade equity as an EQUITY_DTYPE structured array
+    
+    open_time holds the candle open times (timestamps or ms); each candle
+    carries the capital after every exit up to and including it.
+    """
+    records = trades if isinstance(trades, np.ndarray) else trade_records(trades)
+    if isinstance(open_time, pd.Series):
+        open_time = open_time.dt.as_unit('ms').astype('int64').to_numpy()
+    open_time = np.asarray(open_time, dtype=np.int64)
+    
+    closed = np.searchsorted(records['exit_time'], open_time, side='right')
+    curve = np.empty(len(open_time), dtype=EQUITY_DTYPE)
+    curve['open_time'] = open_time
+    curve['equity'] = np.where(closed > 0, records['capital_after'][np.maximum(closed - 1, 0)], initial_capital)
+    return curve
+
+
+def save_backtest_results(results, path=BACKTEST_RESULTS_FILE):
+    """Save trades (and the equity curve, if present) as .npz and the headline metrics as .json
+    
+    Returns the paths written.
+    """
+    arrays = {'trades': trade_records(results['trades'])}
+    if results.get('equity') is not None:
+        arrays['equity'] = results['equity']
+    np.savez_compressed(path, **arrays)
+    
+    summary_path = os.path.splitext(path)[0] + '.json'
+    summary = {k: v for k, v in results.items() if k not in ('trades', 'equity')}
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+    return path, summary_path
+
+
+def load_backtest_results(path=BACKTEST_RESULTS_FILE):
+    """Load save_backtest_results() output as (summary, trades, equity); equity may be None"""
+    with np.load(path) as data:
+        trades = data['trades']
+        equity = data['equity'] if 'equity' in data.files else None
+    with open(os.path.splitext(path)[0] + '.json', 'r') as f:
+        summary = json.load(f)
+    return summary, trades, equity
+
+
+def run_backtest(df, initial_capital=INITIAL_CAPITAL, engine=DEFAULT_ENGINE, config=TRITON73_CONFIG,
+                 exit_model=EXIT_MODEL, ambiguous_rule=AMBIGUOUS_EXIT_RULE, resolve_ambiguous=None,
+                 signals=None, processes=1, funding=None, slippage_pct=None, fee_pct=None):
+    """Run a backtest over an already loaded candle DataFrame
+    
+    signals: precomputed per-candle signals aligned with df (skips phase 1),
+    e.g. a slice of signals_from_indicators() computed once over a longer
+    span. processes: workers for phase 1 (see generate_signals()).
+    funding: fetch_historical_funding_rates() history for sizing and
+    funding payments (None: constant FUNDING_RATE_ESTIMATE). slippage_pct
+    and fee_pct default to SLIPPAGE_PCT and FEE_PCT.
+    
+    With ambiguous_rule 'finer', resolve_ambiguous(i, side, stop_loss,
+    take_profit) decides candles that touch both SL and TP (returns 'WIN',
+    'LOSS' or None); by default DRILLDOWN_INTERVAL candles are loaded for them.
+    """
+    if exit_model not in EXIT_MODELS:
+        raise ValueError(f"Unknown exit model '{exit_model}' (expected one of {EXIT_MODELS})")
+    if ambiguous_rule not in AMBIGUOUS_EXIT_RULES:
+        raise ValueError(f"Unknown ambiguous exit rule '{ambiguous_rule}' (expected one of {AMBIGUOUS_EXIT_RULES})")
+    
+    if ambiguous_rule == 'finer' and resolve_ambiguous is None:
+        resolve_ambiguous = make_drilldown_resolver(df)
+    
+    exits = (exit_model, ambiguous_rule, resolve_ambiguous)
+    costs = {'funding': funding, 'slippage_pct': slippage_pct, 'fee_pct': fee_pct}
+    if engine == 'loop':
+        if signals is not None or processes > 1:
+            raise ValueError("The 'loop' engine has no separate signal phase (no signals or processes)")
+        state = _run_loop_engine(df, initial_capital, config, *exits, **costs)
+    elif engine in BACKTEST_ENGINES:
+        if signals is None:
+            signals = generate_signals(df, config, engine, processes)
+        state = _run_accounting(df, initial_capital, signals, config, *exits, **costs)
+    else:
+        raise ValueError(f"Unknown backtest engine '{engine}' (expected one of {BACKTEST_ENGINES})")
+    
+    return summarize_backtest(state, initial_capital)
+
+
+def _checkpoint_settings(initial_capital, config, exit_model, ambiguous_rule, interval=INTERVAL):
+    """Settings a checkpoint is only valid for"""
+    return {
+        'symbol': SYMBOL,
+        'interval': interval,
+        'initial_capital': initial_capital,
+        'config': dataclasses.asdict(config),
+        'exit_model': exit_model,
+        'ambiguous_rule': ambiguous_rule,
+        'slippage_pct': SLIPPAGE_PCT,
+        'fee_pct': FEE_PCT,
+        'maintenance_margin_tiers': [list(tier) for tier in MAINTENANCE_MARGIN_TIERS],
+        'funding_rate_estimate': FUNDING_RATE_ESTIMATE
+    }
+
+
+def run_backtest_checkpoint(df, initial_capital=INITIAL_CAPITAL, config=TRITON73_CONFIG, exit_model=EXIT_MODEL,
+                            ambiguous_rule=AMBIGUOUS_EXIT_RULE, resolve_ambiguous=None, checkpoint=None,
+                            funding=None, interval=INTERVAL):
+    """Incremental-engine backtest that also returns a checkpoint of its end state
+    
+    The checkpoint (indicator and level state, open position, capital, max
+    equity, pause flag and trades) is taken before the last candle, which
+    may still have been forming and never opens a trade. Passing it back
+    with newer candles (df must include the checkpoint's last candle)
+    processes only the candles after it; the results equal a full run over
+    the whole history (given funding covering it). interval is the candle
+    interval of df, the checkpoint is only valid for it. Returns
+    (results, checkpoint).
+    """
+    if exit_model not in EXIT_MODELS:
+        raise ValueError(f"Unknown exit model '{exit_model}' (expected one of {EXIT_MODELS})")
+    if ambiguous_rule not in AMBIGUOUS_EXIT_RULES:
+        raise ValueError(f"Unknown ambiguous exit rule '{ambiguous_rule}' (expected one of {AMBIGUOUS_EXIT_RULES})")
+    
+    settings = _checkpoint_settings(initial_capital, config, exit_model, ambiguous_rule, interval)
+    open_time_ms = df['open_time'].dt.as_unit('ms').astype('int64').to_numpy()
+    last_open_time = None
+    if checkpoint:
+        if checkpoint['settings'] != settings:
+            raise ValueError("Checkpoint was made with other settings, run a full backtest")
+        last_open_time = checkpoint['last_open_time']
+        if len(df) == 0 or open_time_ms[0] > last_open_time:
+            raise ValueError("Candles must start at or before the checkpoint's last candle")
+        df = df[open_time_ms > last_open_time].reset_index(drop=True)
+        open_time_ms = open_time_ms[open_time_ms > last_open_time]
+        if len(df) == 0:
+            raise ValueError("No candles after the checkpoint")
+    elif len(df) < 2:
+        raise ValueError("At least two candles are needed for a checkpoint")
+    
+    if ambiguous_rule == 'finer' and resolve_ambiguous is None:
+        resolve_ambiguous = make_drilldown_resolver(df)
+    
+    captured = {}
+    signals = _incremental_signals(
+        df, config, checkpoint['signals'] if checkpoint else None,
+        lambda state: captured.update(signals=state)
+    )
+    state = _run_accounting(
+        df, initial_capital, signals, config, exit_model, ambiguous_rule, resolve_ambiguous,
+        checkpoint['accounting'] if checkpoint else None, lambda state: captured.update(accounting=state), funding
+    )
+    
+    new_checkpoint = {
+        'settings': settings,
+        'last_open_time': int(open_time_ms[-2]) if len(df) > 1 else last_open_time,
+        'signals': captured['signals'],
+        'accounting': captured['accounting']
+    }
+    return summarize_backtest(state, initial_capital), new_checkpoint
+
+
+def save_checkpoint(checkpoint, path=BACKTEST_CHECKPOINT_FILE):
+    """Save a backtest checkpoint as JSON"""
+    with open(path, 'w') as f:
+        json.dump(checkpoint, f, default=str)
+
+
+def load_checkpoint(path=BACKTEST_CHECKPOINT_FILE):
+    """Load a checkpoint saved by save_checkpoint() (None if there is none)"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        checkpoint = json.load(f)
+    
+    # Timestamps were saved as text
+    accounting = checkpoint['accounting']
+    for trade in accounting['trades']:
+        trade['entry_time'] = pd.Timestamp(trade['entry_time']).tz_convert('UTC')
+        trade['exit_time'] = pd.Timestamp(trade['exit_time']).tz_convert('UTC')
+    if accounting['position']:
+        accounting['position']['entry_time'] = pd.Timestamp(accounting['position']['entry_time']).tz_convert('UTC')
+    return checkpoint
+
+
+def refresh_backtest(start_date, end_date, initial_capital=INITIAL_CAPITAL, config=TRITON73_CONFIG,
+                     path=BACKTEST_CHECKPOINT_FILE):
+    """Backtest up to end_date, continuing from the saved checkpoint when it matches
+    
+    Only candles since the checkpoint are fetched and processed; start_date
+    is used when a new checkpoint has to be built (none saved, or other
+    settings). The updated checkpoint is saved again.
+    """
+    checkpoint = load_checkpoint(path)
+    settings = _checkpoint_settings(initial_capital, config, EXIT_MODEL, AMBIGUOUS_EXIT_RULE)
+    if checkpoint and checkpoint['settings'] != settings:
+        print("⚠️  Checkpoint settings changed, running a full backtest")
+        checkpoint = None
+    
+    end_timestamp = int(pd.Timestamp(end_date, tz='UTC').timestamp() * 1000)
+    if checkpoint:
+        start_date = checkpoint['start_date']
+        print(f"📊 Fetching candles since the checkpoint ({pd.Timestamp(checkpoint['last_open_time'], unit='ms', tz='UTC')})...")
+        klines = get_klines_range(SYMBOL, INTERVAL, checkpoint['last_open_time'], end_timestamp)
+        df = klines_to_df(klines)
+    else:
+        print(f"📊 Fetching historical data ({start_date} to {end_date})...")
+        df = fetch_backtest_klines(start_date, end_date)
+    
+    if df is None or len(df) < (1 if checkpoint else WARMUP_CANDLES):
+        print("❌ Not enough data")
+        return None
+    
+    open_time_ms = df['open_time'].dt.as_unit('ms').astype('int64')
+    position = checkpoint['accounting']['position'] if checkpoint else None
+    funding_start = min(position['funding_from'], open_time_ms.iloc[0]) if position else open_time_ms.iloc[0]
+    funding = fetch_historical_funding_rates(SYMBOL, int(funding_start), int(open_time_ms.iloc[-1]))
+    results, new_checkpoint = run_backtest_checkpoint(df, initial_capital, config, checkpoint=checkpoint,
+                                                      funding=funding)
+    new_checkpoint['start_date'] = start_date
+    save_checkpoint(new_checkpoint, path)
+    
+    candles = new_checkpoint['accounting']['candles'] + 1
+    print(f"✅ Processed {len(df) - (1 if checkpoint else 0)} new candles ({candles} total), checkpoint saved to {path}")
+    print_backtest_results(results, start_date, end_date, candles)
+    return results
+
+
+def run_streaming_backtest(chunks, initial_capital=INITIAL_CAPITAL, config=TRITON73_CONFIG, exit_model=EXIT_MODEL,
+                           ambiguous_rule=AMBIGUOUS_EXIT_RULE, funding=None, interval=INTERVAL):
+    """Out-of-core backtest over an iterable of consecutive candle DataFrames
+    
+    Each chunk runs on the incremental engine from the previous chunk's
+    checkpoint (indicator and level state, open position, capital and
+    pause flag), so only one chunk is in memory at a time and the results
+    equal an in-memory backtest over all candles. interval is the candle
+    interval of the chunks. Returns (results, candles).
+    """
+    checkpoint = None
+    tail = None
+    results = None
+    candles = 0
+    for chunk in chunks:
+        if chunk is None or len(chunk) == 0:
+            continue
+        candles += len(chunk)
+        # A checkpoint continues from candles that include its last two
+        df = chunk if tail is None else pd.concat([tail, chunk], ignore_index=True)
+        if checkpoint is None and len(df) < 2:
+            tail = df
+            continue
+        results, checkpoint = run_backtest_checkpoint(df, initial_capital, config, exit_model, ambiguous_rule,
+                                                      checkpoint=checkpoint, funding=funding, interval=interval)
+        tail = df.iloc[-2:].copy()
+    
+    if results is None:
+        raise ValueError("At least two candles are needed for a backtest")
+    return results, candles
+
+
+def stream_backtest_triton73(start_date, end_date, initial_capital=INITIAL_CAPITAL, config=TRITON73_CONFIG,
+                             interval=INTERVAL, chunk_candles=STREAM_CHUNK_CANDLES):
+    """Backtest Triton73 over the candle store in chunks (e.g. multi-year 1m history)"""
+    print("="*80)
+    print("TRITON73 STREAMING BACKTEST")
+    print("="*80)
+    print(f"Period: {start_date} to {end_date} ({interval} candles, {chunk_candles:,} per chunk)")
+    print(f"Initial Capital: ${initial_capital:,.2f}")
+    print(f"Strategy: {config.name}")
+    print("="*80)
+    print()
+    
+    start_timestamp = int(pd.Timestamp(start_date, tz='UTC').timestamp() * 1000)
+    end_timestamp = int(pd.Timestamp(end_date, tz='UTC').timestamp() * 1000)
+    print("📊 Syncing the candle store...")
+    sync_candle_store(SYMBOL, interval, start_timestamp, end_timestamp)
+    funding = fetch_historical_funding_rates(SYMBOL, start_timestamp, end_timestamp)
+    
+    print("🔄 Running backtest...")
+    print()
+    chunks = iter_candle_chunks(SYMBOL, interval, start_timestamp, end_timestamp, chunk_candles)
+    try:
+        results, candles = run_streaming_backtest(chunks, initial_capital, config, funding=funding, interval=interval)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return None
+    
+    if candles < WARMUP_CANDLES:
+        print(f"⚠️  Insufficient data: {candles} candles")
+        return None
+    
+    # Candle times straight from the mapped store
+    open_time = open_candles(SYMBOL, interval)['open_time']
+    lo = np.searchsorted(open_time, start_timestamp, side='left')
+    hi = np.searchsorted(open_time, end_timestamp, side='right')
+    results['equity'] = equity_curve(results['trades'], open_time[lo:hi], initial_capital)
+    print_backtest_results(results, start_date, end_date, candles)
+    return results
+
+
+def print_backtest_results(results, start_date, end_date, candles):
+    """Print backtest results"""
+    trades = results['trades']
+    
     print("="*80)
     print("BACKTEST RESULTS")
     print("="*80)
     print(f"Period: {start_date} to {end_date}")
-    print(f"Candles Analyzed: {len(df)}")
+    print(f"Candles Analyzed: {candles}")
     print()
     print("💰 PERFORMANCE")
     print("-"*80)
-    print(f"Initial Capital: ${initial_capital:,.2f}")
-    print(f"Final Capital: ${capital:,.2f}")
-    print(f"Total P&L: ${total_pnl:+,.2f}")
-    print(f"Return: {final_return:+.2f}%")
-    print(f"Max Equity: ${max_equity:,.2f}")
-    print(f"Max Drawdown: {max_drawdown:.2f}%")
+    print(f"Initial Capital: ${results['initial_capital']:,.2f}")
+    print(f"Final Capital: ${results['final_capital']:,.2f}")
+    print(f"Total P&L: ${results['total_pnl']:+,.2f}")
+    print(f"Return: {results['return_pct']:+.2f}%")
+    print(f"Max Equity: ${results['max_equity']:,.2f}")
+    print(f"Max Drawdown: {results['max_drawdown']:.2f}%")
     print()
     print("📊 TRADE STATISTICS")
     print("-"*80)
-    print(f"Total Trades: {total_trades}")
-    print(f"Winning Trades: {winning_trades}")
-    print(f"Losing Trades: {losing_trades}")
-    print(f"Win Rate: {win_rate:.2f}%")
-    print(f"Profit Factor: {profit_factor:.2f}")
-    print(f"Average R:R: {avg_rr:.2f}:1")
+    print(f"Total Trades: {results['total_trades']}")
+    print(f"Winning Trades: {results['winning_trades']}")
+    print(f"Losing Trades: {results['losing_trades']}")
+    print(f"Liquidations: {results['liquidations']}")
+    print(f"Funding Paid: ${results['funding_paid']:+,.2f}")
+    print(f"Win Rate: {results['win_rate']:.2f}%")
+    print(f"Profit Factor: {results['profit_factor']:.2f}")
+    print(f"Average R:R: {results['avg_rr']:.2f}:1")
     print()
     
     if trades:
         print("📈 RECENT TRADES (Last 10)")
         print("-"*80)
         for i, trade in enumerate(reversed(trades[-10:]), 1):
-            result_emoji = "✅" if trade['result'] == 'WIN' else "❌"
+            result_emoji = "✅" if trade['result'] == 'WIN' else "💥" if trade.get('liquidated') else "❌"
             print(f"{i}. {result_emoji} {trade['side']} | Entry: ${trade['entry']:,.2f} | Exit: ${trade['exit']:,.2f} | P&L: ${trade['pnl']:+,.2f}")
     print()
     print("="*80)
+
+
+def backtest_triton73(start_date, end_date, initial_capital=INITIAL_CAPITAL, engine=DEFAULT_ENGINE,
+                      config=TRITON73_CONFIG, processes=1):
+    """Backtest Triton73 strategy"""
+    print("="*80)
+    print("TRITON73 BACKTEST")
+    print("="*80)
+    print(f"Period: {start_date} to {end_date}")
+    print(f"Initial Capital: ${initial_capital:,.2f}")
+    print(f"Strategy: {config.name}")
+    print(f"Engine: {engine}")
+    print("="*80)
+    print()
     
-    return {
-        'initial_capital': initial_capital,
-        'final_capital': capital,
-        'total_pnl': total_pnl,
-        'return_pct': final_return,
-        'max_equity': max_equity,
-        'max_drawdown': max_drawdown,
-        'total_trades': total_trades,
-        'winning_trades': winning_trades,
-        'losing_trades': losing_trades,
-        'win_rate': win_rate,
-        'profit_factor': profit_factor,
-        'avg_rr': avg_rr,
-        'trades': trades
-    }
+    # Fetch historical data
+    print("📊 Fetching historical data...")
+    df = fetch_backtest_klines(start_date, end_date)
+    
+    if df is None:
+        print("❌ No data fetched")
+        return None
+    
+    if len(df) < WARMUP_CANDLES:
+        print(f"⚠️  Insufficient data: {len(df)} candles")
+        return None
+    
+    print(f"✅ Loaded {len(df)} candles")
+    open_time_ms = df['open_time'].dt.as_unit('ms').astype('int64')
+    funding = fetch_historical_funding_rates(SYMBOL, int(open_time_ms.iloc[0]), int(open_time_ms.iloc[-1]))
+    if funding is not None:
+        print(f"✅ Loaded {len(funding['funding_time'])} funding settlements")
+    print()
+    
+    print("🔄 Running backtest...")
+    print()
+    
+    results = run_backtest(df, initial_capital, engine, config, processes=processes, funding=funding)
+    results['equity'] = equity_curve(results['trades'], df['open_time'], initial_capital)
+    print_backtest_results(results, start_date, end_date, len(df))
+    return results
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Triton73 backtest')
+    parser.add_argument('--resume', action='store_true',
+                        help=f'Continue from {BACKTEST_CHECKPOINT_FILE} (created on first use), only new candles are processed')
+    parser.add_argument('--stream', action='store_true',
+                        help=f'Read the candle store in chunks of {STREAM_CHUNK_CANDLES:,} candles (bounded memory)')
+    parser.add_argument('--interval', default=INTERVAL, help='Candle interval for --stream (default: 4h)')
+    parser.add_argument('--days', type=int, default=180, help='History to backtest (default: 180)')
+    args = parser.parse_args()
+    
     # Backtest for recent period (MEXC has limited history)
-    # Try to get last 6 months of data
+    # Default: last 6 months of data (--days)
     end_date = datetime.now().strftime('%Y-%m-%d')
-    start_date = (datetime.now() - timedelta(days=180)).strftime('%Y-%m-%d')
+    start_date = (datetime.now() - timedelta(days=args.days)).strftime('%Y-%m-%d')
     
     print("Starting Triton73 backtest...")
     print(f"Note: MEXC has limited historical data. Using available period.")
     print()
     
-    results = backtest_triton73(start_date, end_date, INITIAL_CAPITAL)
+    if args.resume:
+        results = refresh_backtest(start_date, end_date, INITIAL_CAPITAL)
+    elif args.stream:
+        results = stream_backtest_triton73(start_date, end_date, INITIAL_CAPITAL, interval=args.interval)
+    else:
+        results = backtest_triton73(start_date, end_date, INITIAL_CAPITAL)
     
     if results:
         # Save results
-        with open('triton73_backtest_results.json', 'w') as f:
-            json.dump(results, f, indent=2, default=str)
-        print(f"\n✅ Results saved to triton73_backtest_results.json")
-
+        trades_path, summary_path = save_backtest_results(results)
+        print(f"\n✅ Results saved to {trades_path} (trades, equity curve) and {summary_path}")
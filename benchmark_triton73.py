@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Triton73 Backtest Benchmark
+Runs every backtest engine on the same seeded synthetic candles, checks
+that each produces the trade list of the reference 'loop' engine and
+reports the speedup. It also checks that phase-1 signals generated in
+parallel chunks equal the single-process ones on 1m candles, where a
+chunk is shorter than a session, and that a long position the market
+gaps down through is liquidated alike by every engine and the signal
+replay. Runs offline (no MEXC data needed).
+
+The --suite mode times the strategy hot paths (candle parsing,
+indicators, level decay, breakout check, position sizing and an end-to-end
+backtest) on synthetic fixtures of 500, 10k and 1M candles and writes the
+timings to a JSON file. --compare checks such a file against a stored
+baseline and flags every case that got slower than the threshold.
+
+Usage:
+    python3 benchmark_triton73.py                                   # engine comparison
+    python3 benchmark_triton73.py --suite                           # writes triton73_benchmarks.json
+    python3 benchmark_triton73.py --suite --sizes 500,10000 --save-baseline
+    python3 benchmark_triton73.py --compare triton73_benchmarks.json --threshold 0.1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from Triton73 import (
+    klines_to_df, calculate_atr, calculate_ema, calculate_level_with_decay, build_level_index,
+    check_trend_filter, check_breakout_enhanced, calculate_position_size
+)
+from backtest_triton73 import run_backtest, generate_signals, INITIAL_CAPITAL
+from replay_triton73 import record_signals, replay_signals
+from synthetic_market import synthetic_candles
+
+# Benchmark Parameters
+BENCHMARK_CANDLES = 2000  # ~11 months of 4h candles
+BENCHMARK_SEED = 73
+BENCHMARK_START = '2024-01-01'
+PARALLEL_CHECK_CANDLES = 100_000  # 1m candles (~70 days)
+PARALLEL_CHECK_CHUNK = 1_500  # Candles per chunk, shorter than one 24h session of 1m candles
+PARALLEL_CHECK_PROCESSES = 4
+GAP_CHECK_PCT = 0.30  # Gap down at the open of the candle after a long entry (beyond its liquidation price)
+
+# Suite Parameters
+SUITE_FIXTURES = {500: '4h', 10_000: '4h', 1_000_000: '15m'}  # Candles: interval (15m keeps 1M candles within ns timestamps)
+SUITE_MIN_REPEATS = 3
+SUITE_MAX_REPEATS = 50
+SUITE_MIN_TIME = 0.5  # Seconds of repeats per case (after SUITE_MIN_REPEATS)
+SUITE_RESULTS_FILE = 'triton73_benchmarks.json'
+SUITE_BASELINE_FILE = 'triton73_benchmarks_baseline.json'
+REGRESSION_THRESHOLD = 0.20  # Flag cases more than 20% slower than the baseline
+
+
+def time_engine(df, engine):
+    """Run one engine quietly and return (results, seconds)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        results = run_backtest(df, INITIAL_CAPITAL, engine)
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def benchmark_engines():
+    """Benchmark the backtest engines against the reference loop engine"""
+    print("="*80)
+    print("TRITON73 BACKTEST ENGINE BENCHMARK")
+    print("="*80)
+    print(f"Candles: {BENCHMARK_CANDLES} (synthetic, seed {BENCHMARK_SEED})")
+    print()
+
+    df = synthetic_candles(BENCHMARK_CANDLES, '4h', BENCHMARK_SEED, BENCHMARK_START)
+
+    loop_results, loop_time = time_engine(df, 'loop')
+    print(f"  {'loop':<12} {loop_time:8.3f}s ({loop_results['total_trades']} trades)")
+
+    all_identical = True
+    for engine in ('incremental', 'vectorized'):
+        results, elapsed = time_engine(df, engine)
+        identical = results['trades'] == loop_results['trades']
+        all_identical = all_identical and identical
+        speedup = loop_time / elapsed if elapsed > 0 else float('inf')
+        print(f"  {engine:<12} {elapsed:8.3f}s ({results['total_trades']} trades) "
+              f"{speedup:6.0f}x  identical: {'✅' if identical else '❌'}")
+
+    print("="*80)
+
+    return all_identical
+
+
+def check_parallel_signals():
+    """Check that chunked parallel signal generation equals the single-process run on 1m candles"""
+    print(f"Parallel signals: {PARALLEL_CHECK_CANDLES:,} 1m candles, {PARALLEL_CHECK_CHUNK:,} per chunk, "
+          f"{PARALLEL_CHECK_PROCESSES} processes")
+    df = synthetic_candles(PARALLEL_CHECK_CANDLES, '1m', BENCHMARK_SEED, BENCHMARK_START)
+
+    all_identical = True
+    for engine in ('vectorized', 'incremental'):
+        serial = list(generate_signals(df, engine=engine))
+        parallel = generate_signals(df, engine=engine, processes=PARALLEL_CHECK_PROCESSES,
+                                    chunk_candles=PARALLEL_CHECK_CHUNK)
+        identical = parallel == serial
+        all_identical = all_identical and identical
+        print(f"  {engine:<12} {sum(s is not None for s in serial):6d} signals  "
+              f"identical: {'✅' if identical else '❌'}")
+
+    print("="*80)
+
+    return all_identical
+
+
+def check_gap_liquidation():
+    """Check that a gap down through a long's liquidation price liquidates it in every engine and the replay"""
+    df = synthetic_candles(BENCHMARK_CANDLES, '4h', BENCHMARK_SEED, BENCHMARK_START)
+    with contextlib.redirect_stdout(io.StringIO()):
+        baseline = run_backtest(df, INITIAL_CAPITAL, 'vectorized')
+    entry_time = next(t['entry_time'] for t in baseline['trades'] if t['side'] == 'LONG')
+
+    # Every candle from the one after the entry on opens GAP_CHECK_PCT lower
+    gap_at = int(df['open_time'].searchsorted(entry_time)) + 1
+    gapped = df.copy()
+    for name in ('open', 'high', 'low', 'close'):
+        gapped.loc[gap_at:, name] *= 1 - GAP_CHECK_PCT
+    print(f"Gap liquidation: {GAP_CHECK_PCT*100:.0f}% gap down at {gapped['open_time'].iloc[gap_at]:%Y-%m-%d %H:%M} "
+          f"into a long opened at {entry_time:%Y-%m-%d %H:%M}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        runs = {engine: run_backtest(gapped, INITIAL_CAPITAL, engine) for engine in ('loop', 'incremental', 'vectorized')}
+        runs['replay'] = replay_signals(record_signals(gapped), INITIAL_CAPITAL)
+
+    all_ok = True
+    for name, results in runs.items():
+        trade = next((t for t in results['trades'] if t['entry_time'] == entry_time), None)
+        liquidated = trade is not None and trade['liquidated']
+        identical = len(results['trades']) == len(runs['loop']['trades']) and all(
+            a['liquidated'] == b['liquidated'] and abs(a['pnl'] - b['pnl']) < 1e-9
+            for a, b in zip(results['trades'], runs['loop']['trades'])
+        )
+        all_ok = all_ok and liquidated and identical
+        print(f"  {name:<12} liquidated: {'✅' if liquidated else '❌'}  identical: {'✅' if identical else '❌'}")
+
+    print("="*80)
+
+    return all_ok
+
+
+def make_fixture(n, interval):
+    """Synthetic candles plus the inputs the hot-path cases need"""
+    df = synthetic_candles(n, interval, BENCHMARK_SEED, BENCHMARK_START)
+    columns = ('open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time')
+    open_time = df['open_time'].dt.as_unit('ms').astype('int64').to_numpy()
+    klines = [
+        dict(zip(columns, row))
+        for row in zip(open_time.tolist(), df['open'].tolist(), df['high'].tolist(), df['low'].tolist(),
+                       df['close'].tolist(), df['volume'].tolist(), df['close_time'].tolist())
+    ]
+
+    # Latest candle with a valid level, so the breakout check runs all its filters
+    level_index = build_level_index(df)
+    level = None
+    end = n
+    for idx in range(n - 1, max(n - 500, 0), -1):
+        level = calculate_level_with_decay(df, idx, level_index)
+        if level and level.get('valid'):
+            end = idx + 1
+            break
+    breakout_df = df.iloc[:end]
+
+    return {
+        'df': df,
+        'klines': klines,
+        'breakout_df': breakout_df,
+        'level': level,
+        'trend_filter': check_trend_filter(breakout_df)
+    }
+
+
+def _size_positions(fixture):
+    """Size one position per candle of the fixture"""
+    close = fixture['df']['close'].to_numpy()
+    for price in close.tolist():
+        calculate_position_size(INITIAL_CAPITAL, price, price * 0.996, 'LONG', 4.0, current_price=price,
+                                funding_rate=0.0001)
+
+
+SUITE_CASES = {
+    'klines_to_df': lambda f: klines_to_df(f['klines']),
+    'calculate_atr': lambda f: calculate_atr(f['df']),
+    'calculate_ema': lambda f: calculate_ema(f['df'], 20),
+    'calculate_level_with_decay': lambda f: calculate_level_with_decay(f['df'], len(f['df']) - 1),
+    'check_breakout_enhanced': lambda f: check_breakout_enhanced(f['breakout_df'], f['level'], f['trend_filter']),
+    'calculate_position_size': _size_positions,
+    'backtest_triton73': lambda f: run_backtest(f['df'], INITIAL_CAPITAL),
+}
+
+
+def time_case(case, fixture):
+    """Repeat one case, returns (best, median) seconds and the repeat count"""
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        while len(timings) < SUITE_MAX_REPEATS:
+            start = time.perf_counter()
+            case(fixture)
+            timings.append(time.perf_counter() - start)
+            if len(timings) >= SUITE_MIN_REPEATS and sum(timings) >= SUITE_MIN_TIME:
+                break
+    return min(timings), statistics.median(timings), len(timings)
+
+
+def run_suite(sizes=tuple(SUITE_FIXTURES), cases=tuple(SUITE_CASES)):
+    """Time every case on every fixture size, returns the results document"""
+    results = {}
+    for n in sizes:
+        interval = SUITE_FIXTURES.get(n, '4h')
+        print(f"📊 Fixture: {n:,} {interval} candles (seed {BENCHMARK_SEED})")
+        fixture = make_fixture(n, interval)
+        for name in cases:
+            best, median, repeats = time_case(SUITE_CASES[name], fixture)
+            results[f"{name}/{n}"] = {
+                'case': name,
+                'candles': n,
+                'best_s': best,
+                'median_s': median,
+                'repeats': repeats,
+                'ns_per_candle': best / n * 1e9
+            }
+            print(f"  {name:<28} {best * 1000:10.3f}ms best {median * 1000:10.3f}ms median ({repeats}x)")
+        del fixture
+
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'results': results
+    }
+
+
+def compare_results(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """Compare two results documents, returns rows (key, baseline_s, current_s, change, regression)
+
+    Cases are compared on their best time; only cases present in both
+    documents are compared.
+    """
+    rows = []
+    for key, result in current['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        change = result['best_s'] / base['best_s'] - 1 if base['best_s'] > 0 else 0.0
+        rows.append((key, base['best_s'], result['best_s'], change, change > threshold))
+    return rows
+
+
+def print_comparison(rows, threshold=REGRESSION_THRESHOLD):
+    """Print a comparison table, returns the number of regressions"""
+    print("="*80)
+    print(f"BENCHMARK COMPARISON (regression above +{threshold*100:.0f}%)")
+    print("="*80)
+    print(f"{'Case':<40}{'Baseline':>12}{'Current':>12}{'Change':>10}")
+    print("-"*80)
+    for key, base, current, change, regression in rows:
+        flag = '  ❌ REGRESSION' if regression else ''
+        print(f"{key:<40}{base * 1000:>10.3f}ms{current * 1000:>10.3f}ms{change * 100:>+9.1f}%{flag}")
+    print("="*80)
+    regressions = sum(1 for row in rows if row[4])
+    if regressions:
+        print(f"❌ {regressions} regression(s)")
+    else:
+        print(f"✅ No regressions in {len(rows)} cases")
+    return regressions
+
+
+def main():
+    """Run the engine benchmark, the hot-path suite or a baseline comparison"""
+    parser = argparse.ArgumentParser(description='Triton73 benchmarks')
+    parser.add_argument('--suite', action='store_true', help='Time the strategy hot paths on synthetic fixtures')
+    parser.add_argument('--sizes', default=','.join(str(n) for n in SUITE_FIXTURES),
+                        help='Comma-separated fixture sizes (default: 500,10000,1000000)')
+    parser.add_argument('--cases', default=','.join(SUITE_CASES), help='Comma-separated suite cases')
+    parser.add_argument('--output', default=SUITE_RESULTS_FILE, help='Suite results file')
+    parser.add_argument('--save-baseline', action='store_true', help=f'Also save the suite results as {SUITE_BASELINE_FILE}')
+    parser.add_argument('--compare', metavar='RESULTS', help='Compare a suite results file against the baseline')
+    parser.add_argument('--baseline', default=SUITE_BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='Slowdown that counts as a regression (default: 0.20 = 20%%)')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            current = json.load(f)
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = print_comparison(compare_results(current, baseline, args.threshold), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    if not args.suite:
+        identical = benchmark_engines()
+        identical = check_parallel_signals() and identical
+        identical = check_gap_liquidation() and identical
+        sys.exit(0 if identical else 1)
+
+    cases = [name.strip() for name in args.cases.split(',') if name.strip()]
+    unknown = [name for name in cases if name not in SUITE_CASES]
+    if unknown:
+        parser.error(f"Unknown case(s): {', '.join(unknown)}")
+    sizes = [int(n) for n in args.sizes.split(',') if n.strip()]
+
+    print("="*80)
+    print("TRITON73 HOT-PATH BENCHMARK SUITE")
+    print("="*80)
+    document = run_suite(sizes, cases)
+    print("="*80)
+
+    paths = [args.output] + ([args.baseline] if args.save_baseline else [])
+    for path in paths:
+        with open(path, 'w') as f:
+            json.dump(document, f, indent=2)
+    print(f"✅ Results saved to {', '.join(paths)}")
+
+
+if __name__ == "__main__":
+    main()
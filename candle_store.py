@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Columnar Candle Store
+Fixed-width binary candle columns, one file per column per symbol/interval,
+opened with numpy.memmap.
+
+Loading a range is a binary search on the open_time column plus array
+views, so years of 1m candles open in constant time and every process
+reading the same files shares the OS page cache. The store is filled
+from the SQLite kline cache: each sync only appends the candles after the
+last stored open_time (the last stored candle is rewritten because it may
+still have been forming).
+
+Layout:
+    candle_store/BTCUSDT_4h/meta.json       # {"rows": n, "columns": {name: dtype}}
+    candle_store/BTCUSDT_4h/open_time.bin   # little-endian int64 ms
+    candle_store/BTCUSDT_4h/close.bin       # little-endian float64
+    ...
+
+Usage:
+    python3 candle_store.py                          # sync BTCUSDT 4h, last 180 days
+    python3 candle_store.py --interval 1m --days 730
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from kline_cache import KLINE_CACHE_FILE, KLINE_COLUMNS, get_klines_window
+from kline_downloader import INTERVAL_MS
+
+# Store Settings
+CANDLE_STORE_DIR = os.environ.get('CANDLE_STORE_DIR', 'candle_store')
+SYNC_BATCH_CANDLES = 100_000  # Candles copied from the kline cache per write
+CHUNK_CANDLES = 100_000  # Candles per DataFrame yielded by iter_candle_chunks()
+
+STORE_COLUMNS = {
+    'open_time': '<i8',
+    'open': '<f8',
+    'high': '<f8',
+    'low': '<f8',
+    'close': '<f8',
+    'volume': '<f8',
+    'close_time': '<i8'
+}
+
+
+def store_path(symbol, interval, root=CANDLE_STORE_DIR):
+    """Directory holding the column files of symbol/interval"""
+    return os.path.join(root, f"{symbol}_{interval}")
+
+
+def stored_rows(symbol, interval, root=CANDLE_STORE_DIR):
+    """Number of candles stored for symbol/interval (0 if none)"""
+    try:
+        with open(os.path.join(store_path(symbol, interval, root), 'meta.json'), 'r') as f:
+            return int(json.load(f)['rows'])
+    except FileNotFoundError:
+        return 0
+
+
+def _write_meta(path, rows):
+    """Publish the row count; readers never see rows beyond it"""
+    tmp = os.path.join(path, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump({'rows': rows, 'columns': STORE_COLUMNS}, f)
+    os.replace(tmp, os.path.join(path, 'meta.json'))
+
+
+def open_candles(symbol, interval, root=CANDLE_STORE_DIR):
+    """Stored columns as read-only memmaps {column: array}, None if nothing is stored"""
+    rows = stored_rows(symbol, interval, root)
+    if rows == 0:
+        return None
+    path = store_path(symbol, interval, root)
+    return {
+        name: np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode='r', shape=(rows,))
+        for name, dtype in STORE_COLUMNS.items()
+    }
+
+
+def _klines_columns(klines):
+    """fetch_mexc_klines() dicts as {column: array}, sorted by open_time"""
+    columns = {
+        name: np.array([k[name] for k in klines], dtype=STORE_COLUMNS[name])
+        for name in KLINE_COLUMNS
+    }
+    order = np.argsort(columns['open_time'], kind='stable')
+    return {name: values[order] for name, values in columns.items()}
+
+
+def write_candles(symbol, interval, klines, root=CANDLE_STORE_DIR):
+    """Merge candles into the store, returns the stored row count
+
+    Stored candles from the first new open_time on are replaced, so the
+    common case (new candles after the stored ones) only rewrites the
+    tail of each column file. New candles in front of or between stored
+    ones rewrite the columns.
+    """
+    if not klines:
+        return stored_rows(symbol, interval, root)
+    new = _klines_columns(klines)
+    path = store_path(symbol, interval, root)
+    os.makedirs(path, exist_ok=True)
+
+    stored = open_candles(symbol, interval, root)
+    keep = 0
+    if stored is not None:
+        open_time = stored['open_time']
+        keep = int(np.searchsorted(open_time, new['open_time'][0], side='left'))
+        after = int(np.searchsorted(open_time, new['open_time'][-1], side='right'))
+        if after < len(open_time):
+            # Candles stored after the new ones: merge everything and rewrite
+            merged = {name: np.concatenate([stored[name], new[name]]) for name in STORE_COLUMNS}
+            _, first = np.unique(merged['open_time'][::-1], return_index=True)
+            index = len(merged['open_time']) - 1 - first  # Newest copy of every open_time
+            new = {name: values[index] for name, values in merged.items()}
+            keep = 0
+        del stored, open_time
+
+    rows = keep + len(new['open_time'])
+    for name, dtype in STORE_COLUMNS.items():
+        file_path = os.path.join(path, f"{name}.bin")
+        data = np.ascontiguousarray(new[name], dtype=dtype).tobytes()
+        if keep:
+            with open(file_path, 'r+b') as f:
+                f.seek(keep * np.dtype(dtype).itemsize)
+                f.write(data)
+                f.truncate()
+        else:
+            # Fresh files, so memmaps of the old ones stay valid
+            with open(file_path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(file_path + '.tmp', file_path)
+    _write_meta(path, rows)
+    return rows
+
+
+def sync_candle_store(symbol, interval, start_time, end_time=None, root=CANDLE_STORE_DIR,
+                      cache_path=KLINE_CACHE_FILE, update=True):
+    """Bring the store up to end_time (ms) from the kline cache, returns the rows written
+
+    Only candles from the last stored open_time on are copied, plus the
+    older range if start_time lies before the first stored candle. The
+    range is synced in windows of SYNC_BATCH_CANDLES: with update the
+    candles of a window missing from the kline cache are downloaded, then
+    the window is copied to the store before the next one is fetched, so
+    long 1m histories never sit in memory as Python objects all at once.
+    """
+    end_time = end_time if end_time is not None else int(datetime.now(timezone.utc).timestamp() * 1000)
+    stored = open_candles(symbol, interval, root)
+    if stored is None or start_time < int(stored['open_time'][0]):
+        since = start_time
+    else:
+        since = int(stored['open_time'][-1])
+    del stored
+
+    written = 0
+    batch_ms = SYNC_BATCH_CANDLES * INTERVAL_MS.get(interval, INTERVAL_MS['1m'])
+    for batch_start in range(since, end_time + 1, batch_ms):
+        batch_end = min(batch_start + batch_ms - 1, end_time)
+        klines = get_klines_window(symbol, interval, batch_start, batch_end, cache_path, update)
+        write_candles(symbol, interval, klines, root)
+        written += len(klines)
+    return written
+
+
+def candles_frame(columns, start_time=None, end_time=None):
+    """DataFrame of the stored candles in [start_time, end_time] (ms), None if empty
+
+    The price and volume columns are views of the memmaps; only the
+    open_time column is converted to timestamps.
+    """
+    if columns is None:
+        return None
+    open_time = columns['open_time']
+    lo = 0 if start_time is None else int(np.searchsorted(open_time, start_time, side='left'))
+    hi = len(open_time) if end_time is None else int(np.searchsorted(open_time, end_time, side='right'))
+    if hi <= lo:
+        return None
+
+    df = pd.DataFrame({
+        'open_time': pd.to_datetime(np.asarray(open_time[lo:hi]), unit='ms', utc=True),
+        **{name: np.asarray(columns[name][lo:hi]) for name in ('open', 'high', 'low', 'close', 'volume')},
+        'close_time': np.asarray(columns['close_time'][lo:hi])
+    }, copy=False)
+    return df
+
+
+def iter_candle_chunks(symbol, interval, start_time=None, end_time=None, chunk_candles=CHUNK_CANDLES,
+                       root=CANDLE_STORE_DIR):
+    """Yield the stored candles in [start_time, end_time] (ms) as consecutive DataFrames
+
+    Each chunk holds at most chunk_candles rows mapped from the store, so
+    memory stays bounded by the chunk size whatever the history length.
+    """
+    columns = open_candles(symbol, interval, root)
+    if columns is None:
+        return
+    open_time = columns['open_time']
+    lo = 0 if start_time is None else int(np.searchsorted(open_time, start_time, side='left'))
+    hi = len(open_time) if end_time is None else int(np.searchsorted(open_time, end_time, side='right'))
+    for chunk_start in range(lo, hi, chunk_candles):
+        chunk_end = min(chunk_start + chunk_candles, hi)
+        yield candles_frame(columns, int(open_time[chunk_start]), int(open_time[chunk_end - 1]))
+
+
+def load_candles(symbol, interval, start_time, end_time, root=CANDLE_STORE_DIR, update=True):
+    """Candles in [start_time, end_time] (ms) as a DataFrame, syncing the store first
+
+    With update=False nothing is downloaded; the store is only filled from
+    what the kline cache already holds.
+    """
+    sync_candle_store(symbol, interval, start_time, end_time, root, update=update)
+    return candles_frame(open_candles(symbol, interval, root), start_time, end_time)
+
+
+def candle_source(symbol, interval, start_time, end_time, root=CANDLE_STORE_DIR):
+    """Picklable description of a stored candle range, for worker processes"""
+    return {'symbol': symbol, 'interval': interval, 'start_time': int(start_time),
+            'end_time': int(end_time), 'root': root}
+
+
+def load_candle_source(source):
+    """DataFrame of a candle_source() range, mapped from the store without syncing"""
+    columns = open_candles(source['symbol'], source['interval'], source['root'])
+    return candles_frame(columns, source['start_time'], source['end_time'])
+
+
+def main():
+    """Sync the columnar store from the command line and print what is stored"""
+    parser = argparse.ArgumentParser(description='Memory-mapped columnar candle store')
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--interval', default='4h')
+    parser.add_argument('--days', type=int, default=180, help='History to store (default: 180)')
+    parser.add_argument('--root', default=CANDLE_STORE_DIR, help='Store directory')
+    args = parser.parse_args()
+
+    start_time = int((datetime.now() - timedelta(days=args.days)).timestamp() * 1000)
+    written = sync_candle_store(args.symbol, args.interval, start_time, root=args.root)
+    columns = open_candles(args.symbol, args.interval, args.root)
+
+    rows = len(columns['open_time']) if columns is not None else 0
+    print(f"✅ {args.symbol} {args.interval}: {written} candles synced, {rows} stored")
+    if rows:
+        size = sum(values.nbytes for values in columns.values())
+        print(f"   {datetime.fromtimestamp(columns['open_time'][0] / 1000, timezone.utc):%Y-%m-%d %H:%M} to "
+              f"{datetime.fromtimestamp(columns['open_time'][-1] / 1000, timezone.utc):%Y-%m-%d %H:%M} UTC "
+              f"({size / 1e6:.1f} MB in {store_path(args.symbol, args.interval, args.root)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Local Funding Rate Cache
+Historical funding settlements of MEXC perpetual contracts, kept in the
+same SQLite database as the kline cache.
+
+MEXC serves the funding history newest first in pages, so each sync
+only pages back until it reaches the last stored settlement (or the
+requested start, when older history is needed). Backtests read the
+stored rates as arrays and work offline.
+
+Usage:
+    python3 funding_cache.py                      # sync BTCUSDT, last 180 days
+    python3 funding_cache.py --days 730
+    MEXC_CONTRACT_API_BASE=http://127.0.0.1:8073/api/v1/contract python3 funding_cache.py   # local stand-in
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import requests
+
+from kline_cache import KLINE_CACHE_FILE
+from kline_downloader import RateLimiter, RATE_LIMIT_PER_SEC, MAX_RETRIES, RETRY_BACKOFF_SEC
+
+# MEXC Futures API Configuration
+MEXC_CONTRACT_API_BASE = os.environ.get('MEXC_CONTRACT_API_BASE', "https://contract.mexc.com/api/v1/contract")
+
+# Funding Settings
+FUNDING_CACHE_FILE = os.environ.get('FUNDING_CACHE_FILE', KLINE_CACHE_FILE)
+FUNDING_INTERVAL_MS = 8 * 3_600_000  # Settlements at 00:00, 08:00 and 16:00 UTC
+FUNDING_PAGE_SIZE = 100  # Settlements per history request
+
+
+def contract_symbol(symbol):
+    """MEXC futures symbol of a spot-style symbol (BTCUSDT -> BTC_USDT)"""
+    if '_' in symbol:
+        return symbol
+    for quote in ('USDT', 'USDC', 'USD'):
+        if symbol.endswith(quote):
+            return f"{symbol[:-len(quote)]}_{quote}"
+    return symbol
+
+
+def connect_funding_cache(path=FUNDING_CACHE_FILE):
+    """Open the cache database (funding table created on first use)"""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS funding_rates (
+            symbol TEXT NOT NULL,
+            funding_time INTEGER NOT NULL,
+            funding_rate REAL NOT NULL,
+            PRIMARY KEY (symbol, funding_time)
+        ) WITHOUT ROWID
+    """)
+    return conn
+
+
+def store_funding_rates(conn, symbol, rows):
+    """Insert or replace (funding_time, funding_rate) rows, returns the number written"""
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO funding_rates VALUES (?, ?, ?)",
+                         [(symbol, int(t), float(rate)) for t, rate in rows])
+    return len(rows)
+
+
+def cached_funding_range(conn, symbol):
+    """(first_funding_time, last_funding_time, count) stored for symbol"""
+    return conn.execute(
+        "SELECT MIN(funding_time), MAX(funding_time), COUNT(*) FROM funding_rates WHERE symbol = ?", (symbol,)
+    ).fetchone()
+
+
+def load_funding_rates(conn, symbol, start_time=None, end_time=None):
+    """Stored settlements in [start_time, end_time] (ms) as (funding_time, funding_rate) arrays"""
+    query = "SELECT funding_time, funding_rate FROM funding_rates WHERE symbol = ?"
+    params = [symbol]
+    if start_time is not None:
+        query += " AND funding_time >= ?"
+        params.append(int(start_time))
+    if end_time is not None:
+        query += " AND funding_time <= ?"
+        params.append(int(end_time))
+    rows = conn.execute(query + " ORDER BY funding_time", params).fetchall()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+    times, rates = zip(*rows)
+    return np.array(times, dtype=np.int64), np.array(rates, dtype=float)
+
+
+def fetch_funding_page(symbol, page, base_url=MEXC_CONTRACT_API_BASE, rate_limiter=None):
+    """One page of the funding history, returns (rows, total_pages); rows is None on error"""
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt > 0:
+            time.sleep(RETRY_BACKOFF_SEC * attempt)
+        if rate_limiter:
+            rate_limiter.wait()
+        try:
+            params = {'symbol': contract_symbol(symbol), 'page_num': page, 'page_size': FUNDING_PAGE_SIZE}
+            response = requests.get(f"{base_url}/funding_rate/history", params=params, timeout=10)
+            response.raise_for_status()
+            data = response.json()['data']
+            rows = [(int(r['settleTime']), float(r['fundingRate'])) for r in data.get('resultList', [])]
+            return rows, int(data.get('totalPage', page))
+        except Exception as e:
+            print(f"⚠️  Error fetching {symbol} funding history page {page}: {e}")
+    return None, page
+
+
+def download_funding_rates(symbol, until, base_url=MEXC_CONTRACT_API_BASE):
+    """Settlements from now back to `until` (ms), returns (rows, complete)
+
+    Pages are fetched newest first until one reaches `until` or the
+    history ends; complete is False if a page still failed after retries.
+    """
+    rate_limiter = RateLimiter(RATE_LIMIT_PER_SEC)
+    rows = []
+    page = 1
+    while True:
+        page_rows, total_pages = fetch_funding_page(symbol, page, base_url, rate_limiter)
+        if page_rows is None:
+            return rows, False
+        rows.extend(page_rows)
+        if not page_rows or page >= total_pages or min(t for t, _ in page_rows) <= until:
+            return rows, True
+        page += 1
+
+
+def sync_funding_rates(conn, symbol, start_time=None, base_url=MEXC_CONTRACT_API_BASE):
+    """Download the settlements missing from the cache, returns the number written
+
+    Pages back to the last stored settlement, or to start_time when it
+    lies more than one funding interval before the first stored one (no
+    settlement can be missing in between). An empty cache is filled from
+    start_time. Nothing is stored when a page fails: the stored history
+    stays contiguous, so the next sync downloads the same range again.
+    """
+    first, last, count = cached_funding_range(conn, symbol)
+    if count == 0 and start_time is None:
+        return 0
+    if count == 0 or (start_time is not None and start_time < first - FUNDING_INTERVAL_MS):
+        until = start_time
+    else:
+        until = last
+    rows, complete = download_funding_rates(symbol, until, base_url)
+    if not complete:
+        print(f"⚠️  {symbol} funding history incomplete, nothing stored (retried on the next sync)")
+        return 0
+    return store_funding_rates(conn, symbol, rows)
+
+
+def get_funding_rates(symbol, start_time, end_time, path=FUNDING_CACHE_FILE, update=True):
+    """Settlements in [start_time, end_time] (ms) as arrays, downloading only what is not cached"""
+    with closing(connect_funding_cache(path)) as conn:
+        if update:
+            sync_funding_rates(conn, symbol, start_time)
+        return load_funding_rates(conn, symbol, start_time, end_time)
+
+
+def main():
+    """Sync the funding cache from the command line and print what is stored"""
+    parser = argparse.ArgumentParser(description='Local MEXC funding rate cache')
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--days', type=int, default=180, help='History to keep cached (default: 180)')
+    parser.add_argument('--path', default=FUNDING_CACHE_FILE, help='Cache database file')
+    args = parser.parse_args()
+
+    start_time = int((datetime.now() - timedelta(days=args.days)).timestamp() * 1000)
+
+    with closing(connect_funding_cache(args.path)) as conn:
+        written = sync_funding_rates(conn, args.symbol, start_time)
+        first, last, count = cached_funding_range(conn, args.symbol)
+        _, rates = load_funding_rates(conn, args.symbol)
+
+    print(f"✅ {args.symbol} funding: {written} settlements written, {count} cached")
+    if count:
+        print(f"   {datetime.fromtimestamp(first / 1000, timezone.utc):%Y-%m-%d %H:%M} to "
+              f"{datetime.fromtimestamp(last / 1000, timezone.utc):%Y-%m-%d %H:%M} UTC, "
+              f"mean {rates.mean()*100:.4f}% per 8h (min {rates.min()*100:.4f}%, max {rates.max()*100:.4f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Local Kline Cache
+Persistent SQLite candle store keyed by symbol and interval.
+
+Each sync only downloads candles from the last stored open_time onwards
+(the last stored candle is re-fetched because it may still have been
+forming), so live cycles fetch one or two candles and backtests are
+served locally and work offline. Candles a download could not get are
+recorded as gaps and requested again by the following syncs; gaps still
+missing after KLINE_GAP_SYNCS downloads are taken as exchange gaps.
+
+Usage:
+    python3 kline_cache.py                      # sync BTCUSDT 4h, last 180 days
+    python3 kline_cache.py --interval 1h --days 365
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+
+from kline_downloader import MEXC_API_BASE, INTERVAL_MS, download_klines_concurrent, find_gaps
+
+# Cache Settings
+KLINE_CACHE_FILE = os.environ.get('KLINE_CACHE_FILE', 'klines_cache.db')
+KLINE_GAP_SYNCS = 3  # Downloads missing a range before it counts as an exchange gap
+
+KLINE_COLUMNS = ('open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time')
+
+
+def connect_cache(path=KLINE_CACHE_FILE):
+    """Open the cache database (created on first use)"""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS klines (
+            symbol TEXT NOT NULL,
+            interval TEXT NOT NULL,
+            open_time INTEGER NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume REAL NOT NULL,
+            close_time INTEGER NOT NULL,
+            PRIMARY KEY (symbol, interval, open_time)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS kline_gaps (
+            symbol TEXT NOT NULL,
+            interval TEXT NOT NULL,
+            start_time INTEGER NOT NULL,
+            end_time INTEGER NOT NULL,
+            attempts INTEGER NOT NULL,
+            PRIMARY KEY (symbol, interval, start_time)
+        ) WITHOUT ROWID
+    """)
+    return conn
+
+
+def _kline_row(symbol, interval, k):
+    """Cache row for a raw MEXC kline list or a fetch_mexc_klines() dict"""
+    if isinstance(k, dict):
+        k = [k[col] for col in KLINE_COLUMNS]
+    return (symbol, interval, int(k[0]), float(k[1]), float(k[2]), float(k[3]),
+            float(k[4]), float(k[5]), int(k[6]))
+
+
+def store_klines(conn, symbol, interval, klines):
+    """Insert or replace candles, returns the number of rows written"""
+    rows = [_kline_row(symbol, interval, k) for k in klines]
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO klines VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+
+def record_gaps(conn, symbol, interval, gaps, attempts=1):
+    """Remember (start, end) open-time ranges a download left missing"""
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO kline_gaps VALUES (?, ?, ?, ?, ?)",
+            [(symbol, interval, int(start), int(end), attempts) for start, end in gaps]
+        )
+
+
+def pending_gaps(conn, symbol, interval):
+    """Recorded gaps still to be requested, as (start, end, attempts)"""
+    return conn.execute(
+        "SELECT start_time, end_time, attempts FROM kline_gaps WHERE symbol = ? AND interval = ? AND attempts < ? "
+        "ORDER BY start_time",
+        (symbol, interval, KLINE_GAP_SYNCS)
+    ).fetchall()
+
+
+def cached_range(conn, symbol, interval):
+    """(first_open_time, last_open_time, count) stored for symbol/interval"""
+    return conn.execute(
+        "SELECT MIN(open_time), MAX(open_time), COUNT(*) FROM klines WHERE symbol = ? AND interval = ?",
+        (symbol, interval)
+    ).fetchone()
+
+
+def load_klines(conn, symbol, interval, start_time=None, end_time=None, limit=None):
+    """Stored candles in [start_time, end_time] (ms) as fetch_mexc_klines() dicts
+
+    With a limit, the most recent `limit` candles of the range are returned.
+    Candles are always in ascending open_time order.
+    """
+    query = f"SELECT {', '.join(KLINE_COLUMNS)} FROM klines WHERE symbol = ? AND interval = ?"
+    params = [symbol, interval]
+    if start_time is not None:
+        query += " AND open_time >= ?"
+        params.append(int(start_time))
+    if end_time is not None:
+        query += " AND open_time <= ?"
+        params.append(int(end_time))
+    query += " ORDER BY open_time DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(int(limit))
+
+    rows = conn.execute(query, params).fetchall()
+    return [dict(zip(KLINE_COLUMNS, row)) for row in reversed(rows)]
+
+
+def download_klines(symbol, interval, start_time, end_time=None):
+    """Download [start_time, end_time] (ms), returns (raw klines, gaps)
+
+    Uses the concurrent downloader; gaps lists the (start, end) ranges
+    still missing after its retries (they are reported, the rest is
+    returned), empty when the range is complete.
+    """
+    klines, gaps = download_klines_concurrent(symbol, interval, start_time, end_time, base_url=MEXC_API_BASE)
+    if gaps:
+        print(f"⚠️  {symbol} {interval}: {sum((e - s) // INTERVAL_MS[interval] + 1 for s, e in gaps)} "
+              f"candle(s) missing in {len(gaps)} gap(s) after retries")
+    return klines, gaps
+
+
+def _download_range(conn, symbol, interval, start_time, end_time, attempts=1):
+    """Download and store [start_time, end_time], recording the holes left inside the cache; returns rows written
+
+    Missing candles before the first or after the last stored one are not
+    recorded, the next sync requests them anyway when extending the cache.
+    """
+    klines, gaps = download_klines(symbol, interval, start_time, end_time)
+    written = store_klines(conn, symbol, interval, klines)
+    first, last, _ = cached_range(conn, symbol, interval)
+    record_gaps(conn, symbol, interval, [(s, e) for s, e in gaps if first is not None and first < s and e < last],
+                attempts)
+    return written
+
+
+def sync_klines(conn, symbol, interval, start_time=None, end_time=None):
+    """Download the candles missing from the cache, returns the number written
+
+    Requests the recorded gaps again, then fetches from the last stored
+    open_time up to end_time (default: now) and, if start_time lies
+    before the first stored candle, the older range as well. An empty
+    cache is filled from start_time.
+    """
+    first, last, count = cached_range(conn, symbol, interval)
+    now = int(time.time() * 1000)
+    end_time = now if end_time is None else min(int(end_time), now)
+    written = 0
+
+    if count == 0:
+        if start_time is None:
+            return 0
+        return _download_range(conn, symbol, interval, start_time, end_time)
+
+    for gap_start, gap_end, attempts in pending_gaps(conn, symbol, interval):
+        with conn:
+            conn.execute("DELETE FROM kline_gaps WHERE symbol = ? AND interval = ? AND start_time = ?",
+                         (symbol, interval, gap_start))
+        written += _download_range(conn, symbol, interval, gap_start, gap_end, attempts + 1)
+
+    if start_time is not None and start_time < first:
+        written += _download_range(conn, symbol, interval, start_time, first - 1)
+
+    if end_time > last:
+        # The last stored candle may have been forming, fetch it again
+        written += _download_range(conn, symbol, interval, last, end_time)
+
+    return written
+
+
+def fetch_cached_klines(symbol, interval, limit=500, path=KLINE_CACHE_FILE):
+    """Drop-in for fetch_mexc_klines(): sync new candles, return the latest `limit`
+
+    Falls back to the cached candles when MEXC is unreachable.
+    """
+    try:
+        with closing(connect_cache(path)) as conn:
+            _, last, count = cached_range(conn, symbol, interval)
+            start_time = None
+            if count == 0:
+                start_time = int(time.time() * 1000) - limit * INTERVAL_MS.get(interval, INTERVAL_MS['4h'])
+            sync_klines(conn, symbol, interval, start_time)
+            return load_klines(conn, symbol, interval, limit=limit) or None
+    except (sqlite3.Error, ValueError) as e:
+        print(f"⚠️  Kline cache error: {e}")
+        return None
+
+
+def get_klines_range(symbol, interval, start_time, end_time, path=KLINE_CACHE_FILE, update=True):
+    """Candles in [start_time, end_time] (ms), downloading only what is not cached"""
+    with closing(connect_cache(path)) as conn:
+        if update:
+            sync_klines(conn, symbol, interval, start_time, end_time)
+        return load_klines(conn, symbol, interval, start_time, end_time)
+
+
+def get_klines_window(symbol, interval, start_time, end_time, path=KLINE_CACHE_FILE, update=True):
+    """Candles in [start_time, end_time] (ms), downloading only missing candles of that window
+
+    Unlike get_klines_range() the cache is not extended up to its stored
+    range, so sparse windows (e.g. 1m candles of single 4h candles) stay
+    cheap. Candles that may still have been forming are re-fetched.
+    """
+    interval_ms = INTERVAL_MS[interval]
+    with closing(connect_cache(path)) as conn:
+        klines = load_klines(conn, symbol, interval, start_time, end_time)
+        if not update:
+            return klines
+
+        gaps = find_gaps([[k['open_time']] for k in klines], start_time, end_time, interval_ms)
+        if klines and klines[-1]['close_time'] >= int(time.time() * 1000) - interval_ms:
+            gaps.append((klines[-1]['open_time'], end_time))
+        if not gaps:
+            return klines
+
+        for gap_start, gap_end in gaps:
+            fetched, _ = download_klines(symbol, interval, gap_start, gap_end)
+            store_klines(conn, symbol, interval, fetched)
+        return load_klines(conn, symbol, interval, start_time, end_time)
+
+
+def main():
+    """Sync the cache from the command line and print what is stored"""
+    parser = argparse.ArgumentParser(description='Local MEXC kline cache')
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--interval', default='4h')
+    parser.add_argument('--days', type=int, default=180, help='History to keep cached (default: 180)')
+    parser.add_argument('--path', default=KLINE_CACHE_FILE, help='Cache database file')
+    args = parser.parse_args()
+
+    start_time = int((datetime.now() - timedelta(days=args.days)).timestamp() * 1000)
+
+    with closing(connect_cache(args.path)) as conn:
+        written = sync_klines(conn, args.symbol, args.interval, start_time)
+        first, last, count = cached_range(conn, args.symbol, args.interval)
+
+    print(f"✅ {args.symbol} {args.interval}: {written} candles written, {count} cached")
+    if count:
+        print(f"   {datetime.fromtimestamp(first / 1000, timezone.utc):%Y-%m-%d %H:%M} to "
+              f"{datetime.fromtimestamp(last / 1000, timezone.utc):%Y-%m-%d %H:%M} UTC")
+
+
+if __name__ == "__main__":
+    main()
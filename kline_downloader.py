@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Concurrent Kline Downloader
+Downloads a historical date range from the MEXC /klines endpoint.
+
+The range is split into windows of at most one page (KLINE_PAGE_LIMIT
+candles) that are fetched concurrently by a bounded thread pool sharing
+one rate limiter. Results are merged and de-duplicated by open_time, the
+expected candle grid is checked for missing candles, and only the
+windows covering those gaps are fetched again. Rate-limited (HTTP 429)
+requests wait out Retry-After and halve the shared request rate.
+
+Usage:
+    python3 kline_downloader.py --start 2024-01-01 --end 2024-06-30
+    python3 kline_downloader.py --base-url http://127.0.0.1:8073/api/v3   # local stand-in
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+
+# MEXC API Configuration
+MEXC_API_BASE = os.environ.get('MEXC_API_BASE', "https://api.mexc.com/api/v3")
+
+# Downloader Settings
+KLINE_PAGE_LIMIT = 1000  # Max candles per /klines request
+DOWNLOAD_WORKERS = 4  # Concurrent requests
+RATE_LIMIT_PER_SEC = 10.0  # Requests per second across all workers
+MAX_RETRIES = 3  # Extra rounds for windows with missing candles
+RETRY_BACKOFF_SEC = 1.0  # Wait before retry round n: n * RETRY_BACKOFF_SEC
+RATE_LIMIT_RETRIES = 5  # Retries of a window answered with HTTP 429
+RATE_LIMIT_WAIT_SEC = 1.0  # Wait after an HTTP 429 without a Retry-After header
+
+# Interval lengths in milliseconds
+INTERVAL_MS = {
+    '1m': 60_000,
+    '5m': 300_000,
+    '15m': 900_000,
+    '30m': 1_800_000,
+    '1h': 3_600_000,
+    '4h': 14_400_000,
+    '1d': 86_400_000
+}
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart (thread-safe)"""
+
+    def __init__(self, rate):
+        self.min_interval = 1.0 / rate if rate else 0.0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next call is allowed"""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def slow_down(self, retry_after):
+        """Back off after an HTTP 429: hold all calls for retry_after seconds and halve the rate"""
+        with self.lock:
+            resume = time.monotonic() + retry_after
+            # Workers rejected by the same limit back off once
+            if self.next_time < resume:
+                self.min_interval = self.min_interval * 2 or retry_after
+                self.next_time = resume
+
+
+def interval_to_ms(interval):
+    """Interval length in ms (ValueError for unsupported intervals)"""
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Unsupported interval '{interval}' (expected one of {', '.join(INTERVAL_MS)})")
+    return INTERVAL_MS[interval]
+
+
+def expected_open_times(start_time, end_time, interval_ms):
+    """Candle open times (ms) of the interval grid within [start_time, end_time]"""
+    first = -(-int(start_time) // interval_ms) * interval_ms  # Round up to the grid
+    return list(range(first, int(end_time) + 1, interval_ms))
+
+
+def split_windows(start_time, end_time, interval_ms, page_limit=KLINE_PAGE_LIMIT):
+    """Split [start_time, end_time] into (start, end) windows of at most page_limit candles"""
+    span = interval_ms * page_limit
+    windows = []
+    window_start = int(start_time)
+    while window_start <= end_time:
+        window_end = min(window_start + span - 1, int(end_time))
+        windows.append((window_start, window_end))
+        window_start = window_end + 1
+    return windows
+
+
+def merge_klines(batches):
+    """Merge kline batches into one list sorted and de-duplicated by open_time
+
+    A later batch wins for duplicate open times (it holds the newer data).
+    """
+    merged = {}
+    for batch in batches:
+        for k in batch:
+            merged[int(k[0])] = k
+    return [merged[t] for t in sorted(merged)]
+
+
+def find_gaps(klines, start_time, end_time, interval_ms):
+    """Missing candles as (start, end) windows of consecutive expected open times"""
+    have = {int(k[0]) for k in klines}
+    gaps = []
+    for t in expected_open_times(start_time, end_time, interval_ms):
+        if t in have:
+            continue
+        if gaps and gaps[-1][1] == t - interval_ms:
+            gaps[-1] = (gaps[-1][0], t)
+        else:
+            gaps.append((t, t))
+    return gaps
+
+
+def retry_after_sec(response):
+    """Seconds to wait from a response's Retry-After header (RATE_LIMIT_WAIT_SEC if absent)"""
+    value = response.headers.get('Retry-After', '')
+    return float(value) if value.replace('.', '', 1).isdigit() else RATE_LIMIT_WAIT_SEC
+
+
+def fetch_window(symbol, interval, window, base_url=MEXC_API_BASE, rate_limiter=None, session=None):
+    """Fetch one window of klines, returns [] on any error (it shows up as a gap)
+
+    An HTTP 429 answer is retried up to RATE_LIMIT_RETRIES times after its
+    Retry-After wait, which also slows the shared rate_limiter down.
+    """
+    window_start, window_end = window
+    params = {
+        'symbol': symbol,
+        'interval': interval,
+        'startTime': window_start,
+        'endTime': window_end,
+        'limit': KLINE_PAGE_LIMIT
+    }
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        if rate_limiter:
+            rate_limiter.wait()
+        try:
+            response = (session or requests).get(f"{base_url}/klines", params=params, timeout=10)
+            if response.status_code == 429 and attempt < RATE_LIMIT_RETRIES:
+                if rate_limiter:
+                    rate_limiter.slow_down(retry_after_sec(response))
+                else:
+                    time.sleep(retry_after_sec(response))
+                continue
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            print(f"⚠️  Error fetching {symbol} {interval} window {window_start}-{window_end}: {e}")
+            return []
+
+        return [k for k in data or [] if window_start <= int(k[0]) <= window_end]
+
+
+def download_klines_concurrent(symbol, interval, start_time, end_time=None, base_url=MEXC_API_BASE,
+                               workers=DOWNLOAD_WORKERS, rate_limit=RATE_LIMIT_PER_SEC,
+                               max_retries=MAX_RETRIES):
+    """Download [start_time, end_time] (ms) concurrently, returns (klines, gaps)
+
+    klines are raw MEXC kline lists sorted by open_time. gaps lists the
+    (start, end) windows still missing after max_retries retry rounds
+    (e.g. exchange maintenance), empty when the range is complete.
+    """
+    interval_ms = interval_to_ms(interval)
+    end_time = int(end_time) if end_time is not None else int(time.time() * 1000)
+    if end_time < start_time:
+        return [], []
+
+    rate_limiter = RateLimiter(rate_limit)
+    local = threading.local()
+
+    def fetch(window):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return fetch_window(symbol, interval, window, base_url, rate_limiter, local.session)
+
+    windows = split_windows(start_time, end_time, interval_ms)
+    batches = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for attempt in range(max_retries + 1):
+            if attempt > 0:
+                time.sleep(RETRY_BACKOFF_SEC * attempt)
+            batches.extend(pool.map(fetch, windows))
+            klines = merge_klines(batches)
+            gaps = find_gaps(klines, start_time, end_time, interval_ms)
+            if not gaps:
+                break
+            # Retry only the windows covering missing candles
+            windows = [w for gap_start, gap_end in gaps
+                       for w in split_windows(gap_start, gap_end, interval_ms)]
+
+    return klines, gaps
+
+
+def main():
+    """Download a date range from the command line and report gaps"""
+    parser = argparse.ArgumentParser(description='Concurrent MEXC kline downloader')
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--interval', default='4h')
+    parser.add_argument('--start', required=True, help='Start date YYYY-MM-DD (UTC)')
+    parser.add_argument('--end', help='End date YYYY-MM-DD (UTC, default: now)')
+    parser.add_argument('--workers', type=int, default=DOWNLOAD_WORKERS)
+    parser.add_argument('--rate-limit', type=float, default=RATE_LIMIT_PER_SEC, help='Requests per second')
+    parser.add_argument('--base-url', default=MEXC_API_BASE, help='API base URL (e.g. a local stand-in)')
+    args = parser.parse_args()
+
+    start_time = int(pd.Timestamp(args.start, tz='UTC').timestamp() * 1000)
+    end_time = int(pd.Timestamp(args.end, tz='UTC').timestamp() * 1000) if args.end else None
+
+    started = time.perf_counter()
+    klines, gaps = download_klines_concurrent(
+        args.symbol, args.interval, start_time, end_time,
+        base_url=args.base_url, workers=args.workers, rate_limit=args.rate_limit
+    )
+    elapsed = time.perf_counter() - started
+
+    print(f"✅ Downloaded {len(klines)} {args.symbol} {args.interval} candles in {elapsed:.1f}s")
+    if gaps:
+        print(f"⚠️  {len(gaps)} gap(s) remain:")
+        for gap_start, gap_end in gaps:
+            print(f"   {pd.Timestamp(gap_start, unit='ms', tz='UTC')} to {pd.Timestamp(gap_end, unit='ms', tz='UTC')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,7 @@ from datetime import datetime
 import os
 import json
 
-# MEXC API Configuration
-MEXC_API_BASE = "https://api.mexc.com/api/v3"
+from kline_cache import fetch_cached_klines
 
 # Telegram Configuration (optional)
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
@@ -32,47 +31,6 @@ USE_ATR_STOPS = False  # NO ATR (ORIGINAL BEST)
 CURRENT_CAPITAL = float(os.environ.get('CURRENT_CAPITAL', '1000.0'))
 
 
-def fetch_mexc_klines(symbol, interval, limit=500):
-    """Fetch klines from MEXC"""
-    try:
-        interval_map = {
-            '1h': '1h',
-            '4h': '4h',
-            '1d': '1d'
-        }
-        mexc_interval = interval_map.get(interval, '4h')
-        
-        url = f"{MEXC_API_BASE}/klines"
-        params = {
-            'symbol': symbol,
-            'interval': mexc_interval,
-            'limit': limit
-        }
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        # MEXC returns: [openTime, open, high, low, close, volume, closeTime, ...]
-        if data and len(data) > 0:
-            formatted = []
-            for k in data:
-                formatted.append({
-                    'open_time': k[0],
-                    'open': k[1],
-                    'high': k[2],
-                    'low': k[3],
-                    'close': k[4],
-                    'volume': k[5],
-                    'close_time': k[6]
-                })
-            return formatted
-        
-        return data
-    except Exception as e:
-        print(f"Error fetching {symbol} from MEXC: {e}")
-        return None
-
-
 def klines_to_df(klines):
     """Convert MEXC klines to DataFrame"""
     if not klines:
@@ -298,8 +256,8 @@ def main():
     
     print(f"\nChecking {SYMBOL}...")
     
-    # Fetch data
-    klines = fetch_mexc_klines(SYMBOL, INTERVAL)
+    # Fetch data (only candles newer than the local cache are downloaded)
+    klines = fetch_cached_klines(SYMBOL, INTERVAL)
     if not klines:
         print(f"  ⚠ No data for {SYMBOL}")
         return
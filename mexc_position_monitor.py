@@ -13,8 +13,8 @@ import time
 import sys
 from collections import deque
 
-# MEXC API Configuration
-MEXC_API_BASE = "https://api.mexc.com/api/v3"
+from Triton73 import ATRState
+from kline_cache import fetch_cached_klines
 
 # Telegram Configuration
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
@@ -34,38 +34,6 @@ MIN_LEVEL_AGE_HOURS = 6
 POSITION_FILE = 'current_position.json'
 
 
-def fetch_mexc_klines(symbol, interval, limit=500):
-    """Fetch klines from MEXC"""
-    try:
-        url = f"{MEXC_API_BASE}/klines"
-        params = {
-            'symbol': symbol,
-            'interval': interval,
-            'limit': limit
-        }
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data and len(data) > 0:
-            formatted = []
-            for k in data:
-                formatted.append({
-                    'open_time': k[0],
-                    'open': k[1],
-                    'high': k[2],
-                    'low': k[3],
-                    'close': k[4],
-                    'volume': k[5],
-                    'close_time': k[6]
-                })
-            return formatted
-        return data
-    except Exception as e:
-        print(f"Error fetching {symbol}: {e}")
-        return None
-
-
 def klines_to_df(klines):
     """Convert MEXC klines to DataFrame"""
     if not klines:
@@ -111,24 +79,51 @@ def clear_position():
             pass
 
 
-def calculate_atr(df, period=14):
-    """Calculate Average True Range"""
-    if len(df) < period + 1:
-        return None
+def advance_position_atr(position, df):
+    """Bring the ATR state stored with the position up to date with df
     
-    df = df.copy()
-    df['high'] = pd.to_numeric(df['high'], errors='coerce')
-    df['low'] = pd.to_numeric(df['low'], errors='coerce')
-    df['close'] = pd.to_numeric(df['close'], errors='coerce')
+    Like Triton73.advance_indicator_state: only closed candles newer than
+    the last stored one are fed in, the still-forming last candle is applied
+    to a copy, and the state is re-seeded from df when nothing usable is
+    stored. Returns (atr, recent_atr, older_atr): ATR(14) and ATR(7) now,
+    and ATR(7) 14 candles ago.
+    """
+    highs = pd.to_numeric(df['high'], errors='coerce').to_numpy(dtype=float)
+    lows = pd.to_numeric(df['low'], errors='coerce').to_numpy(dtype=float)
+    closes = pd.to_numeric(df['close'], errors='coerce').to_numpy(dtype=float)
+    open_time = df['open_time'].dt.as_unit('ms').astype('int64').to_numpy()
     
-    df['prev_close'] = df['close'].shift(1)
-    df['tr1'] = df['high'] - df['low']
-    df['tr2'] = abs(df['high'] - df['prev_close'])
-    df['tr3'] = abs(df['low'] - df['prev_close'])
-    df['tr'] = df[['tr1', 'tr2', 'tr3']].max(axis=1)
+    stored = position.get('atr_state')
+    try:
+        atr = ATRState.from_dict(stored['atr'])
+        fast = ATRState.from_dict(stored['atr_fast'])
+        fast_history = deque(stored['atr_fast_history'], maxlen=14)
+        last = stored['last_open_time']
+    except (KeyError, TypeError):
+        last = None
+    
+    if last is None or last < open_time[0]:
+        # Nothing stored, or a gap larger than the fetched history
+        atr, fast, fast_history = ATRState(14), ATRState(7), deque(maxlen=14)
+        last = open_time[0] - 1
+    for i in range(len(df) - 1):
+        if open_time[i] > last:
+            atr.update(highs[i], lows[i], closes[i])
+            fast_history.append(fast.update(highs[i], lows[i], closes[i]))
+            last = int(open_time[i])
+    
+    position['atr_state'] = {
+        'atr': atr.to_dict(),
+        'atr_fast': fast.to_dict(),
+        'atr_fast_history': list(fast_history),
+        'last_open_time': last
+    }
     
-    atr = df['tr'].rolling(window=period).mean().iloc[-1]
-    return float(atr) if pd.notna(atr) else None
+    # The forming candle only updates copies
+    current = ATRState.from_dict(atr.to_dict()).update(highs[-1], lows[-1], closes[-1])
+    recent = ATRState.from_dict(fast.to_dict()).update(highs[-1], lows[-1], closes[-1])
+    older = fast_history[0] if len(fast_history) == 14 else None
+    return current, recent, older
 
 
 def analyze_position_health(df, position):
@@ -173,14 +168,12 @@ def analyze_position_health(df, position):
         price_moving_away = current_price > min_recent_low * 1.005  # 0.5% above recent low
         momentum_negative = current_price > recent['close'].iloc[-2] if len(recent) > 1 else False
     
-    # Volatility analysis
-    atr = calculate_atr(df, period=14)
+    # Volatility analysis (ATR state persisted with the position)
+    atr, recent_atr, older_atr = advance_position_atr(position, df)
     atr_pct = (atr / current_price * 100) if atr else None
     
     # Check if volatility is decreasing (bad for reaching TP)
     if len(df) >= 28:
-        recent_atr = calculate_atr(df.tail(14), period=7)
-        older_atr = calculate_atr(df.iloc[:-14], period=7) if len(df) > 14 else None
         volatility_decreasing = (recent_atr and older_atr and recent_atr < older_atr * 0.8) if older_atr else False
     else:
         volatility_decreasing = False
@@ -316,8 +309,8 @@ def check_position():
     if not position:
         return None
     
-    # Fetch current data
-    klines = fetch_mexc_klines(SYMBOL, INTERVAL)
+    # Fetch current data (only candles newer than the local cache are downloaded)
+    klines = fetch_cached_klines(SYMBOL, INTERVAL)
     if not klines:
         return None
     
@@ -337,6 +330,8 @@ def check_position():
         clear_position()
         return analysis
     
+    # Keep the advanced ATR state for the next check
+    save_position(position)
     return analysis
 
 
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+MEXC Stand-in Server
+Local HTTP server that serves seeded synthetic klines on /api/v3/klines
+(same query parameters and row layout as MEXC), and a seeded funding
+history on /api/v1/contract/funding_rate/history (MEXC futures paging),
+for testing downloads, the kline and funding caches and backtests offline.
+
+Candles of every interval are aggregated from one 1m random walk, so a
+4h candle and its 1m candles are consistent. Failures, missing candles
+and rate limiting can be injected.
+
+Usage:
+    python3 mexc_stub_server.py --port 8073 --days 60
+    MEXC_API_BASE=http://127.0.0.1:8073/api/v3 python3 kline_cache.py --days 30
+    MEXC_CONTRACT_API_BASE=http://127.0.0.1:8073/api/v1/contract python3 funding_cache.py --days 30
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from kline_downloader import INTERVAL_MS
+
+# Stand-in Settings
+STUB_START = '2024-01-01'
+STUB_DAYS = 60
+STUB_SEED = 73
+STUB_DEFAULT_LIMIT = 500
+STUB_MAX_LIMIT = 1000
+STUB_FUNDING_RATE = 0.0001  # Mean funding rate per 8h
+STUB_FUNDING_PAGE_SIZE = 20
+STUB_FUNDING_MAX_PAGE_SIZE = 1000
+
+
+def make_minute_candles(start=STUB_START, days=STUB_DAYS, seed=STUB_SEED):
+    """Seeded 1m OHLCV arrays (open_time in ms)"""
+    n = days * 1440
+    rng = np.random.default_rng(seed)
+    start_ms = int(pd.Timestamp(start, tz='UTC').timestamp() * 1000)
+    close = 40000.0 * np.exp(np.cumsum(rng.normal(0, 0.0008, n)))
+    open_ = np.concatenate(([40000.0], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.0004, n)) * close
+    return {
+        'open_time': start_ms + np.arange(n, dtype=np.int64) * INTERVAL_MS['1m'],
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.lognormal(2, 0.6, n)
+    }
+
+
+def make_funding_rates(start=STUB_START, days=STUB_DAYS, seed=STUB_SEED):
+    """Seeded funding settlements every 8h as (settle_time ms, rate) arrays
+
+    Rates revert to STUB_FUNDING_RATE with occasional spikes of either sign.
+    """
+    n = days * 3
+    rng = np.random.default_rng(seed + 1)
+    start_ms = int(pd.Timestamp(start, tz='UTC').timestamp() * 1000)
+    noise = rng.normal(0, 0.00008, n) + rng.binomial(1, 0.02, n) * rng.normal(0, 0.002, n)
+    rates = np.empty(n)
+    level = STUB_FUNDING_RATE
+    for k in range(n):
+        level = STUB_FUNDING_RATE + 0.8 * (level - STUB_FUNDING_RATE) + noise[k]
+        rates[k] = level
+    return start_ms + np.arange(n, dtype=np.int64) * 8 * 3_600_000, np.round(rates, 6)
+
+
+def aggregate_candles(minutes, interval):
+    """Aggregate 1m arrays into MEXC kline rows of the given interval"""
+    interval_ms = INTERVAL_MS[interval]
+    bucket = minutes['open_time'] // interval_ms
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    ends = np.concatenate((starts[1:], [len(bucket)])) - 1
+    open_time = bucket[starts] * interval_ms
+
+    return {
+        'open_time': open_time,
+        'open': minutes['open'][starts],
+        'high': np.maximum.reduceat(minutes['high'], starts),
+        'low': np.minimum.reduceat(minutes['low'], starts),
+        'close': minutes['close'][ends],
+        'volume': np.add.reduceat(minutes['volume'], starts),
+        'close_time': open_time + interval_ms - 1
+    }
+
+
+class MexcStubServer:
+    """Threaded stand-in for the MEXC klines endpoint
+
+    fail_rate: share of requests answered with HTTP 500 (seeded).
+    missing: open times (ms) never served, to simulate exchange gaps.
+    max_requests_per_sec: answer HTTP 429 (Retry-After: 1) above this request rate.
+    """
+
+    def __init__(self, start=STUB_START, days=STUB_DAYS, seed=STUB_SEED, port=0,
+                 fail_rate=0.0, missing=(), max_requests_per_sec=None):
+        self.minutes = make_minute_candles(start, days, seed)
+        self.funding_time, self.funding_rates = make_funding_rates(start, days, seed)
+        self.port = port
+        self.fail_rate = fail_rate
+        self.missing = set(missing)
+        self.max_requests_per_sec = max_requests_per_sec
+        self.requests = []
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+        self.candles = {}
+        self.server = None
+        self.thread = None
+
+    @property
+    def base_url(self):
+        """API base URL to pass as MEXC_API_BASE / base_url"""
+        return f"http://127.0.0.1:{self.port}/api/v3"
+
+    @property
+    def contract_base_url(self):
+        """Futures API base URL to pass as MEXC_CONTRACT_API_BASE"""
+        return f"http://127.0.0.1:{self.port}/api/v1/contract"
+
+    def interval_candles(self, interval):
+        """Aggregated candles for an interval (built on first use)"""
+        with self.lock:
+            if interval not in self.candles:
+                self.candles[interval] = aggregate_candles(self.minutes, interval)
+            return self.candles[interval]
+
+    def klines(self, symbol, interval, start_time=None, end_time=None, limit=STUB_DEFAULT_LIMIT):
+        """Kline rows like MEXC /klines (latest `limit` rows without startTime)"""
+        candles = self.interval_candles(interval)
+        open_time = candles['open_time']
+        lo = 0 if start_time is None else int(np.searchsorted(open_time, start_time, side='left'))
+        hi = len(open_time) if end_time is None else int(np.searchsorted(open_time, end_time, side='right'))
+        limit = min(limit, STUB_MAX_LIMIT)
+        if start_time is None:
+            lo = max(lo, hi - limit)
+        hi = min(hi, lo + limit)
+
+        rows = []
+        for i in range(lo, hi):
+            t = int(open_time[i])
+            if t in self.missing:
+                continue
+            rows.append([
+                t, f"{candles['open'][i]:.2f}", f"{candles['high'][i]:.2f}", f"{candles['low'][i]:.2f}",
+                f"{candles['close'][i]:.2f}", f"{candles['volume'][i]:.4f}", int(candles['close_time'][i])
+            ])
+        return rows
+
+    def funding_history(self, symbol, page_num=1, page_size=STUB_FUNDING_PAGE_SIZE):
+        """Funding history page like MEXC /funding_rate/history (newest first)"""
+        page_size = max(1, min(page_size, STUB_FUNDING_MAX_PAGE_SIZE))
+        total = len(self.funding_time)
+        hi = total - (page_num - 1) * page_size
+        lo = max(0, hi - page_size)
+        results = [
+            {'symbol': symbol, 'fundingRate': float(self.funding_rates[i]), 'settleTime': int(self.funding_time[i])}
+            for i in range(hi - 1, lo - 1, -1)
+        ]
+        return {
+            'pageSize': page_size,
+            'totalCount': total,
+            'totalPage': -(-total // page_size),
+            'currentPage': page_num,
+            'resultList': results
+        }
+
+    def _status(self):
+        """HTTP status to answer the current request with (200, 429 or 500)"""
+        with self.lock:
+            now = time.monotonic()
+            self.requests.append(now)
+            if self.max_requests_per_sec:
+                recent = sum(1 for t in self.requests if now - t < 1.0)
+                if recent > self.max_requests_per_sec:
+                    return 429
+            if self.fail_rate and self.rng.random() < self.fail_rate:
+                return 500
+        return 200
+
+    def _error_headers(self, status):
+        """Extra headers of an error answer (Retry-After on HTTP 429, like MEXC)"""
+        return {'Retry-After': '1'} if status == 429 else {}
+
+    def _handler(self):
+        """Request handler class bound to this server"""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == '/api/v1/contract/funding_rate/history':
+                    return self._funding(query)
+                if url.path != '/api/v3/klines':
+                    return self._send(404, {'msg': 'Not found'})
+                interval = query.get('interval', '4h')
+                if interval not in INTERVAL_MS:
+                    return self._send(400, {'msg': f'Invalid interval {interval}'})
+
+                status = stub._status()
+                if status != 200:
+                    return self._send(status, {'msg': 'Stand-in error'}, stub._error_headers(status))
+
+                rows = stub.klines(
+                    query.get('symbol', 'BTCUSDT'), interval,
+                    int(query['startTime']) if 'startTime' in query else None,
+                    int(query['endTime']) if 'endTime' in query else None,
+                    int(query.get('limit', STUB_DEFAULT_LIMIT))
+                )
+                self._send(200, rows)
+
+            def _funding(self, query):
+                status = stub._status()
+                if status != 200:
+                    return self._send(status, {'success': False, 'code': status, 'message': 'Stand-in error'},
+                                      stub._error_headers(status))
+                page = stub.funding_history(
+                    query.get('symbol', 'BTC_USDT'),
+                    int(query.get('page_num', 1)),
+                    int(query.get('page_size', STUB_FUNDING_PAGE_SIZE))
+                )
+                self._send(200, {'success': True, 'code': 0, 'data': page})
+
+            def _send(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        """Serve in a background thread"""
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), self._handler())
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    """Run the stand-in server in the foreground"""
+    parser = argparse.ArgumentParser(description='Local MEXC klines stand-in server')
+    parser.add_argument('--port', type=int, default=8073)
+    parser.add_argument('--start', default=STUB_START, help='First candle date (UTC)')
+    parser.add_argument('--days', type=int, default=STUB_DAYS)
+    parser.add_argument('--seed', type=int, default=STUB_SEED)
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of requests failing with HTTP 500')
+    args = parser.parse_args()
+
+    stub = MexcStubServer(args.start, args.days, args.seed, args.port, fail_rate=args.fail_rate).start()
+    print(f"✅ MEXC stand-in serving {args.days} days from {args.start} at {stub.base_url}")
+    try:
+        stub.thread.join()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Triton73 Monte Carlo Simulator
+Turns one trade list (a backtest or paper trading's closed trades) into
+distributions of final capital and max drawdown.
+
+Each trade is converted to an R-multiple: its P&L per unit of risked
+capital (capital before the trade x risk per trade x leverage). Paths
+shuffle or resample these R-multiples and recompound them with the
+config's RISK_PER_TRADE_PCT and leverage limits. The drawdown pause is
+applied as in the backtest: once a path's drawdown reaches the pause
+threshold it takes no new trades, so its capital stays where it is.
+
+All paths of a batch are computed at once as NumPy arrays.
+
+Usage:
+    python3 monte_carlo_triton73.py                          # backtest last 180 days
+    python3 monte_carlo_triton73.py --paper                  # paper_state.json closed trades
+    python3 monte_carlo_triton73.py --trades triton73_backtest_results.npz --method bootstrap
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from Triton73 import STRATEGY_PRESETS, TRITON73_CONFIG, DRAWDOWN_PAUSE_THRESHOLD
+from backtest_triton73 import backtest_triton73
+
+# Monte Carlo Settings
+MC_PATHS = 100_000
+MC_BATCH_PATHS = 10_000  # Paths computed per NumPy batch (bounds memory)
+MC_METHODS = ('shuffle', 'bootstrap')  # Reorder the trades / draw them with replacement
+MC_PERCENTILES = (5, 25, 50, 75, 95)
+MC_RUIN_LEVEL = 0.5  # Ruin: capital at or below this share of the initial capital
+MC_SEED = 73
+PAPER_STATE_FILE = 'paper_state.json'
+
+
+def load_trade_list(path):
+    """Trades from backtest results (.npz trade records or JSON 'trades') or paper_state.json ('closed_trades')"""
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            return data['trades']
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return data
+    return data.get('closed_trades') or data.get('trades') or []
+
+
+def trade_r_multiples(trades, risk_pct=TRITON73_CONFIG.risk_per_trade_pct):
+    """R-multiples and leverages of closed trades, as (r_multiples, leverage) arrays
+
+    risk_pct is the risk per trade the trades were taken with; the capital
+    before each trade is its capital_after minus its P&L. trades are dicts
+    or a backtest TRADE_DTYPE structured array.
+    """
+    if isinstance(trades, np.ndarray):
+        pnl = trades['pnl'].astype(float)
+        capital_after = trades['capital_after'].astype(float)
+        leverage = trades['leverage'].astype(float)
+    else:
+        pnl = np.array([float(t['pnl']) for t in trades])
+        capital_after = np.array([float(t['capital_after']) for t in trades])
+        leverage = np.array([float(t.get('leverage') or 1.0) for t in trades])
+    capital_before = capital_after - pnl
+    return pnl / (capital_before * risk_pct * leverage), leverage
+
+
+def simulate_paths(r_multiples, leverage, paths=MC_PATHS, method='shuffle', config=TRITON73_CONFIG,
+                   initial_capital=1000.0, trades_per_path=None, seed=MC_SEED):
+    """Simulate capital paths, returns per-path arrays (final_capital, max_drawdown, paused, ruined)
+
+    max_drawdown is the worst peak-to-trough drawdown (%) up to the end of
+    the path or the pause. With drawdown_pause_threshold None nothing
+    pauses; paused then reports touching DRAWDOWN_PAUSE_THRESHOLD.
+    """
+    if method not in MC_METHODS:
+        raise ValueError(f"Unknown Monte Carlo method '{method}' (expected one of {MC_METHODS})")
+    n = len(r_multiples)
+    if n == 0:
+        raise ValueError("No trades to simulate")
+    if method == 'shuffle' and trades_per_path not in (None, n):
+        raise ValueError("Shuffled paths always use every trade once")
+    trades_per_path = trades_per_path or n
+
+    # Per-trade capital return under the config's risk and leverage limits
+    trade_returns = (
+        config.risk_per_trade_pct
+        * np.clip(leverage, config.min_leverage, config.max_leverage)
+        * np.asarray(r_multiples, dtype=float)
+    )
+    growth = np.maximum(1.0 + trade_returns, 0.0)
+    pause_threshold = config.drawdown_pause_threshold
+    touch_threshold = DRAWDOWN_PAUSE_THRESHOLD if pause_threshold is None else pause_threshold
+
+    rng = np.random.default_rng(seed)
+    final_capital = np.empty(paths)
+    max_drawdown = np.empty(paths)
+    paused = np.empty(paths, dtype=bool)
+    ruined = np.empty(paths, dtype=bool)
+
+    for lo in range(0, paths, MC_BATCH_PATHS):
+        batch = min(MC_BATCH_PATHS, paths - lo)
+        if method == 'shuffle':
+            order = rng.permuted(np.tile(np.arange(n), (batch, 1)), axis=1)
+        else:
+            order = rng.integers(0, n, size=(batch, trades_per_path))
+
+        equity = initial_capital * np.cumprod(growth[order], axis=1)
+        peak = np.maximum(np.maximum.accumulate(equity, axis=1), initial_capital)
+        drawdown = equity / peak - 1.0
+
+        touched = drawdown <= -touch_threshold
+        hit = touched.any(axis=1)
+        if pause_threshold is not None:
+            # Paused paths stop after the trade that hit the threshold
+            stop = np.where(hit, touched.argmax(axis=1), trades_per_path - 1)
+            steps = np.arange(trades_per_path)
+            active = steps[None, :] <= stop[:, None]
+            drawdown = np.where(active, drawdown, 0.0)
+            equity = np.where(active, equity, np.inf)
+            final = equity[np.arange(batch), stop]
+        else:
+            final = equity[:, -1]
+
+        final_capital[lo:lo + batch] = final
+        max_drawdown[lo:lo + batch] = np.minimum(drawdown.min(axis=1), 0.0) * 100
+        paused[lo:lo + batch] = hit
+        ruined[lo:lo + batch] = equity.min(axis=1) <= initial_capital * MC_RUIN_LEVEL
+
+    return {
+        'final_capital': final_capital,
+        'max_drawdown': max_drawdown,
+        'paused': paused,
+        'ruined': ruined
+    }
+
+
+def run_monte_carlo(trades, paths=MC_PATHS, method='shuffle', config=TRITON73_CONFIG, source_risk_pct=None,
+                    initial_capital=1000.0, trades_per_path=None, seed=MC_SEED):
+    """Monte Carlo summary of a trade list: percentiles and pause/ruin probabilities
+
+    source_risk_pct defaults to the config's risk per trade (trades from
+    a run with the same config).
+    """
+    r_multiples, leverage = trade_r_multiples(trades, source_risk_pct or config.risk_per_trade_pct)
+    sim = simulate_paths(r_multiples, leverage, paths, method, config, initial_capital, trades_per_path, seed)
+
+    return {
+        'paths': paths,
+        'method': method,
+        'trades_per_path': trades_per_path or len(trades),
+        'initial_capital': initial_capital,
+        'mean_r_multiple': float(r_multiples.mean()),
+        'final_capital': {p: float(v) for p, v in zip(MC_PERCENTILES, np.percentile(sim['final_capital'], MC_PERCENTILES))},
+        'max_drawdown': {p: float(v) for p, v in zip(MC_PERCENTILES, np.percentile(sim['max_drawdown'], MC_PERCENTILES))},
+        'loss_probability': float((sim['final_capital'] < initial_capital).mean()),
+        'pause_probability': float(sim['paused'].mean()),
+        'ruin_probability': float(sim['ruined'].mean())
+    }
+
+
+def print_monte_carlo_results(results, config=TRITON73_CONFIG):
+    """Print the Monte Carlo percentiles and probabilities"""
+    threshold = config.drawdown_pause_threshold or DRAWDOWN_PAUSE_THRESHOLD
+    print("="*80)
+    print(f"MONTE CARLO RESULTS ({results['paths']:,} {results['method']} paths x {results['trades_per_path']} trades)")
+    print("="*80)
+    print(f"Mean R-multiple: {results['mean_r_multiple']:+.3f}")
+    print()
+    print(f"{'Percentile':<12}{'Final Capital':>18}{'Max Drawdown':>16}")
+    print("-"*80)
+    for p in MC_PERCENTILES:
+        capital = f"${results['final_capital'][p]:,.2f}"
+        print(f"{'P' + str(p):<12}{capital:>18}{results['max_drawdown'][p]:>15.2f}%")
+    print()
+    print(f"Probability of a loss: {results['loss_probability']*100:.2f}%")
+    print(f"Probability of hitting the {threshold*100:.0f}% pause threshold: {results['pause_probability']*100:.2f}%")
+    print(f"Probability of ruin (capital <= {MC_RUIN_LEVEL*100:.0f}%): {results['ruin_probability']*100:.2f}%")
+    print("="*80)
+
+
+def main():
+    """Run the Monte Carlo simulation from the command line"""
+    parser = argparse.ArgumentParser(description='Triton73 Monte Carlo trade resampling')
+    parser.add_argument('--trades', help='Backtest results (.npz or JSON) or paper_state.json (default: run a backtest)')
+    parser.add_argument('--paper', action='store_true', help=f'Use the closed trades in {PAPER_STATE_FILE}')
+    parser.add_argument('--start', help='Backtest start date YYYY-MM-DD (default: 180 days ago)')
+    parser.add_argument('--end', help='Backtest end date YYYY-MM-DD (default: today)')
+    parser.add_argument('--paths', type=int, default=MC_PATHS)
+    parser.add_argument('--method', default='shuffle', choices=MC_METHODS)
+    parser.add_argument('--trades-per-path', type=int, default=None, help='Bootstrap path length (default: all trades)')
+    parser.add_argument('--preset', default='triton73', choices=sorted(STRATEGY_PRESETS),
+                        help='Risk, leverage and pause rules to recompound with')
+    parser.add_argument('--source-risk', type=float, default=None,
+                        help='Risk per trade the trades were taken with (default: the preset\'s)')
+    parser.add_argument('--capital', type=float, default=1000.0)
+    parser.add_argument('--seed', type=int, default=MC_SEED)
+    args = parser.parse_args()
+
+    config = STRATEGY_PRESETS[args.preset]
+    trades_file = PAPER_STATE_FILE if args.paper else args.trades
+    if trades_file:
+        trades = load_trade_list(trades_file)
+        print(f"📂 Loaded {len(trades)} trades from {trades_file}")
+    else:
+        end_date = args.end or datetime.now().strftime('%Y-%m-%d')
+        start_date = args.start or (datetime.now() - timedelta(days=180)).strftime('%Y-%m-%d')
+        results = backtest_triton73(start_date, end_date, args.capital, config=config)
+        trades = results['trades'] if results else []
+
+    if len(trades) == 0:
+        print("❌ No closed trades to simulate")
+        return
+
+    start = time.perf_counter()
+    results = run_monte_carlo(trades, args.paths, args.method, config, args.source_risk, args.capital,
+                              args.trades_per_path, args.seed)
+    print(f"⏱️  {args.paths:,} paths simulated in {time.perf_counter() - start:.1f}s")
+    print_monte_carlo_results(results, config)
+
+
+if __name__ == "__main__":
+    main()
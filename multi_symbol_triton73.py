@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Triton73 Multi-Symbol Backtest
+Runs the same strategy over several symbols in a process pool and prints
+a combined comparison table.
+
+Each symbol's candles are loaded once in the main process and packed into
+a multiprocessing.shared_memory block (one float64 column per field).
+Workers only receive the block's name and shape, attach to it and build
+their DataFrame from the shared arrays, so no DataFrame is pickled.
+
+Usage:
+    python3 multi_symbol_triton73.py                                  # default symbols, last 180 days
+    python3 multi_symbol_triton73.py --symbols BTCUSDT,ETHUSDT,SOLUSDT --preset enhanced
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from Triton73 import STRATEGY_PRESETS
+from backtest_triton73 import (
+    INITIAL_CAPITAL, WARMUP_CANDLES, AMBIGUOUS_EXIT_RULE, fetch_backtest_klines, fetch_historical_funding_rates,
+    make_drilldown_resolver, run_backtest, equity_drawdown
+)
+
+# Multi-Symbol Settings
+MULTI_SYMBOLS = ('BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT', 'XRPUSDT')
+SHARED_COLUMNS = ('open_time', 'open', 'high', 'low', 'close', 'volume')  # open_time as ms
+MULTI_SORT_BY = 'return_pct'
+MULTI_RESULTS_FILE = 'triton73_multi_symbol_results.csv'
+
+
+def share_candles(df):
+    """Copy a candle DataFrame into a new shared memory block, returns (block, (name, rows))
+
+    The caller owns the block and must close() and unlink() it.
+    """
+    rows = len(df)
+    block = shared_memory.SharedMemory(create=True, size=max(1, rows * len(SHARED_COLUMNS) * 8))
+    columns = np.ndarray((len(SHARED_COLUMNS), rows), dtype=np.float64, buffer=block.buf)
+    columns[0] = df['open_time'].dt.as_unit('ms').astype('int64').to_numpy()
+    for k, name in enumerate(SHARED_COLUMNS[1:], start=1):
+        columns[k] = df[name].to_numpy(dtype=np.float64)
+    return block, (block.name, rows)
+
+
+def candles_from_shared(block, rows):
+    """Candle DataFrame backed by an attached shared memory block's arrays"""
+    columns = np.ndarray((len(SHARED_COLUMNS), rows), dtype=np.float64, buffer=block.buf)
+    df = pd.DataFrame({name: columns[k] for k, name in enumerate(SHARED_COLUMNS[1:], start=1)}, copy=False)
+    df.insert(0, 'open_time', pd.to_datetime(columns[0].astype(np.int64), unit='ms', utc=True))
+    return df
+
+
+def _backtest_symbol(symbol, block, rows, config, initial_capital, ambiguous_rule, funding=None):
+    """Backtest one symbol's shared candles, returns its comparison row"""
+    df = candles_from_shared(block, rows)
+    resolve = make_drilldown_resolver(df, symbol) if ambiguous_rule == 'finer' else None
+
+    # Position sizing prints per trade, keep worker output quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run_backtest(df, initial_capital, 'vectorized', config,
+                               ambiguous_rule=ambiguous_rule, resolve_ambiguous=resolve, funding=funding)
+
+    return {
+        'symbol': symbol,
+        'candles': rows,
+        'return_pct': results['return_pct'],
+        'max_drawdown': equity_drawdown(results['trades'], initial_capital),
+        'profit_factor': results['profit_factor'],
+        'win_rate': results['win_rate'],
+        'avg_rr': results['avg_rr'],
+        'trades': results['total_trades'],
+        'final_capital': results['final_capital']
+    }
+
+
+def _run_symbol(task):
+    """Pool task: attach to a symbol's shared memory block and backtest it"""
+    symbol, (name, rows), config, initial_capital, ambiguous_rule, funding = task
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return _backtest_symbol(symbol, block, rows, config, initial_capital, ambiguous_rule, funding)
+    finally:
+        block.close()
+
+
+def run_multi_symbol(frames, config=STRATEGY_PRESETS['triton73'], processes=None, initial_capital=INITIAL_CAPITAL,
+                     ambiguous_rule=AMBIGUOUS_EXIT_RULE, sort_by=MULTI_SORT_BY, fundings=None):
+    """Backtest every {symbol: DataFrame} in a process pool, return the comparison table
+
+    fundings maps symbols to their funding history (missing: constant estimate).
+    """
+    processes = min(processes or os.cpu_count() or 1, len(frames)) or 1
+    blocks = []
+    try:
+        tasks = []
+        for symbol, df in frames.items():
+            block, meta = share_candles(df)
+            blocks.append(block)
+            tasks.append((symbol, meta, config, initial_capital, ambiguous_rule, (fundings or {}).get(symbol)))
+
+        if processes == 1:
+            rows = [_run_symbol(task) for task in tasks]
+        else:
+            with Pool(processes) as pool:
+                rows = list(pool.imap_unordered(_run_symbol, tasks))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    results = pd.DataFrame(rows)
+    if len(results) > 0:
+        results = results.sort_values(sort_by, ascending=False).reset_index(drop=True)
+    return results
+
+
+def print_multi_symbol_results(results, config=STRATEGY_PRESETS['triton73']):
+    """Print the per-symbol comparison table"""
+    print("="*80)
+    print(f"MULTI-SYMBOL RESULTS ({config.name}, {len(results)} symbols)")
+    print("="*80)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(results.to_string(float_format=lambda x: f"{x:.4g}"))
+    print("="*80)
+
+
+def main():
+    """Run the multi-symbol backtest from the command line"""
+    parser = argparse.ArgumentParser(description='Triton73 multi-symbol backtest')
+    parser.add_argument('--symbols', default=','.join(MULTI_SYMBOLS), help='Comma-separated symbols')
+    parser.add_argument('--start', help='Start date YYYY-MM-DD (default: 180 days ago)')
+    parser.add_argument('--end', help='End date YYYY-MM-DD (default: today)')
+    parser.add_argument('--preset', default='triton73', choices=sorted(STRATEGY_PRESETS))
+    parser.add_argument('--ambiguous-rule', default=AMBIGUOUS_EXIT_RULE, choices=('pessimistic', 'finer'),
+                        help="Candles touching SL and TP: count as loss, or resolve with 1m candles")
+    parser.add_argument('--capital', type=float, default=INITIAL_CAPITAL)
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--sort', default=MULTI_SORT_BY, help='Column to rank by (default: return_pct)')
+    args = parser.parse_args()
+
+    end_date = args.end or datetime.now().strftime('%Y-%m-%d')
+    start_date = args.start or (datetime.now() - timedelta(days=180)).strftime('%Y-%m-%d')
+    symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+
+    frames = {}
+    fundings = {}
+    for symbol in symbols:
+        print(f"📊 Fetching {symbol} ({start_date} to {end_date})...")
+        df = fetch_backtest_klines(start_date, end_date, symbol=symbol)
+        if df is None or len(df) < WARMUP_CANDLES:
+            print(f"⚠️  Not enough data for {symbol}, skipping")
+            continue
+        frames[symbol] = df
+        open_time_ms = df['open_time'].dt.as_unit('ms').astype('int64')
+        fundings[symbol] = fetch_historical_funding_rates(symbol, int(open_time_ms.iloc[0]), int(open_time_ms.iloc[-1]))
+
+    if not frames:
+        print("❌ No symbol has enough data for a backtest")
+        return
+
+    config = STRATEGY_PRESETS[args.preset]
+    print(f"✅ Loaded {sum(len(df) for df in frames.values())} candles, backtesting {len(frames)} symbols...")
+
+    start = time.perf_counter()
+    results = run_multi_symbol(frames, config, args.processes, args.capital, args.ambiguous_rule, args.sort, fundings)
+    print(f"⏱️  Finished in {time.perf_counter() - start:.1f}s")
+
+    print_multi_symbol_results(results, config)
+    results.to_csv(MULTI_RESULTS_FILE, index=False)
+    print(f"\n✅ Results saved to {MULTI_RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
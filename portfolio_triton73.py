@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Triton73 Portfolio Backtest
+Trades several symbols, and optionally several strategy presets per
+symbol, against one shared capital pool.
+
+Every (symbol, preset) pair is a book. Each book's signals and their exit
+outcomes are recorded once (replay_triton73.record_signals, in a process
+pool over shared-memory candles), then one accounting pass walks the
+merged, time-ordered stream of all books' entries and exits:
+- Positions are sized from the shared capital with the book's own risk
+  and leverage settings
+- A new entry is skipped while the open positions' margin plus its own
+  would exceed PORTFOLIO_MAX_MARGIN_PCT of capital
+- The drawdown pause works like check_drawdown_pause() on the portfolio
+  capital and stops new entries in every book
+- A position whose liquidation price is hit before its SL/TP closes as a
+  full margin loss, as in run_backtest()
+- Positions pay the funding recorded for their holding window, from each
+  symbol's own funding history
+
+Within one book the accounting matches run_backtest() (a new signal
+replaces the book's open position, no entry on a candle where the book
+exited), so a single book without margin limit reproduces it exactly.
+
+Usage:
+    python3 portfolio_triton73.py                                       # default symbols, triton73
+    python3 portfolio_triton73.py --symbols BTCUSDT,ETHUSDT --presets original,enhanced,triton73
+    python3 portfolio_triton73.py --max-margin 0.3 --pause 0.15
+"""
+
+import argparse
+import contextlib
+import heapq
+import io
+import os
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from Triton73 import (
+    STRATEGY_PRESETS, DRAWDOWN_PAUSE_THRESHOLD, DRAWDOWN_RESUME_THRESHOLD,
+    calculate_position_size, leverage_from_atr, calculate_liquidation_price
+)
+import backtest_triton73
+from backtest_triton73 import (
+    INITIAL_CAPITAL, WARMUP_CANDLES, EXIT_MODEL, AMBIGUOUS_EXIT_RULE, fetch_backtest_klines,
+    fetch_historical_funding_rates, make_drilldown_resolver, summarize_backtest, equity_drawdown, _exit_price,
+    _position_pnl, _liquidation_pnl, _liquidation_exit, _funding_payment
+)
+from multi_symbol_triton73 import MULTI_SYMBOLS, share_candles, candles_from_shared
+from replay_triton73 import record_signals
+
+# Portfolio Settings
+PORTFOLIO_PRESETS = ('triton73',)
+PORTFOLIO_MAX_MARGIN_PCT = 0.5  # Open positions' margin may use at most this share of capital (None = no limit)
+PORTFOLIO_PAUSE_THRESHOLD = DRAWDOWN_PAUSE_THRESHOLD  # Portfolio drawdown that pauses all books (None = never)
+PORTFOLIO_RESUME_THRESHOLD = DRAWDOWN_RESUME_THRESHOLD
+PORTFOLIO_RESULTS_FILE = 'triton73_portfolio_books.csv'
+
+
+def _record_book(task):
+    """Pool task: record one book's signals from its symbol's shared candles"""
+    symbol, (name, rows), preset, exit_model, ambiguous_rule, funding = task
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        df = candles_from_shared(block, rows)
+        resolve = make_drilldown_resolver(df, symbol) if ambiguous_rule == 'finer' else None
+        recording = record_signals(df, STRATEGY_PRESETS[preset], exit_model, ambiguous_rule, resolve, funding)
+        recording['last_time'] = int(df['open_time'].iloc[-1].value // 1_000_000)
+        del df
+        return (symbol, preset), recording
+    finally:
+        block.close()
+
+
+def record_books(frames, presets=PORTFOLIO_PRESETS, processes=None, exit_model=EXIT_MODEL,
+                 ambiguous_rule=AMBIGUOUS_EXIT_RULE, fundings=None):
+    """Signal recordings of every {symbol: DataFrame} x preset book, as {(symbol, preset): recording}
+
+    Each symbol's candles are placed in shared memory once and read by
+    all of its books' workers. fundings maps symbols to their funding
+    history (missing: constant estimate).
+    """
+    processes = processes or os.cpu_count() or 1
+    blocks = []
+    try:
+        tasks = []
+        for symbol, df in frames.items():
+            block, meta = share_candles(df)
+            blocks.append(block)
+            funding = (fundings or {}).get(symbol)
+            tasks.extend((symbol, meta, preset, exit_model, ambiguous_rule, funding) for preset in presets)
+
+        if processes == 1 or len(tasks) == 1:
+            recorded = [_record_book(task) for task in tasks]
+        else:
+            with Pool(min(processes, len(tasks))) as pool:
+                recorded = pool.map(_record_book, tasks)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return dict(recorded)
+
+
+def run_portfolio(recordings, initial_capital=INITIAL_CAPITAL, max_margin_pct=PORTFOLIO_MAX_MARGIN_PCT,
+                  pause_threshold=PORTFOLIO_PAUSE_THRESHOLD, resume_threshold=PORTFOLIO_RESUME_THRESHOLD,
+                  slippage_pct=None, fee_pct=None):
+    """Shared-capital accounting over the merged event stream of all books
+
+    recordings maps book keys (e.g. (symbol, preset)) to record_signals()
+    recordings; each book sizes with its recording's config. Returns
+    summarize_backtest() results plus the per-book table ('books') and the
+    number of entries skipped for margin ('margin_skipped').
+    """
+    slippage_pct = backtest_triton73.SLIPPAGE_PCT if slippage_pct is None else slippage_pct
+    keys = list(recordings)
+
+    # Entries of all books in time order (book order breaks ties)
+    entry_time = np.concatenate([recordings[key]['open_time'] for key in keys])
+    book = np.concatenate([np.full(len(recordings[key]['open_time']), b) for b, key in enumerate(keys)])
+    row = np.concatenate([np.arange(len(recordings[key]['open_time'])) for key in keys])
+    order = np.lexsort((book, entry_time))
+    columns = [
+        {name: recordings[key][name].tolist() for name in
+         ('index', 'open_time', 'side', 'entry', 'stop_loss', 'take_profit', 'price', 'atr',
+          'exit_index', 'result', 'funding_rate', 'funding_accrued')}
+        for key in keys
+    ]
+    last_time = max(recordings[key].get('last_time', 0) for key in keys) if keys else 0
+
+    capital = initial_capital
+    max_equity = initial_capital
+    paused = False
+    positions = {}  # book -> open position
+    exits = []  # heap of (exit_time, book, entry_time) for open positions
+    used_margin = 0.0
+    trades = []
+    total_pnl = 0.0
+    margin_skipped = 0
+    max_open = 0
+    last_exit_time = -1
+
+    def check_pause():
+        # Capital only changes on exits, so checking at event times matches a per-candle check
+        nonlocal max_equity, paused
+        if capital > max_equity:
+            max_equity = capital
+        drawdown = (capital - max_equity) / max_equity if max_equity > 0 else 0
+        if pause_threshold is not None and drawdown <= -pause_threshold:
+            paused = True
+        elif paused and capital >= max_equity * resume_threshold:
+            paused = False
+
+    def close_exits(at_time):
+        # Close every position exiting on the candle at at_time, returns their books
+        nonlocal capital, total_pnl, used_margin, last_exit_time
+        closed = set()
+        while exits and exits[0][0] == at_time:
+            _, b, opened = heapq.heappop(exits)
+            position = positions.get(b)
+            if position is None or position['entry_time'] != opened:
+                continue  # Replaced by a newer signal of the same book
+            outcome = 'WIN' if position['result'] == 1 else 'LOSS'
+            if position['liquidated']:
+                exit_price = position['liquidation_price']
+                funding_paid = 0.0
+                net_pnl = _liquidation_pnl(position, fee_pct)
+            else:
+                exit_price = _exit_price(position, outcome, slippage_pct, position['exit_open'])
+                funding_paid = _funding_payment(position, position['funding_accrued'])
+                net_pnl = _position_pnl(position, exit_price, fee_pct) - funding_paid
+            capital += net_pnl
+            total_pnl += net_pnl
+            used_margin -= position['margin']
+            trades.append({
+                'book': keys[b],
+                'entry_time': pd.Timestamp(position['entry_time'], unit='ms', tz='UTC'),
+                'exit_time': pd.Timestamp(at_time, unit='ms', tz='UTC'),
+                'side': position['side'],
+                'entry': position['entry'],
+                'exit': exit_price,
+                'result': outcome,
+                'pnl': net_pnl,
+                'capital_after': capital,
+                'leverage': position['leverage'],
+                'liquidated': position['liquidated'],
+                'liquidation_price': position['liquidation_price'],
+                'liquidation_reduced': position['liquidation_reduced'],
+                'funding': funding_paid
+            })
+            del positions[b]
+            closed.add(b)
+            last_exit_time = at_time
+        return closed
+
+    def advance(until):
+        # Book the exits of candles before `until`, one candle time at a time
+        while exits and exits[0][0] < until:
+            check_pause()
+            close_exits(exits[0][0])
+
+    k = 0
+    while k < len(order):
+        t = int(entry_time[order[k]])
+        advance(t)
+        check_pause()
+        exited = close_exits(t)
+
+        while k < len(order) and entry_time[order[k]] == t:
+            b, r = int(book[order[k]]), int(row[order[k]])
+            k += 1
+            if b in exited or paused:
+                continue
+            signals = columns[b]
+            config = recordings[keys[b]]['config']
+            side = 'LONG' if signals['side'][r] > 0 else 'SHORT'
+            atr, price = signals['atr'][r], signals['price'][r]
+            leverage = config.base_leverage if np.isnan(atr) else leverage_from_atr(atr, price, config)
+            sized = calculate_position_size(
+                capital, signals['entry'][r], signals['stop_loss'][r], side, leverage,
+                current_price=price, funding_rate=signals['funding_rate'][r], config=config
+            )
+            if not sized:
+                continue
+
+            replaced = positions.get(b)
+            free_margin = used_margin - (replaced['margin'] if replaced else 0.0)
+            if max_margin_pct is not None and free_margin + sized['margin_required'] > capital * max_margin_pct:
+                margin_skipped += 1
+                continue
+            if replaced:
+                used_margin -= replaced['margin']
+
+            entry = signals['entry'][r]
+            position = {
+                'entry_time': t,
+                'side': side,
+                'entry': entry * (1 + slippage_pct) if side == 'LONG' else entry * (1 - slippage_pct),
+                'stop_loss': signals['stop_loss'][r],
+                'take_profit': signals['take_profit'][r],
+                'position_units': sized['position_units'],
+                'liquidation_reduced': sized['liquidation_reduced'],
+                'leverage': leverage,
+                'margin': sized['margin_required'],
+                'result': signals['result'][r],
+                'funding_accrued': signals['funding_accrued'][r]
+            }
+            position['liquidation_price'] = calculate_liquidation_price(
+                position['entry'], side, leverage, position['position_units'] * position['entry']
+            )
+            recording = recordings[keys[b]]
+            recorded_exit = (signals['exit_index'][r], signals['result'][r]) if signals['exit_index'][r] >= 0 else None
+            exit_at = _liquidation_exit(recording['candle_open'], recording['candle_high'], recording['candle_low'],
+                                        signals['index'][r] + 1, position, recorded_exit, recording['exit_model'])
+            position['liquidated'] = exit_at is not None and exit_at[1] == 'LIQUIDATED'
+            position['exit_open'] = (recording['candle_open'][exit_at[0]]
+                                     if exit_at and recording['exit_model'] == 'intrabar' else None)
+            exit_time = int(recording['candle_open_time'][exit_at[0]]) if exit_at else -1
+
+            positions[b] = position
+            used_margin += sized['margin_required']
+            max_open = max(max_open, len(positions))
+            if exit_time >= 0:
+                heapq.heappush(exits, (exit_time, b, t))
+
+    advance(last_time + 1)
+    # Max equity keeps updating on candles after the last exit
+    if 0 <= last_exit_time < last_time:
+        check_pause()
+
+    state = {
+        'capital': capital,
+        'max_equity': max_equity,
+        'total_trades': len(trades),
+        'winning_trades': sum(1 for t in trades if t['result'] == 'WIN'),
+        'losing_trades': sum(1 for t in trades if t['result'] == 'LOSS'),
+        'total_pnl': total_pnl,
+        'trades': trades
+    }
+    results = summarize_backtest(state, initial_capital)
+
+    book_rows = []
+    for key in keys:
+        book_trades = [t for t in trades if t['book'] == key]
+        wins = sum(1 for t in book_trades if t['result'] == 'WIN')
+        book_rows.append({
+            'book': '/'.join(key) if isinstance(key, tuple) else str(key),
+            'signals': len(recordings[key]['open_time']),
+            'trades': len(book_trades),
+            'win_rate': wins / len(book_trades) * 100 if book_trades else 0.0,
+            'pnl': sum(t['pnl'] for t in book_trades)
+        })
+    results.update({
+        'books': pd.DataFrame(book_rows).sort_values('pnl', ascending=False).reset_index(drop=True),
+        'margin_skipped': margin_skipped,
+        'max_open_positions': max_open,
+        'open_positions': len(positions),
+        'paused': paused
+    })
+    return results
+
+
+def print_portfolio_results(results):
+    """Print the portfolio statistics and the per-book table"""
+    print("="*80)
+    print(f"PORTFOLIO RESULTS ({len(results['books'])} books)")
+    print("="*80)
+    print(f"Initial Capital: ${results['initial_capital']:,.2f}")
+    print(f"Final Capital: ${results['final_capital']:,.2f}")
+    print(f"Total Return: {results['return_pct']:+.2f}%")
+    print(f"Max Drawdown: {equity_drawdown(results['trades'], results['initial_capital']):.2f}%")
+    print(f"Total Trades: {results['total_trades']} (win rate {results['win_rate']:.1f}%, "
+          f"profit factor {results['profit_factor']:.2f})")
+    print(f"Max Open Positions: {results['max_open_positions']}")
+    print(f"Entries Skipped (margin limit): {results['margin_skipped']}")
+    if results['paused']:
+        print("⚠️  Portfolio ended paused (drawdown)")
+    print()
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(results['books'].to_string(float_format=lambda x: f"{x:.2f}"))
+    print("="*80)
+
+
+def main():
+    """Run the portfolio backtest from the command line"""
+    parser = argparse.ArgumentParser(description='Triton73 shared-capital portfolio backtest')
+    parser.add_argument('--symbols', default=','.join(MULTI_SYMBOLS), help='Comma-separated symbols')
+    parser.add_argument('--presets', default=','.join(PORTFOLIO_PRESETS),
+                        help=f"Comma-separated presets traded per symbol ({', '.join(sorted(STRATEGY_PRESETS))})")
+    parser.add_argument('--start', help='Start date YYYY-MM-DD (default: 180 days ago)')
+    parser.add_argument('--end', help='End date YYYY-MM-DD (default: today)')
+    parser.add_argument('--capital', type=float, default=INITIAL_CAPITAL)
+    parser.add_argument('--max-margin', type=float, default=PORTFOLIO_MAX_MARGIN_PCT,
+                        help='Max share of capital tied up as margin (default: 0.5, 0 = no limit)')
+    parser.add_argument('--pause', type=float, default=PORTFOLIO_PAUSE_THRESHOLD,
+                        help='Portfolio drawdown that pauses new entries (default: 0.20, 0 = never)')
+    parser.add_argument('--ambiguous-rule', default=AMBIGUOUS_EXIT_RULE, choices=('pessimistic', 'finer'),
+                        help="Candles touching SL and TP: count as loss, or resolve with 1m candles")
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: all cores)')
+    args = parser.parse_args()
+
+    end_date = args.end or datetime.now().strftime('%Y-%m-%d')
+    start_date = args.start or (datetime.now() - timedelta(days=180)).strftime('%Y-%m-%d')
+    symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    presets = [p.strip() for p in args.presets.split(',') if p.strip()]
+    unknown = [p for p in presets if p not in STRATEGY_PRESETS]
+    if unknown:
+        parser.error(f"Unknown preset(s): {', '.join(unknown)}")
+
+    frames = {}
+    fundings = {}
+    for symbol in symbols:
+        print(f"📊 Fetching {symbol} ({start_date} to {end_date})...")
+        df = fetch_backtest_klines(start_date, end_date, symbol=symbol)
+        if df is None or len(df) < WARMUP_CANDLES:
+            print(f"⚠️  Not enough data for {symbol}, skipping")
+            continue
+        frames[symbol] = df
+        open_time_ms = df['open_time'].dt.as_unit('ms').astype('int64')
+        fundings[symbol] = fetch_historical_funding_rates(symbol, int(open_time_ms.iloc[0]), int(open_time_ms.iloc[-1]))
+
+    if not frames:
+        print("❌ No symbol has enough data for a backtest")
+        return
+
+    start = time.perf_counter()
+    recordings = record_books(frames, presets, args.processes, ambiguous_rule=args.ambiguous_rule, fundings=fundings)
+    recorded = time.perf_counter() - start
+    # Position sizing prints per trade, keep the output to the summary
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run_portfolio(recordings, args.capital, args.max_margin or None, args.pause or None)
+    print(f"⏱️  {len(recordings)} books recorded in {recorded:.1f}s, "
+          f"portfolio accounting in {time.perf_counter() - start - recorded:.2f}s")
+
+    print_portfolio_results(results)
+    results['books'].to_csv(PORTFOLIO_RESULTS_FILE, index=False)
+    print(f"\n✅ Per-book results saved to {PORTFOLIO_RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Triton73 Signal Replay
+Records the signals of a backtest together with each signal's exit
+outcome, then replays only the accounting under new costs and sizing.
+
+Which signals fire and which candle hits their SL or TP never depend on
+capital, fees, slippage, risk per trade, leverage or the drawdown pause,
+so a recording answers "what if" questions about those parameters in
+milliseconds. Leverage is re-derived per signal from the recorded ATR.
+Liquidation does depend on leverage and slippage, so the recording also
+keeps the candle highs and lows and the replay looks for it over each
+position's holding window. Funding does not depend on them either: each
+signal keeps the funding rate in effect at its candle (for sizing) and
+the funding rates settled over its holding window, summed in one
+vectorized join against the funding history. The replay produces exactly
+the trades run_backtest() would.
+
+Usage:
+    python3 replay_triton73.py --record --start 2024-01-01 --end 2024-12-31
+    python3 replay_triton73.py                                                   # fee x slippage table
+    python3 replay_triton73.py --rows base_leverage=3,4,5,6,7 --cols risk_per_trade_pct=0.002,0.005,0.007
+"""
+
+import argparse
+import contextlib
+import dataclasses
+import io
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from Triton73 import (
+    SYMBOL, INTERVAL, StrategyConfig, STRATEGY_PRESETS,
+    calculate_position_size, leverage_from_atr, find_first_exit, calculate_liquidation_price
+)
+import backtest_triton73
+from backtest_triton73 import (
+    INITIAL_CAPITAL, WARMUP_CANDLES, EXIT_MODEL, AMBIGUOUS_EXIT_RULE, EXIT_MODELS, AMBIGUOUS_EXIT_RULES,
+    fetch_backtest_klines, fetch_historical_funding_rates, funding_rate_at, funding_accrued, precompute_indicators,
+    signals_from_indicators, make_drilldown_resolver, summarize_backtest, _exit_price, _position_pnl,
+    _liquidation_pnl, _liquidation_exit, _funding_payment
+)
+from sweep_triton73 import COST_PARAMS
+
+# Replay Settings
+SIGNAL_RECORDING_FILE = 'triton73_signals.npz'
+# StrategyConfig fields a replay may change (everything else shapes the signals)
+SIZING_PARAMS = (
+    'risk_per_trade_pct', 'base_leverage', 'min_leverage', 'max_leverage',
+    'liquidation_protection', 'drawdown_pause_threshold', 'drawdown_resume_threshold'
+)
+REPLAY_PARAMS = SIZING_PARAMS + COST_PARAMS
+
+DEFAULT_ROWS = ('fee_pct', [0.0, 0.0005, 0.001, 0.0015, 0.002])
+DEFAULT_COLS = ('slippage_pct', [0.0, 0.001, 0.0025, 0.005])
+
+RESULT_CODES = {'WIN': 1, 'LOSS': 0}
+CANDLE_COLUMNS = ('candle_open_time', 'candle_open', 'candle_high', 'candle_low')  # Per candle, for gaps and liquidation
+FUNDING_COLUMNS = ('funding_rate', 'funding_accrued')  # Per signal, for sizing and funding payments
+RECORDING_COLUMNS = {
+    'index': np.int64,
+    'open_time': np.int64,
+    'exit_time': np.int64,
+    'side': np.int8,
+    'entry': float,
+    'stop_loss': float,
+    'take_profit': float,
+    'price': float,
+    'atr': float,
+    'exit_index': np.int64,
+    'result': np.int8
+}
+
+
+def record_signals(df, config=STRATEGY_PRESETS['triton73'], exit_model=EXIT_MODEL,
+                   ambiguous_rule=AMBIGUOUS_EXIT_RULE, resolve_ambiguous=None, funding=None):
+    """Signals the accounting can act on, with their exit outcome, as a recording dict
+
+    Columns (one row per signal candle after WARMUP_CANDLES, except the
+    last candle): index, open_time and exit_time (ms), side (+1/-1), entry,
+    stop_loss, take_profit, price (candle close), atr, exit_index (-1 if
+    never hit), result (1 WIN, 0 LOSS, -1 open), funding_rate (in effect
+    at the signal) and funding_accrued (rates settled until the exit, 0 if
+    never hit). The candles' open_time (ms), open, high and low are kept as
+    candle_open_time, candle_open, candle_high and candle_low. funding is a
+    fetch_historical_funding_rates() history (None: constant estimate).
+    """
+    if exit_model not in EXIT_MODELS:
+        raise ValueError(f"Unknown exit model '{exit_model}' (expected one of {EXIT_MODELS})")
+    if ambiguous_rule not in AMBIGUOUS_EXIT_RULES:
+        raise ValueError(f"Unknown ambiguous exit rule '{ambiguous_rule}' (expected one of {AMBIGUOUS_EXIT_RULES})")
+    if ambiguous_rule == 'finer' and resolve_ambiguous is None:
+        resolve_ambiguous = make_drilldown_resolver(df)
+
+    indicators = precompute_indicators(df, config)
+    signals = signals_from_indicators(indicators)
+    n = len(df)
+    open_time = df['open_time'].dt.as_unit('ms').astype('int64').to_numpy()
+    high, low, close = indicators['high'], indicators['low'], indicators['close']
+
+    rows = []
+    for i in range(WARMUP_CANDLES, n - 1):
+        signal = signals[i]
+        if signal is None:
+            continue
+        exit_at = find_first_exit(
+            high, low, close, i + 1, signal['side'], signal['stop_loss'], signal['take_profit'],
+            exit_model, ambiguous_rule, resolve_ambiguous
+        )
+        exit_index = exit_at[0] if exit_at else -1
+        rows.append((
+            i, open_time[i], open_time[exit_index] if exit_at else -1,
+            1 if signal['side'] == 'LONG' else -1,
+            signal['entry'], signal['stop_loss'], signal['take_profit'], close[i], indicators['atr'][i],
+            exit_index, RESULT_CODES[exit_at[1]] if exit_at else -1
+        ))
+
+    data = list(zip(*rows)) if rows else [[] for _ in RECORDING_COLUMNS]
+    recording = {
+        name: np.array(values, dtype=dtype)
+        for (name, dtype), values in zip(RECORDING_COLUMNS.items(), data)
+    }
+    # Positions are held from the open of the candle after the signal to the open of the exit candle
+    held_from = open_time[recording['index'] + 1]
+    held_until = np.where(recording['exit_index'] >= 0, recording['exit_time'], held_from)
+    recording['funding_rate'] = funding_rate_at(funding, recording['open_time'])
+    recording['funding_accrued'] = funding_accrued(funding, held_from, held_until)
+    recording.update({
+        'candle_open_time': open_time,
+        'candle_open': df['open'].to_numpy(dtype=float).copy(),
+        'candle_high': np.array(high, dtype=float),  # Copies, df may be backed by shared memory
+        'candle_low': np.array(low, dtype=float),
+        'config': config,
+        'exit_model': exit_model,
+        'ambiguous_rule': ambiguous_rule,
+        'candles': n
+    })
+    return recording
+
+
+def save_recording(recording, path=SIGNAL_RECORDING_FILE):
+    """Save a recording as .npz (config and settings as JSON)"""
+    meta = {
+        'config': dataclasses.asdict(recording['config']),
+        'exit_model': recording['exit_model'],
+        'ambiguous_rule': recording['ambiguous_rule'],
+        'candles': recording['candles'],
+        'symbol': SYMBOL,
+        'interval': INTERVAL
+    }
+    arrays = {k: v for k, v in recording.items() if isinstance(v, np.ndarray)}
+    np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+
+
+def load_recording(path=SIGNAL_RECORDING_FILE):
+    """Load a recording saved by save_recording()"""
+    with np.load(path) as data:
+        recording = {k: data[k] for k in data.files if k != 'meta'}
+        meta = json.loads(str(data['meta']))
+    recording.update({
+        'config': StrategyConfig(**meta['config']),
+        'exit_model': meta['exit_model'],
+        'ambiguous_rule': meta['ambiguous_rule'],
+        'candles': meta['candles']
+    })
+    return recording
+
+
+def replay_signals(recording, initial_capital=INITIAL_CAPITAL, slippage_pct=None, fee_pct=None, **changes):
+    """Accounting-only backtest of a recording, returns summarize_backtest() results
+
+    changes override the recorded config's sizing fields (SIZING_PARAMS);
+    costs default to the backtest's SLIPPAGE_PCT and FEE_PCT.
+    """
+    unknown = [name for name in changes if name not in SIZING_PARAMS]
+    if unknown:
+        raise ValueError(f"Replay cannot change {', '.join(unknown)} (signal detection), record again")
+    if any(name not in recording for name in CANDLE_COLUMNS):
+        raise ValueError("Recording has no candle opens/highs/lows for gaps and liquidation, record again")
+    if any(name not in recording for name in FUNDING_COLUMNS):
+        raise ValueError("Recording has no per-signal funding, record again")
+    config = recording['config'].replace(**changes)
+    slippage_pct = backtest_triton73.SLIPPAGE_PCT if slippage_pct is None else slippage_pct
+    pause_threshold = config.drawdown_pause_threshold
+
+    index = recording['index'].tolist()
+    entry_time = recording['open_time'].tolist()
+    exit_time = recording['exit_time'].tolist()
+    side = recording['side'].tolist()
+    entry = recording['entry'].tolist()
+    stop_loss = recording['stop_loss'].tolist()
+    take_profit = recording['take_profit'].tolist()
+    price = recording['price'].tolist()
+    atr = recording['atr'].tolist()
+    exit_index = recording['exit_index'].tolist()
+    result = recording['result'].tolist()
+    funding_rate = recording['funding_rate'].tolist()
+    accrued = recording['funding_accrued'].tolist()
+    candle_open_time = recording['candle_open_time']
+    candle_open = recording['candle_open']
+    candle_high = recording['candle_high']
+    candle_low = recording['candle_low']
+
+    capital = initial_capital
+    max_equity = initial_capital
+    paused = False
+    position = None
+    trades = []
+    total_pnl = 0.0
+    last_exit_index = -1
+
+    def check_pause():
+        # Capital only changes on exits, so checking at events matches the per-candle check
+        nonlocal max_equity, paused
+        if capital > max_equity:
+            max_equity = capital
+        drawdown = (capital - max_equity) / max_equity if max_equity > 0 else 0
+        if pause_threshold is not None and drawdown <= -pause_threshold:
+            paused = True
+        elif paused and capital >= max_equity * config.drawdown_resume_threshold:
+            paused = False
+
+    def close_position():
+        nonlocal capital, total_pnl, position, last_exit_index
+        outcome = 'WIN' if position['result'] == 1 else 'LOSS'
+        if position['liquidated']:
+            exit_price = position['liquidation_price']
+            funding_paid = 0.0
+            net_pnl = _liquidation_pnl(position, fee_pct)
+        else:
+            exit_price = _exit_price(position, outcome, slippage_pct, position['exit_open'])
+            funding_paid = _funding_payment(position, position['funding_accrued'])
+            net_pnl = _position_pnl(position, exit_price, fee_pct) - funding_paid
+        capital += net_pnl
+        total_pnl += net_pnl
+        trades.append({
+            'entry_time': pd.Timestamp(position['entry_time'], unit='ms', tz='UTC'),
+            'exit_time': pd.Timestamp(position['exit_time'], unit='ms', tz='UTC'),
+            'side': position['side'],
+            'entry': position['entry'],
+            'exit': exit_price,
+            'result': outcome,
+            'pnl': net_pnl,
+            'capital_after': capital,
+            'leverage': position['leverage'],
+            'liquidated': position['liquidated'],
+            'liquidation_price': position['liquidation_price'],
+            'liquidation_reduced': position['liquidation_reduced'],
+            'funding': funding_paid
+        })
+        last_exit_index = position['exit_index']
+        position = None
+
+    for k, i in enumerate(index):
+        # Exits on earlier candles
+        if position and 0 <= position['exit_index'] < i:
+            check_pause()
+            close_position()
+
+        check_pause()
+        if position and position['exit_index'] == i:
+            close_position()
+            continue
+        if paused:
+            continue
+
+        signal_side = 'LONG' if side[k] > 0 else 'SHORT'
+        leverage = config.base_leverage if np.isnan(atr[k]) else leverage_from_atr(atr[k], price[k], config)
+        sized = calculate_position_size(
+            capital, entry[k], stop_loss[k], signal_side, leverage,
+            current_price=price[k], funding_rate=funding_rate[k], config=config
+        )
+        if sized:
+            position = {
+                'entry_time': entry_time[k],
+                'exit_time': exit_time[k],
+                'side': signal_side,
+                'entry': entry[k] * (1 + slippage_pct) if signal_side == 'LONG' else entry[k] * (1 - slippage_pct),
+                'stop_loss': stop_loss[k],
+                'take_profit': take_profit[k],
+                'position_units': sized['position_units'],
+                'liquidation_reduced': sized['liquidation_reduced'],
+                'leverage': leverage,
+                'exit_index': exit_index[k],
+                'result': result[k],
+                'funding_accrued': accrued[k]
+            }
+            position['liquidation_price'] = calculate_liquidation_price(
+                position['entry'], signal_side, leverage, position['position_units'] * position['entry']
+            )
+            recorded_exit = (exit_index[k], result[k]) if exit_index[k] >= 0 else None
+            exit_at = _liquidation_exit(candle_open, candle_high, candle_low, i + 1, position, recorded_exit,
+                                        recording['exit_model'])
+            position['liquidated'] = exit_at is not None and exit_at[1] == 'LIQUIDATED'
+            # Stops rest on the book under the intrabar model, so a gap through one fills at the open
+            position['exit_open'] = (candle_open[exit_at[0]] if exit_at and recording['exit_model'] == 'intrabar'
+                                     else None)
+            if position['liquidated']:
+                position.update({
+                    'exit_index': exit_at[0],
+                    'exit_time': int(candle_open_time[exit_at[0]]),
+                    'result': RESULT_CODES['LOSS']
+                })
+
+    if position and position['exit_index'] >= 0:
+        check_pause()
+        close_position()
+    # The backtest still updates max equity on candles after the last exit
+    if 0 <= last_exit_index < recording['candles'] - 1:
+        check_pause()
+
+    state = {
+        'capital': capital,
+        'max_equity': max_equity,
+        'total_trades': len(trades),
+        'winning_trades': sum(1 for t in trades if t['result'] == 'WIN'),
+        'losing_trades': sum(1 for t in trades if t['result'] == 'LOSS'),
+        'total_pnl': total_pnl,
+        'trades': trades
+    }
+    return summarize_backtest(state, initial_capital)
+
+
+def replay_grid(recording, rows=DEFAULT_ROWS, cols=DEFAULT_COLS, metric='return_pct',
+                initial_capital=INITIAL_CAPITAL, **changes):
+    """Replay every (row, col) parameter pair, returns a metric table (DataFrame)
+
+    rows and cols are (param, values) with param from REPLAY_PARAMS, e.g. a
+    fee x slippage sensitivity table or a leverage x risk heatmap.
+    """
+    row_param, row_values = rows
+    col_param, col_values = cols
+    for name in (row_param, col_param):
+        if name not in REPLAY_PARAMS:
+            raise ValueError(f"Unknown replay parameter '{name}' (expected one of {', '.join(REPLAY_PARAMS)})")
+
+    table = pd.DataFrame(index=pd.Index(row_values, name=row_param), columns=pd.Index(col_values, name=col_param),
+                         dtype=float)
+    # Position sizing prints per trade, keep the table output quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        for row_value in row_values:
+            for col_value in col_values:
+                params = {**changes, row_param: row_value, col_param: col_value}
+                results = replay_signals(recording, initial_capital, **params)
+                table.loc[row_value, col_value] = results[metric]
+    return table
+
+
+def _parse_axis(text):
+    """Parse 'param=v1,v2,...' into (param, [values])"""
+    name, _, values = text.partition('=')
+    parsed = []
+    for value in values.split(','):
+        if value.lower() in ('true', 'false'):
+            parsed.append(value.lower() == 'true')
+        elif value.lower() == 'none':
+            parsed.append(None)
+        else:
+            parsed.append(float(value))
+    return name, parsed
+
+
+def main():
+    """Record signals or print a replay sensitivity table from the command line"""
+    parser = argparse.ArgumentParser(description='Triton73 signal recording and accounting replay')
+    parser.add_argument('--record', action='store_true', help='Backtest the period and save its signals')
+    parser.add_argument('--start', help='Start date YYYY-MM-DD (default: 180 days ago)')
+    parser.add_argument('--end', help='End date YYYY-MM-DD (default: today)')
+    parser.add_argument('--preset', default='triton73', choices=sorted(STRATEGY_PRESETS),
+                        help='Strategy preset to record with')
+    parser.add_argument('--file', default=SIGNAL_RECORDING_FILE, help='Recording file')
+    parser.add_argument('--rows', type=_parse_axis, default=DEFAULT_ROWS, help='Row axis, e.g. fee_pct=0.0005,0.001')
+    parser.add_argument('--cols', type=_parse_axis, default=DEFAULT_COLS, help='Column axis, e.g. max_leverage=5,6,7')
+    parser.add_argument('--metric', default='return_pct', help='Result field to tabulate (default: return_pct)')
+    args = parser.parse_args()
+
+    if args.record:
+        end_date = args.end or datetime.now().strftime('%Y-%m-%d')
+        start_date = args.start or (datetime.now() - timedelta(days=180)).strftime('%Y-%m-%d')
+        print(f"📊 Fetching historical data ({start_date} to {end_date})...")
+        df = fetch_backtest_klines(start_date, end_date)
+        if df is None or len(df) < WARMUP_CANDLES:
+            print("❌ Not enough data to record")
+            return
+        open_time_ms = df['open_time'].dt.as_unit('ms').astype('int64')
+        funding = fetch_historical_funding_rates(SYMBOL, int(open_time_ms.iloc[0]), int(open_time_ms.iloc[-1]))
+        recording = record_signals(df, STRATEGY_PRESETS[args.preset], funding=funding)
+        save_recording(recording, args.file)
+        print(f"✅ Recorded {len(recording['index'])} signals from {len(df)} candles to {args.file}")
+        return
+
+    recording = load_recording(args.file)
+    combinations = len(args.rows[1]) * len(args.cols[1])
+    start = time.perf_counter()
+    table = replay_grid(recording, args.rows, args.cols, args.metric)
+    elapsed = time.perf_counter() - start
+
+    print("="*80)
+    print(f"REPLAY {args.metric.upper()} ({recording['config'].name}, {len(recording['index'])} signals)")
+    print("="*80)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(table.to_string(float_format=lambda x: f"{x:.2f}"))
+    print("="*80)
+    print(f"⏱️  {combinations} replays in {elapsed*1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Triton73 Stress Test
+Runs the strategy through a library of crash and regime scenarios in a
+process pool and prints one compact row per scenario: worst drawdown,
+whether the drawdown pause fired, how close any position came to its
+liquidation price, and how many trades the pause cost.
+
+Every scenario is a shock spliced into a base segment: seeded synthetic
+candles (synthetic_market.py) by default, or a stored historical range
+(candle_store.py) with --historical. A shock can move the price over a
+number of days, gap a candle's open, add a wick to a single candle, scale
+volatility and volume for a while, and set the funding rate positions are
+sized with and pay. Workers
+rebuild their scenario from the seed or the candle store, so no
+DataFrame is pickled.
+
+A shock only tests the protections if it hits an open position, so each
+price shock is placed right after the entry of several positions of the
+unshocked run (longs for a crash, shorts for a squeeze) and each column of
+the row shows the worst value over those placements.
+
+Usage:
+    python3 stress_test_triton73.py                                  # all scenarios, synthetic base
+    python3 stress_test_triton73.py --scenarios crash_30pct_day,flash_crash --seed 7
+    python3 stress_test_triton73.py --historical --start 2024-01-01 --end 2024-12-31
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+import backtest_triton73
+from Triton73 import STRATEGY_PRESETS, SYMBOL, INTERVAL
+from backtest_triton73 import INITIAL_CAPITAL, WARMUP_CANDLES, run_backtest, equity_drawdown
+from candle_store import candle_source, load_candle_source, load_candles
+from kline_downloader import INTERVAL_MS
+from synthetic_market import SYNTH_SEED, synthetic_arrays
+
+# Stress Test Settings
+STRESS_CANDLES = 1500  # Synthetic base segment (~250 days of 4h candles)
+STRESS_SHOCK_AT = 0.6  # Shock start as a fraction of the segment, when no position can be hit
+STRESS_SHOCK_OFFSETS = 5  # Baseline positions each price shock is placed into (worst one reported)
+STRESS_RESULTS_FILE = 'triton73_stress_test.csv'
+# Worst value of each result column over a scenario's placements
+STRESS_WORST = {
+    'return_pct': 'min', 'worst_drawdown': 'min', 'pause_fired': 'any', 'margin_call': 'max',
+    'liq_reductions': 'max', 'trades': 'min', 'losing_trades': 'max', 'liquidations': 'max',
+    'trades_lost': 'max', 'return_no_pause': 'min'
+}
+
+# Scenario library. move: total price change over `days`; gap: jump of the
+# first shock candle's open from the previous close (price stays there);
+# wick: extra move of the first shock candle's low (<0) or high (>0) that closes back inside;
+# vol_scale / volume_scale: multipliers on candle moves and volume for
+# vol_days; funding_rate: per-8h rate for sizing and funding payments (whole run)
+SCENARIOS = {
+    'baseline': {},
+    'crash_30pct_day': {'move': -0.30, 'days': 1, 'vol_scale': 2.5, 'volume_scale': 4.0, 'vol_days': 7},
+    'squeeze_30pct_day': {'move': 0.30, 'days': 1, 'vol_scale': 2.5, 'volume_scale': 4.0, 'vol_days': 7},
+    'flash_crash': {'wick': -0.20, 'volume_scale': 6.0, 'vol_days': 0.5},
+    'gap_down_20pct': {'gap': -0.20, 'vol_scale': 2.0, 'volume_scale': 4.0, 'vol_days': 3},
+    'grind_down': {'move': -0.40, 'days': 30},
+    'volatility_spike': {'vol_scale': 3.0, 'volume_scale': 2.0, 'vol_days': 14},
+    'volatility_collapse': {'vol_scale': 0.2, 'volume_scale': 0.5, 'vol_days': 45},
+    'funding_spike': {'funding_rate': 0.003},
+    'crash_negative_funding': {'move': -0.30, 'days': 1, 'vol_scale': 2.5, 'volume_scale': 4.0, 'vol_days': 7,
+                               'funding_rate': -0.003},
+}
+
+
+def apply_shock(arrays, shock, interval=INTERVAL, at=None):
+    """Copy of OHLCV arrays with a scenario's shock spliced in from candle `at`
+
+    Each candle is taken apart into its open and close log offsets from the
+    previous close and its upper and lower wicks; the shock rescales and
+    shifts those and the prices are chained back together, with the wicks
+    hung off the shifted body, so candles stay consistent (low <= open,
+    close <= high) and everything after the shock continues from the
+    shocked price level. A directional shock (move or gap) only widens the
+    wick it pushes into, so a crash candle does not spike up first. `at`
+    defaults to STRESS_SHOCK_AT of the segment.
+    """
+    n = len(arrays['close'])
+    candles_per_day = 86_400_000 / INTERVAL_MS[interval]
+    at = int(n * STRESS_SHOCK_AT) if at is None else at
+
+    log_open = np.log(arrays['open'])
+    log_close = np.log(arrays['close'])
+    prev = np.concatenate(([log_open[0]], log_close[:-1]))
+    offsets = {'open': log_open - prev, 'close': log_close - prev}
+    upper = np.log(arrays['high']) - np.maximum(log_open, log_close)
+    lower = np.minimum(log_open, log_close) - np.log(arrays['low'])
+    volume = np.array(arrays['volume'], dtype=float)
+    direction = shock.get('move') or shock.get('gap') or 0.0
+
+    vol_candles = int(round(shock.get('vol_days', 0) * candles_per_day))
+    if vol_candles:
+        window = slice(at, min(n, at + vol_candles))
+        vol_scale = shock.get('vol_scale', 1.0)
+        for name in offsets:
+            offsets[name][window] *= vol_scale
+        if direction <= 0:
+            lower[window] *= vol_scale
+        if direction >= 0:
+            upper[window] *= vol_scale
+        volume[window] *= shock.get('volume_scale', 1.0)
+
+    if shock.get('move'):
+        move_candles = max(1, int(round(shock.get('days', 1) * candles_per_day)))
+        window = slice(at, min(n, at + move_candles))
+        offsets['close'][window] += np.log1p(shock['move']) / move_candles
+
+    if shock.get('gap'):
+        # The shock candle opens beyond the previous close, stops resting there fill at the open
+        offsets['open'][at] += np.log1p(shock['gap'])
+        offsets['close'][at] += np.log1p(shock['gap'])
+
+    if shock.get('wick'):
+        if shock['wick'] < 0:
+            lower[at] -= np.log1p(shock['wick'])
+        else:
+            upper[at] += np.log1p(shock['wick'])
+
+    close = prev[0] + np.cumsum(offsets['close'])
+    prev = np.concatenate(([prev[0]], close[:-1]))
+    shocked = dict(arrays)
+    shocked['open'] = np.exp(prev + offsets['open'])
+    shocked['close'] = np.exp(close)
+    shocked['high'] = np.exp(np.maximum(prev + offsets['open'], close) + upper)
+    shocked['low'] = np.exp(np.minimum(prev + offsets['open'], close) - lower)
+    shocked['volume'] = volume
+    return shocked
+
+
+def scenario_candles(shock, base, interval=INTERVAL, at=None):
+    """Candle DataFrame of one scenario, shocked from candle `at`
+
+    base is ('synthetic', candles, seed) or a candle_store.candle_source()
+    range of historical candles.
+    """
+    if isinstance(base, dict):
+        df = load_candle_source(base)
+        arrays = {name: df[name].to_numpy(dtype=float) for name in ('open', 'high', 'low', 'close', 'volume')}
+        arrays['open_time'] = df['open_time']
+        arrays['close_time'] = df['close_time'].to_numpy()
+    else:
+        _, candles, seed = base
+        arrays = synthetic_arrays(candles, interval, seed)
+        arrays['open_time'] = pd.to_datetime(arrays['open_time'], unit='ms', utc=True)
+
+    shocked = apply_shock(arrays, shock, interval, at)
+    return pd.DataFrame({name: shocked[name] for name in
+                         ('open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time')})
+
+
+def shock_offsets(shock, trades, df, count=STRESS_SHOCK_OFFSETS):
+    """Candles to start a shock at: right after the entry of `count` baseline positions
+
+    Positions are those of the unshocked run on the side the shock hurts
+    (LONG for a fall, gap down or low wick, SHORT for a rise, gap up or
+    high wick, either for volatility), evenly spread over the run. Falls back to
+    STRESS_SHOCK_AT of the segment for shocks without a price effect or
+    without such positions.
+    """
+    fallback = [int(len(df) * STRESS_SHOCK_AT)]
+    direction = shock.get('move') or shock.get('gap') or shock.get('wick') or 0.0
+    if not direction and not shock.get('vol_days'):
+        return fallback
+    side = 'LONG' if direction < 0 else 'SHORT' if direction > 0 else None
+    # The position opens on the signal candle's close, so the shock starts on the next candle
+    entries = [int(df['open_time'].searchsorted(t['entry_time'])) + 1 for t in trades
+               if side is None or t['side'] == side]
+    entries = [i for i in entries if i < len(df)]
+    if not entries:
+        return fallback
+    picks = np.linspace(0, len(entries) - 1, min(count, len(entries))).round().astype(int)
+    return sorted({entries[k] for k in picks.tolist()})
+
+
+def pause_windows(trades, initial_capital, config):
+    """Paused periods [(start, end)] of a run, from its closed-trade equity
+
+    Capital only changes on exits, so the pause state is re-evaluated from
+    each exit on, the same way the accounting does on every candle; end is
+    None for a pause that lasts to the end of the run.
+    """
+    if config.drawdown_pause_threshold is None:
+        return []
+    windows = []
+    capital = max_equity = initial_capital
+    paused_since = None
+    for trade in trades:
+        capital = trade['capital_after']
+        max_equity = max(max_equity, capital)
+        drawdown = (capital - max_equity) / max_equity if max_equity > 0 else 0
+        if drawdown <= -config.drawdown_pause_threshold:
+            if paused_since is None:
+                paused_since = trade['exit_time']
+        elif paused_since is not None and capital >= max_equity * config.drawdown_resume_threshold:
+            windows.append((paused_since, trade['exit_time']))
+            paused_since = None
+    if paused_since is not None:
+        windows.append((paused_since, None))
+    return windows
+
+
+def margin_call_proximity(trades, df):
+    """Worst adverse move of any position as a share of its distance to liquidation (1.0 = liquidated)
+
+    The distance runs from the entry to the trade's liquidation_price
+    (maintenance margin included, see Triton73.calculate_liquidation_price);
+    the adverse move is the lowest low (LONG) or highest high (SHORT) from
+    entry to exit candle, so gaps through the stop count.
+    """
+    if not trades:
+        return 0.0
+    open_time = df['open_time']
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    entries = open_time.searchsorted([t['entry_time'] for t in trades])
+    exits = open_time.searchsorted([t['exit_time'] for t in trades])
+
+    worst = 0.0
+    for trade, start, end in zip(trades, entries.tolist(), exits.tolist()):
+        if trade['side'] == 'LONG':
+            adverse = trade['entry'] - low[start:end + 1].min()
+        else:
+            adverse = high[start:end + 1].max() - trade['entry']
+        worst = max(worst, adverse / abs(trade['entry'] - trade['liquidation_price']))
+    return float(worst)
+
+
+def _run_scenario(task):
+    """Pool task: build one scenario and backtest it with and without the drawdown pause"""
+    name, shock, base, config, initial_capital, interval, at = task
+    df = scenario_candles(shock, base, interval, at)
+
+    # Constant funding rate of the scenario (None: the backtest's estimate)
+    funding = shock.get('funding_rate')
+    # Position sizing prints per trade, keep worker output quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        signals = backtest_triton73.generate_signals(df, config)
+        results = run_backtest(df, initial_capital, 'vectorized', config, signals=signals, funding=funding)
+        unpaused = run_backtest(df, initial_capital, 'vectorized', config.replace(drawdown_pause_threshold=None),
+                                signals=signals, funding=funding)
+
+    # The pause is checked on the candle after an exit, never after the last one
+    windows = [(start, end) for start, end in pause_windows(results['trades'], initial_capital, config)
+               if start < df['open_time'].iloc[-1]]
+    lost = sum(
+        1 for trade in unpaused['trades']
+        if any(start < trade['entry_time'] and (end is None or trade['entry_time'] <= end) for start, end in windows)
+    )
+
+    return {
+        'scenario': name,
+        'shock_at': df['open_time'].iloc[at] if at is not None else None,
+        'return_pct': results['return_pct'],
+        'worst_drawdown': equity_drawdown(results['trades'], initial_capital),
+        'pause_fired': bool(windows),
+        'margin_call': margin_call_proximity(results['trades'], df),
+        'liq_reductions': results['liquidation_reductions'],
+        'trades': results['total_trades'],
+        'losing_trades': results['losing_trades'],
+        'liquidations': results['liquidations'],
+        'trades_lost': lost,
+        'return_no_pause': unpaused['return_pct']
+    }
+
+
+def run_stress_test(scenarios=None, base=('synthetic', STRESS_CANDLES, SYNTH_SEED), config=STRATEGY_PRESETS['triton73'],
+                    processes=None, initial_capital=INITIAL_CAPITAL, interval=INTERVAL):
+    """Backtest every {name: shock} scenario in a process pool, return the results table in scenario order
+
+    Each scenario runs once per shock_offsets() placement; its row holds
+    the worst value of each column over the placements (lowest return and
+    drawdown, highest margin-call proximity and counts, pause fired in
+    any), with shock_at the placement of the worst drawdown.
+    """
+    scenarios = scenarios or SCENARIOS
+    df = scenario_candles({}, base, interval)
+    with contextlib.redirect_stdout(io.StringIO()):
+        baseline = run_backtest(df, initial_capital, 'vectorized', config)
+    tasks = [
+        (name, shock, base, config, initial_capital, interval, at)
+        for name, shock in scenarios.items()
+        for at in shock_offsets(shock, baseline['trades'], df)
+    ]
+    processes = min(processes or os.cpu_count() or 1, len(tasks)) or 1
+
+    if processes == 1:
+        rows = [_run_scenario(task) for task in tasks]
+    else:
+        with Pool(processes) as pool:
+            rows = list(pool.imap(_run_scenario, tasks))
+
+    results = pd.DataFrame(rows)
+    shock_at = (results.sort_values(['worst_drawdown', 'return_pct'], kind='stable')
+                .groupby('scenario', sort=False)['shock_at'].first())
+    worst = results.groupby('scenario', sort=False).agg(STRESS_WORST)
+    worst.insert(0, 'shock_at', shock_at)
+    return worst[list(results.columns[1:])].loc[list(scenarios)].reset_index()
+
+
+def print_stress_results(results, config=STRATEGY_PRESETS['triton73']):
+    """Print the per-scenario stress table"""
+    print("="*80)
+    print(f"STRESS TEST RESULTS ({config.name}, {len(results)} scenarios)")
+    print("="*80)
+    table = results.assign(
+        pause_fired=results['pause_fired'].map({True: 'yes', False: 'no'}),
+        margin_call=(results['margin_call'] * 100).map(lambda x: f"{x:.0f}%")
+    )
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(table.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    print("-"*80)
+    print("Worst value over the shock placements per column | shock_at: placement of the worst drawdown")
+    print("worst_drawdown: closed-trade equity (%)")
+    print("margin_call: worst adverse move / distance to liquidation (100% = liquidated)")
+    print("liq_reductions: liquidation-protection size cuts | trades_lost: no-pause trades opened while paused")
+    print("="*80)
+
+
+def main():
+    """Run the stress test scenarios from the command line"""
+    parser = argparse.ArgumentParser(description='Triton73 crash and regime stress test')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated scenarios')
+    parser.add_argument('--preset', default='triton73', choices=sorted(STRATEGY_PRESETS))
+    parser.add_argument('--seed', type=int, default=SYNTH_SEED, help='Synthetic base segment seed')
+    parser.add_argument('--candles', type=int, default=STRESS_CANDLES, help='Synthetic base segment length')
+    parser.add_argument('--historical', action='store_true', help=f'Splice shocks into stored {SYMBOL} candles')
+    parser.add_argument('--start', help='Historical start date YYYY-MM-DD')
+    parser.add_argument('--end', help='Historical end date YYYY-MM-DD (default: today)')
+    parser.add_argument('--capital', type=float, default=INITIAL_CAPITAL)
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: all cores)')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(unknown)}")
+    scenarios = {name: SCENARIOS[name] for name in names}
+
+    if args.historical:
+        if not args.start:
+            parser.error('--historical needs --start')
+        start_ms = int(pd.Timestamp(args.start, tz='UTC').timestamp() * 1000)
+        end_ms = int((pd.Timestamp(args.end, tz='UTC') if args.end else pd.Timestamp.now(tz='UTC').normalize()).timestamp() * 1000)
+        print(f"📊 Loading {SYMBOL} {INTERVAL} candles ({args.start} to {args.end or 'today'})...")
+        df = load_candles(SYMBOL, INTERVAL, start_ms, end_ms)
+        if df is None or len(df) < WARMUP_CANDLES * 2:
+            print("❌ Not enough historical data for a stress test")
+            return
+        base = candle_source(SYMBOL, INTERVAL, start_ms, end_ms)
+        print(f"✅ {len(df)} candles, shocks placed into up to {STRESS_SHOCK_OFFSETS} open positions each")
+    else:
+        base = ('synthetic', args.candles, args.seed)
+        print(f"📊 Synthetic base: {args.candles} {INTERVAL} candles (seed {args.seed}), "
+              f"shocks placed into up to {STRESS_SHOCK_OFFSETS} open positions each")
+
+    config = STRATEGY_PRESETS[args.preset]
+    start = time.perf_counter()
+    results = run_stress_test(scenarios, base, config, args.processes, args.capital)
+    print(f"⏱️  {len(results)} scenarios in {time.perf_counter() - start:.1f}s")
+
+    print_stress_results(results, config)
+    results.to_csv(STRESS_RESULTS_FILE, index=False)
+    print(f"\n✅ Results saved to {STRESS_RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Triton73 Parameter Sweep
+Runs the vectorized backtest for every combination of a parameter grid
+across a process pool and prints a ranked results table.
+
+The candle data is loaded once in the main process and handed to each
+worker when the pool starts, so workers never re-fetch it. Each
+combination is a StrategyConfig derived from a preset, so any number of
+them can run in one process.
+"""
+
+import argparse
+import contextlib
+import dataclasses
+import io
+import itertools
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+
+import pandas as pd
+
+import backtest_triton73
+from Triton73 import SYMBOL, INTERVAL, StrategyConfig, STRATEGY_PRESETS
+from candle_store import candle_source, load_candle_source
+from backtest_triton73 import (
+    INITIAL_CAPITAL, AMBIGUOUS_EXIT_RULE, fetch_backtest_klines, fetch_historical_funding_rates, run_backtest,
+    equity_drawdown
+)
+
+# Parameters that can be swept: StrategyConfig fields plus the backtest costs
+COST_PARAMS = ('slippage_pct', 'fee_pct')
+SWEEP_PARAMS = tuple(
+    field.name for field in dataclasses.fields(StrategyConfig) if field.name != 'name'
+) + COST_PARAMS
+
+# Default grid (768 combinations)
+DEFAULT_GRID = {
+    'sl_pct': [0.003, 0.004, 0.005, 0.006],
+    'tp_multiplier': [2.5, 3.0, 3.5, 4.0],
+    'base_leverage': [3.0, 3.5, 4.0],
+    'risk_per_trade_pct': [0.002, 0.003, 0.005, 0.007],
+    'ema_short': [10, 20],
+    'ema_long': [50, 100]
+}
+
+DEFAULT_PRESET = 'triton73'
+SWEEP_RESULTS_FILE = 'triton73_sweep_results.csv'
+
+# Worker state (set once per worker process by _init_worker)
+_worker_df = None
+_worker_base_config = None
+_worker_ambiguous_rule = AMBIGUOUS_EXIT_RULE
+_worker_funding = None
+
+
+def build_grid(grid, base_config=STRATEGY_PRESETS[DEFAULT_PRESET]):
+    """Expand a {param: [values]} grid into a list of parameter dicts"""
+    unknown = [name for name in grid if name not in SWEEP_PARAMS]
+    if unknown:
+        raise ValueError(f"Unknown sweep parameter(s): {', '.join(unknown)}")
+
+    names = list(grid)
+    combinations = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(zip(names, values))
+        if params.get('ema_short', base_config.ema_short) >= params.get('ema_long', base_config.ema_long):
+            continue
+        combinations.append(params)
+    return combinations
+
+
+def _init_worker(df, base_config, ambiguous_rule=AMBIGUOUS_EXIT_RULE, funding=None):
+    """Pool initializer: keep the shared candle data, base config and funding history"""
+    global _worker_df, _worker_base_config, _worker_ambiguous_rule, _worker_funding
+    _worker_df = load_candle_source(df) if isinstance(df, dict) else df
+    _worker_base_config = base_config
+    _worker_ambiguous_rule = ambiguous_rule
+    _worker_funding = funding
+
+
+def _run_combination(params):
+    """Run one backtest for a parameter combination and return its result row"""
+    config = _worker_base_config.replace(**{k: v for k, v in params.items() if k not in COST_PARAMS})
+    costs = {k: v for k, v in params.items() if k in COST_PARAMS}
+
+    # Position sizing prints per trade, keep worker output quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run_backtest(_worker_df, INITIAL_CAPITAL, 'vectorized', config,
+                               ambiguous_rule=_worker_ambiguous_rule, funding=_worker_funding, **costs)
+
+    return {
+        **params,
+        'return_pct': results['return_pct'],
+        'max_drawdown': equity_drawdown(results['trades'], INITIAL_CAPITAL),
+        'profit_factor': results['profit_factor'],
+        'win_rate': results['win_rate'],
+        'trades': results['total_trades'],
+        'final_capital': results['final_capital']
+    }
+
+
+def run_sweep(df, grid=None, processes=None, sort_by='return_pct', base_config=STRATEGY_PRESETS[DEFAULT_PRESET],
+              ambiguous_rule=AMBIGUOUS_EXIT_RULE, funding=None):
+    """Backtest every grid combination (in a process pool if processes > 1), return ranked results
+    
+    df is a candle DataFrame or a candle_store.candle_source() range; with
+    a source each worker maps the stored columns itself instead of
+    receiving a pickled copy of the candles. With ambiguous_rule 'finer'
+    each process loads the 1m candles of an ambiguous candle once and
+    reuses them for all combinations. funding: fetch_historical_funding_rates()
+    history, loaded once and handed to every worker (None: constant estimate).
+    """
+    combinations = build_grid(grid or DEFAULT_GRID, base_config)
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1:
+        # All combinations in this process over the same DataFrame
+        _init_worker(df, base_config, ambiguous_rule, funding)
+        rows = [_run_combination(params) for params in combinations]
+    else:
+        chunksize = max(1, len(combinations) // (processes * 4))
+        with Pool(processes, initializer=_init_worker, initargs=(df, base_config, ambiguous_rule, funding)) as pool:
+            rows = list(pool.imap_unordered(_run_combination, combinations, chunksize=chunksize))
+
+    results = pd.DataFrame(rows)
+    if len(results) > 0:
+        results = results.sort_values(sort_by, ascending=False).reset_index(drop=True)
+    return results
+
+
+def print_sweep_results(results, top=20):
+    """Print the top rows of a sweep results table"""
+    print("="*80)
+    print(f"SWEEP RESULTS (top {min(top, len(results))} of {len(results)})")
+    print("="*80)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(results.head(top).to_string(float_format=lambda x: f"{x:.4g}"))
+    print("="*80)
+
+
+def main():
+    """Run a parameter sweep from the command line"""
+    parser = argparse.ArgumentParser(description='Triton73 parameter sweep')
+    parser.add_argument('--start', help='Start date YYYY-MM-DD (default: 180 days ago)')
+    parser.add_argument('--end', help='End date YYYY-MM-DD (default: today)')
+    parser.add_argument('--grid', help='JSON file with {param: [values]} (default: built-in grid)')
+    parser.add_argument('--preset', default=DEFAULT_PRESET, choices=sorted(STRATEGY_PRESETS),
+                        help='Strategy preset the grid values override (default: triton73)')
+    parser.add_argument('--ambiguous-rule', default=AMBIGUOUS_EXIT_RULE, choices=('pessimistic', 'finer'),
+                        help="Candles touching SL and TP: count as loss, or resolve with 1m candles")
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--sort', default='return_pct', help='Column to rank by (default: return_pct)')
+    parser.add_argument('--top', type=int, default=20, help='Rows to print')
+    args = parser.parse_args()
+
+    end_date = args.end or datetime.now().strftime('%Y-%m-%d')
+    start_date = args.start or (datetime.now() - timedelta(days=180)).strftime('%Y-%m-%d')
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid, 'r') as f:
+            grid = json.load(f)
+
+    print(f"📊 Fetching historical data ({start_date} to {end_date})...")
+    df = fetch_backtest_klines(start_date, end_date)
+    if df is None or len(df) < backtest_triton73.WARMUP_CANDLES:
+        print("❌ Not enough data for a sweep")
+        return
+
+    base_config = STRATEGY_PRESETS[args.preset]
+    combinations = len(build_grid(grid, base_config))
+    print(f"✅ Loaded {len(df)} candles, running {combinations} {base_config.name} combinations...")
+
+    # Workers map the candle store instead of receiving the DataFrame
+    open_time = df['open_time'].dt.as_unit('ms').astype('int64')
+    source = candle_source(SYMBOL, INTERVAL, open_time.iloc[0], open_time.iloc[-1])
+    funding = fetch_historical_funding_rates(SYMBOL, int(open_time.iloc[0]), int(open_time.iloc[-1]))
+    if funding is not None:
+        print(f"✅ Loaded {len(funding['funding_time'])} funding settlements")
+
+    start = time.perf_counter()
+    results = run_sweep(source, grid, args.processes, args.sort, base_config, args.ambiguous_rule, funding)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  Sweep finished in {elapsed:.1f}s ({combinations / elapsed:.1f} backtests/s)")
+
+    print_sweep_results(results, args.top)
+    results.to_csv(SWEEP_RESULTS_FILE, index=False)
+    print(f"\n✅ Results saved to {SWEEP_RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
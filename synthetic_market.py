@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Synthetic Market Generator
+Seeded, realistic OHLCV candles for offline benchmarks, stress tests and
+deterministic regression runs of the backtest and signal functions.
+
+Prices follow a geometric Brownian motion whose volatility switches
+between regimes (calm / normal / volatile, random durations), with
+Poisson jumps on top. Volatility and volume follow an intraday session
+profile that peaks at SESSION_CLOSE_HOUR_UTC, and volume clusters (slowly
+varying noise, higher in volatile regimes and on large moves).
+
+Everything is generated with whole-array NumPy operations, millions of
+candles per second, in the same shape klines_to_df() returns. The same
+seed always yields the same candles.
+
+Usage:
+    python3 synthetic_market.py                          # 1,000,000 1m candles, prints timing and a sample
+    python3 synthetic_market.py --candles 5000 --interval 4h --seed 7
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from Triton73 import SESSION_CLOSE_HOUR_UTC
+from kline_downloader import INTERVAL_MS
+
+# Generator Settings
+SYNTH_SEED = 73
+SYNTH_START = '2024-01-01'
+SYNTH_PRICE = 40000.0
+SYNTH_DRIFT = 0.0  # Annualized log drift
+SYNTH_REGIME_VOLS = (0.35, 0.65, 1.30)  # Annualized volatility of the calm / normal / volatile regimes
+SYNTH_REGIME_DAYS = 12  # Mean regime duration
+SYNTH_JUMPS_PER_DAY = 0.15
+SYNTH_JUMP_SIZE = 0.025  # Standard deviation of a jump's log return
+SYNTH_SESSION_AMPLITUDE = 0.35  # Intraday volatility/volume swing around the session close
+SYNTH_VOLUME_PER_HOUR = 150.0
+SYNTH_VOLUME_MEMORY = 48  # Candles over which volume noise clusters
+SYNTH_WICK = 0.6  # Wick length relative to a candle's volatility
+
+YEAR_MS = 365 * 86_400_000
+
+
+def _regime_path(n, interval_ms, rng):
+    """Regime index (into SYNTH_REGIME_VOLS) for each candle"""
+    mean_candles = max(1.0, SYNTH_REGIME_DAYS * 86_400_000 / interval_ms)
+    # Geometric durations; enough of them to cover n candles
+    count = int(n / mean_candles * 2) + 8
+    durations = rng.geometric(1.0 / mean_candles, count)
+    while durations.sum() < n:
+        durations = np.concatenate((durations, rng.geometric(1.0 / mean_candles, count)))
+    regimes = rng.integers(0, len(SYNTH_REGIME_VOLS), len(durations))
+    return np.repeat(regimes, durations)[:n]
+
+
+def _session_profile(open_time, interval_ms):
+    """Intraday multiplier, highest on the candle of the session close"""
+    if interval_ms >= 86_400_000:
+        return np.ones(len(open_time))
+    hours = ((open_time // 3_600_000) - SESSION_CLOSE_HOUR_UTC) % 24
+    return 1.0 + SYNTH_SESSION_AMPLITUDE * np.cos(2 * np.pi * hours / 24)
+
+
+def synthetic_arrays(n, interval='4h', seed=SYNTH_SEED, start=SYNTH_START, price=SYNTH_PRICE):
+    """Seeded OHLCV arrays (open_time and close_time in ms) of n consecutive candles"""
+    interval_ms = INTERVAL_MS[interval]
+    rng = np.random.default_rng(seed)
+    start_ms = int(pd.Timestamp(start, tz='UTC').timestamp() * 1000)
+    open_time = start_ms + np.arange(n, dtype=np.int64) * interval_ms
+    dt = interval_ms / YEAR_MS
+
+    # Volatility per candle: regime x session profile
+    profile = _session_profile(open_time, interval_ms)
+    sigma = np.asarray(SYNTH_REGIME_VOLS)[_regime_path(n, interval_ms, rng)] * profile * np.sqrt(dt)
+
+    # GBM log returns plus compound Poisson jumps
+    shocks = rng.standard_normal(n)
+    returns = (SYNTH_DRIFT * dt - 0.5 * sigma**2) + sigma * shocks
+    jump_rate = SYNTH_JUMPS_PER_DAY * interval_ms / 86_400_000
+    jumps = rng.poisson(jump_rate, n)
+    returns += np.sqrt(jumps) * rng.standard_normal(n) * SYNTH_JUMP_SIZE
+
+    close = price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([price], close[:-1]))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.standard_normal(n)) * SYNTH_WICK * sigma)
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.standard_normal(n)) * SYNTH_WICK * sigma)
+
+    # Volume: session profile, regime, move size and clustered noise
+    memory = max(1, min(SYNTH_VOLUME_MEMORY, n))
+    kernel = np.exp(-np.arange(memory) / (memory / 3))
+    noise = np.convolve(rng.standard_normal(n), kernel / np.sqrt((kernel**2).sum()))[:n]
+    move = np.abs(returns) / np.maximum(sigma, 1e-12)
+    log_volume = (
+        np.log(SYNTH_VOLUME_PER_HOUR * interval_ms / 3_600_000)
+        + np.log(profile)
+        + 0.8 * np.log(sigma / (np.median(SYNTH_REGIME_VOLS) * np.sqrt(dt) * profile))
+        + 0.3 * (np.minimum(move, 6.0) - 0.8)
+        + 0.4 * noise
+    )
+
+    return {
+        'open_time': open_time,
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': np.exp(log_volume),
+        'close_time': open_time + interval_ms - 1
+    }
+
+
+def synthetic_candles(n, interval='4h', seed=SYNTH_SEED, start=SYNTH_START, price=SYNTH_PRICE):
+    """Seeded synthetic candles shaped like klines_to_df() output"""
+    arrays = synthetic_arrays(n, interval, seed, start, price)
+    df = pd.DataFrame(arrays)
+    df['open_time'] = pd.to_datetime(arrays['open_time'], unit='ms', utc=True)
+    return df
+
+
+def main():
+    """Generate candles from the command line and print timing and a sample"""
+    parser = argparse.ArgumentParser(description='Seeded synthetic OHLCV generator')
+    parser.add_argument('--candles', type=int, default=1_000_000)
+    parser.add_argument('--interval', default='1m', choices=sorted(INTERVAL_MS))
+    parser.add_argument('--seed', type=int, default=SYNTH_SEED)
+    parser.add_argument('--start', default=SYNTH_START)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = synthetic_candles(args.candles, args.interval, args.seed, args.start)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ {len(df):,} {args.interval} candles in {elapsed:.2f}s ({len(df) / elapsed:,.0f} candles/s)")
+    print(f"   {df['open_time'].iloc[0]:%Y-%m-%d %H:%M} to {df['open_time'].iloc[-1]:%Y-%m-%d %H:%M} UTC, "
+          f"close {df['close'].min():,.0f} - {df['close'].max():,.0f}")
+    print(df.head().to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Triton73 Walk-Forward Optimization
+Splits history into rolling train/test windows, picks the best parameter
+combination of a grid on each train window and evaluates it on the test
+window that follows, then stitches the out-of-sample results together.
+
+Folds are independent and run in a process pool. A fold computes the
+indicators of each combination once over its whole span (warm-up, train
+and test candles) and reuses them for both the train and the test run.
+
+Every test window starts with the same capital; the stitched equity
+compounds their returns (position sizing is proportional to capital).
+
+Usage:
+    python3 walk_forward_triton73.py --start 2024-01-01 --end 2024-12-31
+    python3 walk_forward_triton73.py --train-days 120 --test-days 30 --grid my_grid.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+
+import pandas as pd
+
+from Triton73 import SYMBOL, STRATEGY_PRESETS
+from backtest_triton73 import (
+    INITIAL_CAPITAL, WARMUP_CANDLES, EXIT_MODEL, AMBIGUOUS_EXIT_RULE,
+    fetch_backtest_klines, fetch_historical_funding_rates, precompute_indicators, signals_from_indicators, signal_chunk_start,
+    make_drilldown_resolver, run_backtest, summarize_backtest, equity_drawdown
+)
+from sweep_triton73 import COST_PARAMS, DEFAULT_PRESET, build_grid
+
+# Walk-Forward Settings
+WF_TRAIN_DAYS = 90  # Optimization window
+WF_TEST_DAYS = 30  # Out-of-sample window (and step between folds)
+WF_MIN_TRAIN_TRADES = 5  # Combinations with fewer train trades rank last
+WF_SORT_BY = 'return_pct'
+WF_METRICS = ('return_pct', 'profit_factor', 'win_rate', 'max_drawdown')
+WF_RESULTS_FILE = 'triton73_walk_forward_results.json'
+
+# Default grid (36 combinations per fold)
+WF_DEFAULT_GRID = {
+    'sl_pct': [0.003, 0.004, 0.005],
+    'tp_multiplier': [2.5, 3.0, 3.5],
+    'ema_short': [10, 20],
+    'ema_long': [50, 100]
+}
+
+# Worker state (set once per worker process by _init_worker)
+_worker_df = None
+_worker_options = None
+
+
+def make_folds(open_time, train_days=WF_TRAIN_DAYS, test_days=WF_TEST_DAYS):
+    """Rolling (train_start, test_start, test_end) candle index windows
+
+    Windows are cut on open_time, so gaps in the data do not shift them.
+    Every fold keeps WARMUP_CANDLES candles before its train window for the
+    accounting to skip; a test window must end within the data. Indicators
+    get more history per combination (see _run_fold()).
+    """
+    times = pd.DatetimeIndex(open_time)
+    if len(times) <= WARMUP_CANDLES:
+        return []
+
+    train = pd.Timedelta(days=train_days)
+    test = pd.Timedelta(days=test_days)
+    folds = []
+    fold_start = times[WARMUP_CANDLES]
+    while fold_start + train + test <= times[-1]:
+        train_start = int(times.searchsorted(fold_start))
+        test_start = int(times.searchsorted(fold_start + train))
+        test_end = int(times.searchsorted(fold_start + train + test))
+        if test_start > train_start and test_end > test_start:
+            folds.append((train_start, test_start, test_end))
+        fold_start += test
+    return folds
+
+
+def _window_backtest(span, signals, start, end, config):
+    """Backtest candles [start, end) of a fold span with its precomputed signals
+
+    The WARMUP_CANDLES candles before start are passed along as context,
+    the accounting skips them.
+    """
+    lo = start - WARMUP_CANDLES
+    window = span.iloc[lo:end].reset_index(drop=True)
+    options = _worker_options
+    resolver = make_drilldown_resolver(window) if options['ambiguous_rule'] == 'finer' else None
+
+    # Position sizing prints per trade, keep worker output quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_backtest(
+            window, options['initial_capital'], 'vectorized', config,
+            options['exit_model'], options['ambiguous_rule'], resolver, signals=signals[lo:end],
+            funding=options['funding']
+        )
+
+
+def _metrics(results, initial_capital):
+    """Ranking metrics of a backtest result"""
+    return {
+        'return_pct': results['return_pct'],
+        'profit_factor': results['profit_factor'],
+        'win_rate': results['win_rate'],
+        'max_drawdown': equity_drawdown(results['trades'], initial_capital),
+        'trades': results['total_trades']
+    }
+
+
+def _init_worker(df, options):
+    """Pool initializer: keep the shared candle data and walk-forward options"""
+    global _worker_df, _worker_options
+    _worker_df = df
+    _worker_options = options
+
+
+def _run_fold(fold):
+    """Optimize one fold on its train window and evaluate the winner on its test window
+
+    Each combination's signals are computed from signal_chunk_start() of
+    the train window on (its EMA warm-up and the session level in effect),
+    so they equal the signals of a backtest over the whole history.
+    """
+    number, train_start, test_start, test_end = fold
+    options = _worker_options
+    sort_by = options['sort_by']
+
+    best = None
+    for params in options['combinations']:
+        config = options['base_config'].replace(**params)
+        span_start = signal_chunk_start(_worker_df, train_start, config)
+        span = _worker_df.iloc[span_start:test_end].reset_index(drop=True)
+        signals = signals_from_indicators(precompute_indicators(span, config))
+        train = _metrics(
+            _window_backtest(span, signals, train_start - span_start, test_start - span_start, config),
+            options['initial_capital']
+        )
+        score = (train['trades'] >= WF_MIN_TRAIN_TRADES, train[sort_by])
+        if best is None or score > best['score']:
+            best = {'score': score, 'params': params, 'config': config, 'span': span, 'signals': signals,
+                    'span_start': span_start, 'train': train}
+
+    test = _window_backtest(
+        best['span'], best['signals'], test_start - best['span_start'], test_end - best['span_start'], best['config']
+    )
+    return {
+        'fold': number,
+        'train_start': _worker_df['open_time'].iloc[train_start],
+        'test_start': _worker_df['open_time'].iloc[test_start],
+        'test_end': _worker_df['open_time'].iloc[test_end - 1],
+        'params': best['params'],
+        'train': best['train'],
+        'test': _metrics(test, options['initial_capital']),
+        'test_final_capital': test['final_capital'],
+        'test_trades': test['trades']
+    }
+
+
+def stitch_folds(folds, initial_capital=INITIAL_CAPITAL):
+    """Chain the test windows into one out-of-sample result (summarize_backtest() format)
+
+    Each test window started with initial_capital, so its trades are scaled
+    to the capital the previous windows ended with.
+    """
+    capital = initial_capital
+    max_equity = initial_capital
+    trades = []
+    for fold in sorted(folds, key=lambda f: f['fold']):
+        scale = capital / initial_capital
+        for trade in fold['test_trades']:
+            trades.append({
+                **trade,
+                'pnl': trade['pnl'] * scale,
+                'capital_after': trade['capital_after'] * scale,
+                'fold': fold['fold']
+            })
+            max_equity = max(max_equity, trades[-1]['capital_after'])
+        capital *= fold['test_final_capital'] / initial_capital
+
+    state = {
+        'capital': capital,
+        'max_equity': max(max_equity, capital),
+        'total_trades': len(trades),
+        'winning_trades': sum(1 for t in trades if t['result'] == 'WIN'),
+        'losing_trades': sum(1 for t in trades if t['result'] == 'LOSS'),
+        'total_pnl': capital - initial_capital,
+        'trades': trades
+    }
+    return summarize_backtest(state, initial_capital)
+
+
+def run_walk_forward(df, grid=None, train_days=WF_TRAIN_DAYS, test_days=WF_TEST_DAYS, processes=None,
+                     sort_by=WF_SORT_BY, base_config=STRATEGY_PRESETS[DEFAULT_PRESET],
+                     initial_capital=INITIAL_CAPITAL, exit_model=EXIT_MODEL,
+                     ambiguous_rule=AMBIGUOUS_EXIT_RULE, funding=None):
+    """Walk-forward optimize over df, returns {'folds': [...], 'out_of_sample': {...}}
+
+    Folds run in a process pool if processes > 1, each worker receiving the
+    funding history (fetch_historical_funding_rates(), None: constant
+    estimate) once. out_of_sample is the stitched test-window result, plus
+    its equity_drawdown as 'equity_drawdown'.
+    """
+    if sort_by not in WF_METRICS:
+        raise ValueError(f"Unknown ranking metric '{sort_by}' (expected one of {WF_METRICS})")
+    grid = grid or WF_DEFAULT_GRID
+    costs = [name for name in grid if name in COST_PARAMS]
+    if costs:
+        raise ValueError(f"Costs are not optimized per fold: {', '.join(costs)}")
+
+    folds = make_folds(df['open_time'], train_days, test_days)
+    if not folds:
+        raise ValueError(f"Not enough data for a {train_days}+{test_days} day walk-forward")
+
+    options = {
+        'combinations': build_grid(grid, base_config),
+        'base_config': base_config,
+        'sort_by': sort_by,
+        'initial_capital': initial_capital,
+        'exit_model': exit_model,
+        'ambiguous_rule': ambiguous_rule,
+        'funding': funding
+    }
+    tasks = [(number, *fold) for number, fold in enumerate(folds, 1)]
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+
+    if processes == 1:
+        _init_worker(df, options)
+        results = [_run_fold(task) for task in tasks]
+    else:
+        with Pool(processes, initializer=_init_worker, initargs=(df, options)) as pool:
+            results = list(pool.imap_unordered(_run_fold, tasks))
+
+    results.sort(key=lambda f: f['fold'])
+    out_of_sample = stitch_folds(results, initial_capital)
+    out_of_sample['equity_drawdown'] = equity_drawdown(out_of_sample['trades'], initial_capital)
+    return {'folds': results, 'out_of_sample': out_of_sample}
+
+
+def print_walk_forward_results(results):
+    """Print the per-fold table and the stitched out-of-sample result"""
+    print("="*100)
+    print("WALK-FORWARD RESULTS")
+    print("="*100)
+    for fold in results['folds']:
+        params = ', '.join(f"{k}={v}" for k, v in fold['params'].items())
+        print(f"Fold {fold['fold']:>2} | Test {fold['test_start']:%Y-%m-%d} to {fold['test_end']:%Y-%m-%d} | "
+              f"Train {fold['train']['return_pct']:+7.2f}% ({fold['train']['trades']:>3}) | "
+              f"Test {fold['test']['return_pct']:+7.2f}% ({fold['test']['trades']:>3}) | {params}")
+    print("-"*100)
+
+    oos = results['out_of_sample']
+    train_avg = sum(f['train']['return_pct'] for f in results['folds']) / len(results['folds'])
+    test_avg = sum(f['test']['return_pct'] for f in results['folds']) / len(results['folds'])
+    print(f"Out-of-sample Return: {oos['return_pct']:+.2f}% (${oos['final_capital']:,.2f})")
+    print(f"Out-of-sample Max Drawdown: {oos['equity_drawdown']:.2f}%")
+    print(f"Out-of-sample Trades: {oos['total_trades']} | Win Rate: {oos['win_rate']:.2f}% | "
+          f"Profit Factor: {oos['profit_factor']:.2f}")
+    print(f"Average Fold Return: Train {train_avg:+.2f}% | Test {test_avg:+.2f}%")
+    print("="*100)
+
+
+def main():
+    """Run a walk-forward optimization from the command line"""
+    parser = argparse.ArgumentParser(description='Triton73 walk-forward optimization')
+    parser.add_argument('--start', help='Start date YYYY-MM-DD (default: 365 days ago)')
+    parser.add_argument('--end', help='End date YYYY-MM-DD (default: today)')
+    parser.add_argument('--train-days', type=int, default=WF_TRAIN_DAYS)
+    parser.add_argument('--test-days', type=int, default=WF_TEST_DAYS)
+    parser.add_argument('--grid', help='JSON file with {param: [values]} (default: built-in grid)')
+    parser.add_argument('--preset', default=DEFAULT_PRESET, choices=sorted(STRATEGY_PRESETS),
+                        help='Strategy preset the grid values override (default: triton73)')
+    parser.add_argument('--sort', default=WF_SORT_BY, choices=WF_METRICS, help='Train metric to optimize')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: all cores)')
+    args = parser.parse_args()
+
+    end_date = args.end or datetime.now().strftime('%Y-%m-%d')
+    start_date = args.start or (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+
+    grid = WF_DEFAULT_GRID
+    if args.grid:
+        with open(args.grid, 'r') as f:
+            grid = json.load(f)
+
+    print(f"📊 Fetching historical data ({start_date} to {end_date})...")
+    df = fetch_backtest_klines(start_date, end_date)
+    if df is None or len(df) < WARMUP_CANDLES:
+        print("❌ Not enough data for a walk-forward run")
+        return
+
+    base_config = STRATEGY_PRESETS[args.preset]
+    folds = len(make_folds(df['open_time'], args.train_days, args.test_days))
+    print(f"✅ Loaded {len(df)} candles, {folds} folds x {len(build_grid(grid, base_config))} combinations")
+    open_time_ms = df['open_time'].dt.as_unit('ms').astype('int64')
+    funding = fetch_historical_funding_rates(SYMBOL, int(open_time_ms.iloc[0]), int(open_time_ms.iloc[-1]))
+    if funding is not None:
+        print(f"✅ Loaded {len(funding['funding_time'])} funding settlements")
+
+    start = time.perf_counter()
+    results = run_walk_forward(df, grid, args.train_days, args.test_days, args.processes, args.sort, base_config,
+                               funding=funding)
+    print(f"⏱️  Walk-forward finished in {time.perf_counter() - start:.1f}s")
+
+    print_walk_forward_results(results)
+    with open(WF_RESULTS_FILE, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"\n✅ Results saved to {WF_RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()